@@ -0,0 +1,5 @@
+"""
+Analysis package for the semantic visualization paradigm.
+
+Offline EEG decoding (tangent space + logistic regression) and its supporting utilities.
+"""
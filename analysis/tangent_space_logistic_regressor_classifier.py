@@ -12,8 +12,9 @@ From email (Alberto Tates):
 projected them with the TS function, concatenated everything, and let the logistic
 regressor weight the features."
 
-This code is provided as-is from Alberto Tates' implementation.
-No modifications have been made by Dr. Joshua Podmore.
+The decoding method is Alberto Tates' implementation. Reusable pipeline stages
+(filter-bank caching, batched filtering, warm-started tangent space, ...) live
+in analysis/utils/.
 
 Reference:
 - Tates, A., Halder, S., & Daly, I. (2025). "Consolidating the Speech Imagery Paradigm:
@@ -22,135 +23,438 @@ Reference:
 """
 
 import os
+import sys
 import argparse
+from time import perf_counter
+from functools import partial
+from itertools import combinations
+from pathlib import Path
 
 import numpy as np
 
-from mne import read_epochs
-from mne.filter import notch_filter
-from joblib import Parallel, delayed
-from pyriemann.estimation import Covariances
+from joblib import parallel_backend
+from mne import pick_types, read_epochs
 from sklearn.preprocessing import LabelEncoder
-from pyriemann.tangentspace import TangentSpace
 from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LogisticRegression
 from sklearn.model_selection import StratifiedKFold
+from sklearn.multiclass import OneVsRestClassifier
+
+# Add parent directory to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from analysis.utils import (
+    FilterBank, get_crop_slice, apply_iir_notch,
+    lwf_covariances,
+    FoldTangentSpace,
+    BAND_RANKING_METHODS, select_bands, concat_bands,
+    c_grid, l1_path,
+    stream_band_covariances,
+    plan_workers, run_tasks,
+    COVARIANCES_FILENAME, filter_bank_key, load_filter_bank, save_filter_bank,
+    ResultsStore,
+    POWER_NOISE, MAX_FREQ, SFREQ, BASELINE, CROP, C_GRID,
+    LR_MAX_ITER, CV_SPLITS, CV_RANDOM_STATE, get_possible_freqs
+)
 
 parser = argparse.ArgumentParser()
 parser.add_argument('-c', '--classes', nargs='+')
+parser.add_argument('--pairs', nargs='+', default=None, metavar='A,B',
+                    help='Several class pairs, e.g. --pairs eye,nose eye,mouth (each subject is filtered once)')
+parser.add_argument('--all-pairs', action='store_true',
+                    help='Every pair of the -c classes (or of all event names when -c is omitted)')
+parser.add_argument('--multiclass', choices=['multinomial', 'ovr'], default=None,
+                    help='Decode all -c classes (or all event names) jointly: multinomial LR or one-vs-rest')
+parser.add_argument('--top-n-bands', type=int, default=5,
+                    help='Bands kept per fold, ranked on the training epochs (default: 5, 0 = all)')
+parser.add_argument('--band-ranking', choices=BAND_RANKING_METHODS, default='anova',
+                    help='How bands are ranked inside each training fold (default: anova)')
+parser.add_argument('--l1-path', action='store_true',
+                    help='Fit a warm-started L1 regularization path per fold instead of a single C')
+parser.add_argument('--c-grid', type=float, nargs=3, default=list(C_GRID),
+                    metavar=('C_MIN', 'C_MAX', 'N_CS'),
+                    help='Log-spaced C grid of the path (default: 0.01 100 9)')
+parser.add_argument('--cache-dir', type=str, default=None,
+                    help='Filter-bank cache directory (default: <subject>/filter_bank_cache)')
+parser.add_argument('--no-cache', action='store_true',
+                    help='Recompute the filter bank instead of using the on-disk cache')
+parser.add_argument('--streaming', action='store_true',
+                    help='Stream epochs from disk in chunks and keep only the per-band covariances in memory')
+parser.add_argument('--chunk-size', type=int, default=64,
+                    help='Epochs per chunk in streaming mode (default: 64)')
+parser.add_argument('--precision', choices=['float64', 'float32'], default='float64',
+                    help='Precision of the filter bank, covariances and features (default: float64)')
+parser.add_argument('--check-parity', action='store_true',
+                    help='Compare float32 against float64 on every subject and exit')
+parser.add_argument('--n-cores', type=int, default=os.cpu_count(),
+                    help='Total cores shared by all subjects (default: all)')
+parser.add_argument('--threads-per-task', type=int, default=4,
+                    help='Minimum thread budget (BLAS, joblib, sklearn) of each subject task (default: 4)')
+parser.add_argument('--memory-gb', type=float, default=None,
+                    help='Total memory budget in GB; limits concurrent subjects (default: unlimited)')
+parser.add_argument('--results-db', type=str, default='ts_lr_results.sqlite',
+                    help='Append-only per-subject/fold results store (default: ts_lr_results.sqlite)')
+parser.add_argument('--rerun', action='store_true',
+                    help='Recompute subjects already finished in the results store')
 args = parser.parse_args()
 
 # Initialize processing components
 le = LabelEncoder()
-cov = Covariances(estimator='lwf')  # Covariance matrix estimator
-ts = TangentSpace()  # Tangent space projection for Riemannian geometry
 lr = LogisticRegression()
 s_scaler = StandardScaler()
 
 directory = os.fsencode(os.path.abspath(os.getcwd()))
 
 classes = args.classes
-power_noise = [60]  # Power line noise frequency
-max_freq = 127  # Maximum frequency limit
+power_noise = POWER_NOISE  # Power line noise frequency
+max_freq = MAX_FREQ  # Maximum frequency limit
 n_fts = 400
-fs = 256  # Sampling frequency
-
-def run_all(classes, top_n_bands=5):
-    """Main pipeline: process all subjects and save scores."""
-    s=0
-    all_scores, all_coeffs, all_folds = [], [], []
-    for dr in os.listdir(directory):
-        if os.path.isdir(dr):
-            if os.path.exists(os.path.join(dr, 'ica_epo.fif'.encode("utf-8"))):
-                print('sub ', s+1)
-                x, y = get_data(str(dr).split("'")[1])  # Load subject data
-                score = run_l1_cv(x,y, top_n_bands)  # Run classification
-                all_scores.append(score)
-                s += 1
-
-    np.save('ts_lr_scs_'+classes[0]+'_'+classes[1]+'_.npy', all_scores)
-
-def run_l1_cv(x, y, top_n_bands):
-    """Run L1-regularized logistic regression with cross-validation."""
-    lr = LogisticRegression(max_iter=600, penalty='l1', solver='saga', n_jobs=16)
-    x = filter_data(x)  # Filter into frequency bands
-    x = [cov.fit_transform(freq) for freq in x]  # Compute covariance matrices
-    cv = StratifiedKFold(n_splits=10, shuffle=True, random_state=36)
+fs = SFREQ  # Sampling frequency
+baseline = BASELINE  # Baseline correction window
+precision = np.dtype(args.precision)  # float32 halves memory traffic of the filter bank
+
+def run_all(class_sets, top_n_bands=5):
+    """Main pipeline: process all subjects in a bounded process pool and save scores per class set."""
+    subjects = get_subjects()
+    stores = {cs: ResultsStore(args.results_db, get_run_config(cs, top_n_bands)) for cs in class_sets}
+    done = {cs: set() if args.rerun else store.finished_subjects() for cs, store in stores.items()}
+
+    # One task per subject with the class sets it still needs, so it is loaded and filtered once
+    tasks = [(sub, tuple(cs for cs in class_sets if sub not in done[cs])) for sub in subjects]
+    tasks = [task for task in tasks if task[1]]
+    n_skipped = sum(len(class_sets) - len(task_sets) for _, task_sets in tasks) + \
+        len(class_sets) * (len(subjects) - len(tasks))
+    if n_skipped:
+        print(f'skipping {n_skipped} subject/class-set run(s) already in {args.results_db}')
+
+    n_workers = plan_workers(len(tasks), args.n_cores, args.threads_per_task,
+                             memory_budget=args.memory_gb * 1e9 if args.memory_gb else None,
+                             task_memory=max((estimate_subject_memory(sub) for sub, _ in tasks), default=0))
+    n_threads = max(args.threads_per_task, args.n_cores // n_workers)  # Share out leftover cores
+    print(f'{len(tasks)} subjects x {len(class_sets)} class set(s) to run, '
+          f'{n_workers} worker(s) x {n_threads} thread(s)')
+
+    def save_subject(task, result):
+        # Append the subject's folds to each class set's store as soon as it finishes
+        sub = task[0]
+        for cs, (folds, seconds) in result.items():
+            stores[cs].add_subject(sub, folds, seconds)
+            print(f'sub {sub} {" vs ".join(cs)} done in {seconds:.1f}s, '
+                  f'median score {np.median([f["score"] for f in folds])}')
+
+    run_tasks(partial(run_subject, top_n_bands=top_n_bands, n_jobs=n_threads), tasks,
+              n_workers, n_threads, on_result=save_subject)
+
+    for cs, store in stores.items():
+        save_results(cs, store, subjects)
+        store.close()
+
+def save_results(classes, store, subjects):
+    """Collect every finished subject of a class set (this run and earlier ones) and save arrays."""
+    all_scores, all_coeffs, all_folds, all_paths = [], [], [], []
+    for sub in subjects:
+        folds = store.load_subject(sub)
+        if not folds:
+            continue
+        all_scores.append([f['score'] for f in folds])
+        all_coeffs.append([f['coef'] for f in folds])
+        all_folds.append([f['test_idx'] for f in folds])
+        if args.l1_path:
+            all_paths.append([f['path']['scores'] for f in folds])
+
+    name = '_'.join(classes) + ('_' + args.multiclass if args.multiclass else '')
+    # Path mode scores the standardized path fit at the C closest to 1.0: keep it apart from default-mode files
+    suffix = '_l1path' if args.l1_path else ''
+    np.save('ts_lr_scs_'+name+suffix+'_.npy', all_scores)
+    np.save('ts_lr_coefs_'+name+suffix+'_.npy', np.array(all_coeffs, dtype=object), allow_pickle=True)
+    np.save('ts_lr_folds_'+name+suffix+'_.npy', np.array(all_folds, dtype=object), allow_pickle=True)
+    if args.l1_path:
+        np.save('ts_lr_path_'+name+'_.npy', all_paths)  # (subjects, folds, Cs) test scores
+
+def get_run_config(classes, top_n_bands):
+    """Parameters identifying a run in the results store."""
+    return {
+        'classes': list(classes),
+        'multiclass': args.multiclass,
+        'top_n_bands': top_n_bands,
+        'band_ranking': args.band_ranking,
+        'bands': freqs,
+        'crop': time,
+        'sfreq': fs,
+        'baseline': baseline,
+        'notch': power_noise,
+        'cv': {'n_splits': CV_SPLITS, 'random_state': CV_RANDOM_STATE},
+        'precision': precision.name,
+        'l1_path': {'Cs': get_cs().tolist(), 'coef_units': 'raw'} if args.l1_path else None,
+    }
+
+def get_class_sets():
+    """Class sets to decode: -c A B, --pairs A,B C,D, --all-pairs or --multiclass."""
+    if args.multiclass:
+        if args.l1_path and args.multiclass == 'ovr':
+            parser.error('--l1-path supports --multiclass multinomial only')
+        names = classes or get_event_names()
+        if len(names) < 3:
+            parser.error('--multiclass needs at least three classes')
+        return [tuple(names)]
+    if args.pairs:
+        pairs = [tuple(pair.split(',')) for pair in args.pairs]
+        if any(len(pair) != 2 for pair in pairs):
+            parser.error('--pairs takes comma-separated pairs, e.g. --pairs eye,nose eye,mouth')
+        return pairs
+    if args.all_pairs:
+        return list(combinations(classes or get_event_names(), 2))
+    if not classes or len(classes) != 2:
+        parser.error('-c/--classes takes exactly two classes (use --pairs or --all-pairs for more)')
+    return [tuple(classes)]
+
+def get_event_names():
+    """Event names of the first subject's epochs (all classes)."""
+    subjects = get_subjects()
+    if not subjects:
+        parser.error('no subject folder with ica_epo.fif to read the event names from')
+    epochs = read_epochs(os.path.join(subjects[0], 'ica_epo.fif'), preload=False, verbose=False)
+    return sorted(epochs.event_id)
+
+def get_cs():
+    """C grid of the regularization path."""
+    return c_grid(args.c_grid[0], args.c_grid[1], int(args.c_grid[2]))
+
+def get_subjects():
+    """List subject folders in the working directory that contain ica_epo.fif."""
+    return [dr for dr in sorted(os.listdir(os.fsdecode(directory)))
+            if os.path.isdir(dr) and os.path.exists(os.path.join(dr, 'ica_epo.fif'))]
+
+def estimate_subject_memory(sub):
+    """Rough peak memory (bytes) of one subject task: epoch data, filter bank and covariances."""
+    epochs = read_epochs(os.path.join(sub, 'ica_epo.fif'), preload=False, verbose=False)
+    n_ch = len(pick_types(epochs.info, eeg=True, exclude='bads'))
+    n_times = int((epochs.tmax - epochs.tmin) * fs) + 1
+    n_crop = int((time[1] - time[0]) * fs) + 1
+    n_loaded = min(args.chunk_size, len(epochs)) if args.streaming else len(epochs)
+    covs = len(freqs) * len(epochs) * n_ch * n_ch
+    bank = n_loaded * n_ch * len(freqs) * n_crop
+    return 8 * 2 * n_loaded * n_ch * n_times + precision.itemsize * (bank + 2 * covs)
+
+def check_parity(classes, top_n_bands=5, tol=0.02):
+    """Run every subject in float64 and float32 and report covariance and score differences."""
+    failed = []
+    for sub in get_subjects():
+        x64, y = select_classes(*get_data(sub, [classes], dtype=np.float64), classes)
+        x32, _ = select_classes(*get_data(sub, [classes], dtype=np.float32), classes)
+        cov_err = np.max(np.abs(x32 - x64)) / np.max(np.abs(x64))
+        scores64 = [f['score'] for f in run_l1_cv(x64, y, top_n_bands, n_jobs=args.n_cores)]
+        scores32 = [f['score'] for f in run_l1_cv(x32, y, top_n_bands, n_jobs=args.n_cores)]
+        score_diff = abs(np.median(scores32) - np.median(scores64))
+        status = 'OK' if score_diff <= tol else 'MISMATCH'
+        print(f'[{status}] sub {sub}: covariance rel. error {cov_err:.2e}, median score '
+              f'float64 {np.median(scores64):.3f} / float32 {np.median(scores32):.3f}')
+        if score_diff > tol:
+            failed.append(sub)
+    print(f'parity check: {len(failed)} subject(s) differ by more than {tol}')
+    return not failed
+
+def run_subject(task, top_n_bands, n_jobs):
+    """Load one subject once and run the CV of each of its class sets.
+
+    task is (subject, class_sets); returns {class_set: (folds, seconds)}, where
+    seconds includes the shared loading time for the first class set.
+    """
+    sub, class_sets = task
+    start = perf_counter()
+    x, epochs = get_data(sub, class_sets)  # Covariances of every epoch in any of the class sets
+    results = {}
+    for cs in class_sets:
+        x_cs, y = select_classes(x, epochs, cs)  # Slice of the shared tensor
+        folds = run_l1_cv(x_cs, y, top_n_bands, n_jobs=n_jobs)  # Run classification
+        results[cs] = folds, perf_counter() - start
+        start = perf_counter()
+    return results
+
+def run_l1_cv(x, y, top_n_bands, n_jobs=16):
+    """Run L1-regularized logistic regression with cross-validation; return per-fold results.
+
+    x holds the (bands, epochs, channels, channels) covariance matrices.
+    """
+    lr = LogisticRegression(max_iter=LR_MAX_ITER, penalty='l1', solver='saga', n_jobs=n_jobs)
+    if args.multiclass == 'ovr':
+        # One binary model per class, fitted on threads (see fit below) on the same fold features
+        lr = OneVsRestClassifier(LogisticRegression(max_iter=LR_MAX_ITER, penalty='l1', solver='saga'),
+                                 n_jobs=n_jobs)
+    cv = StratifiedKFold(n_splits=CV_SPLITS, shuffle=True, random_state=CV_RANDOM_STATE)
+
+    # Fold-invariant tangent-space state: full-data mean, its square roots and log maps
+    ts = FoldTangentSpace(x, n_jobs=n_jobs)
 
     cv_split = cv.split(x[0], y)
-    all_scores = []
+    all_folds = []
 
     for train_idx, test_idx in cv_split:
-        train, test = [], []
+        start = perf_counter()
         y_train, y_test = y[train_idx], y[test_idx]
 
-        # Parallel tangent space transformation for each frequency band
-        result = Parallel(n_jobs=16)(delayed(run_ts_transform)(band[train_idx], band[test_idx])for band in x)
-
-        for res in result:
-            train.append(res[0])
-            test.append(res[1])
-
-        # Reshape: concatenate features from all bands
-        train, test = np.transpose(train, (1, 0, 2)), np.transpose(test, (1, 0, 2))
-        train, test = train.reshape(train.shape[0], -1), test.reshape(test.shape[0], -1)
-
-        lr.fit(train, y_train)
-        score = lr.score(test, y_test)
-        all_scores.append(score)
+        # Tangent vectors of every band at the fold's (warm-started) training reference,
+        # computed once and used both to rank the bands and for the final fit
+        band_features = ts.fold_features(train_idx)
+        bands = select_bands(band_features, y, train_idx, top_n_bands or None,
+                             method=args.band_ranking)
+
+        # Reshape: concatenate features from the selected bands
+        features = concat_bands(band_features, bands)
+        train, test = features[train_idx], features[test_idx]
+
+        if args.l1_path:
+            # Whole C grid, warm-started on one standardized design matrix; the fold's
+            # score and coefficients (raw feature units) are those of the C closest to the default (1.0)
+            path = l1_path(train, y_train, test, y_test, get_cs(), n_jobs=n_jobs)
+            i = np.argmin(np.abs(np.log(path['Cs'])))
+            score, coef, intercept = path['scores'][i], path['coefs'][i], path['intercepts'][i]
+            path = {k: path[k].tolist() for k in ('Cs', 'scores', 'n_nonzero')}
+        else:
+            # Threads, not loky processes: this may run inside a run_tasks worker, whose
+            # n_jobs is its thread budget (nested process pools hang at shutdown)
+            with parallel_backend('threading', n_jobs=n_jobs):
+                lr.fit(train, y_train)
+            score = lr.score(test, y_test)
+            coef, intercept = get_coefficients(lr)
+            path = None
+
+        all_folds.append({
+            'score': score,
+            'bands': bands,
+            'coef': coef,
+            'intercept': intercept,
+            'test_idx': test_idx,
+            'seconds': perf_counter() - start,
+            'path': path,
+        })
 
     print('final:::::')
-    print(np.median(all_scores))
-    return all_scores
+    print(np.median([fold['score'] for fold in all_folds]))
+    return all_folds
 
-def run_ts_transform(train, test):
-    """Apply tangent space transformation to covariance matrices."""
-    return ts.fit_transform(train), ts.transform(test)
+def get_coefficients(model):
+    """(coef, intercept) of a fitted LR, stacking the per-class models of one-vs-rest."""
+    if isinstance(model, OneVsRestClassifier):
+        return (np.vstack([est.coef_ for est in model.estimators_]),
+                np.concatenate([est.intercept_ for est in model.estimators_]))
+    return model.coef_.copy(), model.intercept_.copy()
 
-def filter_data(x):
+def filter_data(x, dtype=None):
     """Filter EEG data into multiple frequency bands and apply notch filtering."""
-    x_all = []
-    for freq in freqs:
-        # Bandpass filter for current frequency range
-        data = x.copy().filter(freq[0], freq[1], verbose=False, n_jobs=8).crop(time[0], time[1]).get_data()
+    # All bands in one batched pass into a single (bands, epochs, channels, times) buffer
+    x_all = filter_bank.apply(x.get_data(), crop=get_crop_slice(x.times, time[0], time[1]),
+                              dtype=dtype or precision)
 
+    for b, freq in enumerate(freqs):
         # Apply notch filter if power line noise is in band
         for noise_freq in power_noise:
             if noise_freq > freq[0] and noise_freq < freq[1]:
                 print('notching at', noise_freq, 'for:', freq)
-                data = np.apply_along_axis(notch_filter, -1, data, Fs=fs, method='iir', freqs=noise_freq, verbose=False)
-
-        x_all.append(data)
-
-    return np.array(x_all)
-
-def get_data(sub):
-    """Load and preprocess EEG epochs for a subject."""
-    epochs = read_epochs(sub+'/ica_epo.fif')
-    epochs = epochs.drop_channels(epochs.info['bads'])  # Remove bad channels
-
-    # Select specific classes and preprocess
-    epochs_data = epochs[classes].copy().pick('eeg').apply_baseline((-.3,0))
-    labels = le.fit_transform(epochs_data.events[:,2])  # Encode class labels
-
-    return epochs_data.resample(fs), labels  # Resample to target frequency
-
-def get_possible_freqs(min_freq=2, freq_step=6, freq_size=8):
-    """Generate overlapping frequency bands for filtering."""
-    frequency_ranges = []
-    start_freq = min_freq
-    while start_freq < max_freq:
-        end_freq = start_freq + freq_size
-        if end_freq <= max_freq:
-            frequency_ranges.append((start_freq, end_freq))
-        start_freq += freq_step
-
-    unique_ranges = sorted(list(set(frequency_ranges)))
-    return unique_ranges
+                x_all[b] = apply_iir_notch(x_all[b], fs, noise_freq)  # Whole band in one sosfiltfilt call
+
+    return x_all
+
+def get_data(sub, class_sets, dtype=None):
+    """Load the per-band covariances of every epoch in any of the class sets for a subject.
+
+    Returns the (bands, epochs, channels, channels) covariances and the matching
+    (unloaded) Epochs, from which select_classes() slices each class set.
+    """
+    dtype = np.dtype(dtype or precision)
+    epo_file = os.path.join(sub, 'ica_epo.fif')
+    epochs = read_epochs(epo_file, preload=False, verbose=False)
+
+    # Filtering covers every epoch, so select the classes afterwards
+    selected = epochs[sorted(set().union(*class_sets))]
+    idx = np.flatnonzero(np.isin(epochs.selection, selected.selection))
+
+    if args.streaming:
+        return get_stream_covariances(epo_file, epochs, dtype)[:, idx], selected
+
+    x = get_filter_bank(epo_file, epochs, dtype)[:, idx]
+    return lwf_covariances(x, dtype=dtype), selected  # Ledoit-Wolf covariances of all bands in one batched pass
+
+def select_classes(x, epochs, classes):
+    """Slice the covariances and encoded labels of some classes out of a shared tensor."""
+    selected = epochs[list(classes)]
+    labels = le.fit_transform(selected.events[:,2])  # Encode class labels
+    idx = np.flatnonzero(np.isin(epochs.selection, selected.selection))
+    return x[:, idx], labels
+
+def get_cache_params(dtype):
+    """Parameters that change the filter-bank output (cache key)."""
+    return {
+        'dtype': np.dtype(dtype).name,
+        'bands': freqs,
+        'crop': time,
+        'sfreq': fs,
+        'baseline': baseline,
+        'notch': {'freqs': power_noise, 'method': 'iir'},
+        'filter': 'mne-fir',
+    }
+
+def get_cache_dir(epo_file):
+    """Filter-bank cache directory of a subject."""
+    return args.cache_dir or os.path.join(os.path.dirname(epo_file), 'filter_bank_cache')
+
+def get_filter_bank(epo_file, epochs, dtype):
+    """Return the subject's filter bank for all epochs, reusing the on-disk cache when possible."""
+    if args.no_cache:
+        return filter_data(preprocess_epochs(epochs), dtype)
+
+    params = get_cache_params(dtype)
+    cache_dir = get_cache_dir(epo_file)
+    key = filter_bank_key(epo_file, params)
+
+    x = load_filter_bank(cache_dir, key)
+    if x is None:
+        x = save_filter_bank(cache_dir, key, filter_data(preprocess_epochs(epochs), dtype), params)
+    else:
+        print('filter bank loaded from cache:', key[:12])
+    return x
+
+def get_stream_covariances(epo_file, epochs, dtype):
+    """Return per-band covariances of all epochs, streamed from disk a chunk at a time."""
+    if args.no_cache:
+        return stream_covariances(epochs, dtype)
+
+    params = dict(get_cache_params(dtype), covariance='lwf')
+    cache_dir = get_cache_dir(epo_file)
+    key = filter_bank_key(epo_file, params)
+
+    x = load_filter_bank(cache_dir, key, filename=COVARIANCES_FILENAME)
+    if x is None:
+        x = save_filter_bank(cache_dir, key, stream_covariances(epochs, dtype), params,
+                             filename=COVARIANCES_FILENAME)
+    else:
+        print('covariances loaded from cache:', key[:12])
+    return x
+
+def stream_covariances(epochs, dtype):
+    """Filter, notch and reduce epochs to covariances one chunk at a time."""
+    first = preprocess_epochs(epochs[:1])  # Output time axis after resampling
+    notches = {b: [f for f in power_noise if freq[0] < f < freq[1]] for b, freq in enumerate(freqs)}
+    return stream_band_covariances(
+        epochs, filter_bank, partial(lwf_covariances, dtype=dtype),
+        crop=get_crop_slice(first.times, time[0], time[1]), notches=notches,
+        transform=preprocess_epochs, chunk_size=args.chunk_size, dtype=dtype)
+
+def preprocess_epochs(epochs):
+    """Drop bad channels, baseline-correct and resample all EEG epochs."""
+    epochs = epochs.load_data().drop_channels(epochs.info['bads'])  # Remove bad channels
+    epochs = epochs.pick('eeg').apply_baseline(baseline)
+
+    return epochs.resample(fs)  # Resample to target frequency
 
 # Define frequency bands and time window
-freqs = get_possible_freqs()
-time = 0.1, 1.7
+freqs = get_possible_freqs(max_freq=max_freq)
+time = CROP
+filter_bank = FilterBank(freqs, fs)  # Band-pass kernels designed once
 
 if __name__ == "__main__":
-    run_all(classes)
\ No newline at end of file
+    class_sets = get_class_sets()
+    if args.check_parity:
+        sys.exit(0 if check_parity(class_sets[0], top_n_bands=args.top_n_bands) else 1)
+    run_all(class_sets, top_n_bands=args.top_n_bands)
\ No newline at end of file
@@ -0,0 +1,196 @@
+"""
+Analysis utilities package.
+
+Provides reusable building blocks for the offline decoding pipeline.
+"""
+
+from .filterbank_utils import (
+    FilterBank,
+    get_crop_slice,
+    design_iir_notch,
+    apply_iir_notch
+)
+
+from .covariance_utils import (
+    lwf_covariances
+)
+
+from .tangent_space_utils import (
+    riemann_mean,
+    tangent_space,
+    FoldTangentSpace
+)
+
+from .band_selection_utils import (
+    BAND_RANKING_METHODS,
+    score_bands,
+    select_bands,
+    concat_bands
+)
+
+from .loader_utils import (
+    iter_epoch_chunks,
+    stream_band_covariances
+)
+
+from .regularization_utils import (
+    c_grid,
+    l1_path
+)
+
+from .scheduler_utils import (
+    limit_threads,
+    plan_workers,
+    run_tasks
+)
+
+from .cache_utils import (
+    COVARIANCES_FILENAME,
+    hash_file,
+    filter_bank_key,
+    load_filter_bank,
+    save_filter_bank
+)
+
+from .results_utils import (
+    run_key,
+    ResultsStore
+)
+
+from .epoching_utils import (
+    BEEP_CODES,
+    decode_status,
+    event_blocks,
+    protocol_tables,
+    label_beep_events,
+    gather_windows,
+    make_beep_epochs
+)
+
+from .preprocessing_utils import (
+    CheckpointStore,
+    design_preprocessing_kernel,
+    eeg_picks,
+    external_channel_types,
+    reference_picks,
+    chunk_spans,
+    filter_chunk,
+    filter_continuous,
+    fit_ica_decimated
+)
+
+from .bdf_utils import (
+    read_bdf_header,
+    find_status_channel,
+    read_bdf_status,
+    read_bdf_events
+)
+
+from .alignment_utils import (
+    banded_align,
+    match_anchors,
+    align_events,
+    alignment_blocks,
+    alignment_report
+)
+
+from .clock_utils import (
+    huber_line,
+    ClockModel,
+    load_sent_triggers
+)
+
+from .pipeline_utils import (
+    POWER_NOISE,
+    MAX_FREQ,
+    SFREQ,
+    BASELINE,
+    CROP,
+    C_GRID,
+    LR_MAX_ITER,
+    CV_SPLITS,
+    CV_RANDOM_STATE,
+    get_possible_freqs
+)
+
+__all__ = [
+    # Filter-bank utilities
+    'FilterBank',
+    'get_crop_slice',
+    'design_iir_notch',
+    'apply_iir_notch',
+    # Covariance utilities
+    'lwf_covariances',
+    # Tangent-space utilities
+    'riemann_mean',
+    'tangent_space',
+    'FoldTangentSpace',
+    # Band-selection utilities
+    'BAND_RANKING_METHODS',
+    'score_bands',
+    'select_bands',
+    'concat_bands',
+    # Regularization-path utilities
+    'c_grid',
+    'l1_path',
+    # Streaming loader utilities
+    'iter_epoch_chunks',
+    'stream_band_covariances',
+    # Scheduling utilities
+    'limit_threads',
+    'plan_workers',
+    'run_tasks',
+    # Filter-bank cache utilities
+    'COVARIANCES_FILENAME',
+    'hash_file',
+    'filter_bank_key',
+    'load_filter_bank',
+    'save_filter_bank',
+    # Results store utilities
+    'run_key',
+    'ResultsStore',
+    # Epoching utilities
+    'BEEP_CODES',
+    'decode_status',
+    'event_blocks',
+    'protocol_tables',
+    'label_beep_events',
+    'gather_windows',
+    'make_beep_epochs',
+    # Preprocessing utilities
+    'CheckpointStore',
+    'design_preprocessing_kernel',
+    'eeg_picks',
+    'external_channel_types',
+    'reference_picks',
+    'chunk_spans',
+    'filter_chunk',
+    'filter_continuous',
+    'fit_ica_decimated',
+    # BDF utilities
+    'read_bdf_header',
+    'find_status_channel',
+    'read_bdf_status',
+    'read_bdf_events',
+    # Trigger alignment utilities
+    'banded_align',
+    'match_anchors',
+    'align_events',
+    'alignment_blocks',
+    'alignment_report',
+    # Clock model utilities
+    'huber_line',
+    'ClockModel',
+    'load_sent_triggers',
+    # Pipeline parameters
+    'POWER_NOISE',
+    'MAX_FREQ',
+    'SFREQ',
+    'BASELINE',
+    'CROP',
+    'C_GRID',
+    'LR_MAX_ITER',
+    'CV_SPLITS',
+    'CV_RANDOM_STATE',
+    'get_possible_freqs'
+]
@@ -0,0 +1,260 @@
+"""
+Trigger alignment utilities: recorded (BDF) vs intended (CSV) event sequences.
+
+Aligns the two sequences in near-linear time and resynchronizes after any
+drop, insertion or corrupted code:
+
+1. Anchor: block-start codes (61-70) present in both sequences split them
+   into segments, so an error can never propagate past the next block.
+2. Extend: each pair of segments is aligned with a banded Needleman-Wunsch
+   (band = length difference + a margin around the scaled diagonal). Two
+   events match only if their codes are equal and their times relative to the
+   segment anchor agree within a tolerance, so a repeated code (fixation,
+   beeps) cannot be paired with the wrong occurrence.
+
+The alignment is returned as (bdf_index, csv_index) pairs with -1 marking a
+gap: (-1, j) is a trigger dropped from the recording, (i, -1) an extra
+recorded trigger, and a pair with different codes a corrupted trigger.
+"""
+
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from .epoching_utils import BLOCK_START_CODES, _in_range, event_blocks
+
+MATCH_SCORE = 2
+MISMATCH_SCORE = -1
+GAP_SCORE = -1
+
+
+def _band_limits(i: int, n: int, m: int, width: int) -> Tuple[int, int]:
+    """Column range [lo, hi] of row i in a band around the scaled diagonal."""
+    center = i * m / n if n else 0
+    return max(0, int(np.ceil(center)) - width), min(m, int(center) + width)
+
+
+def banded_align(bdf_codes: np.ndarray, bdf_rel: np.ndarray, csv_codes: np.ndarray,
+                 csv_rel: np.ndarray, tol: float = 0.05, band: int = 16) -> np.ndarray:
+    """
+    Globally align two short event sequences with a banded Needleman-Wunsch.
+
+    Parameters
+    ----------
+    bdf_codes, csv_codes : np.ndarray
+        Codes of the recorded and intended events
+    bdf_rel, csv_rel : np.ndarray
+        Event times relative to a shared reference (seconds)
+    tol : float
+        Maximum time disagreement of a match (seconds)
+    band : int
+        Band margin on top of the length difference (events)
+
+    Returns
+    -------
+    np.ndarray
+        (n_steps, 2) (bdf_index, csv_index) pairs in order, -1 for a gap
+    """
+    n, m = len(bdf_codes), len(csv_codes)
+    width = band + abs(n - m)
+    neg_inf = np.iinfo(np.int64).min // 2
+
+    # Banded score and traceback rows (0: pair, 1: BDF-only, 2: CSV-only)
+    limits = [_band_limits(i, n, m, width) for i in range(n + 1)]
+    scores = [np.full(hi - lo + 1, neg_inf, dtype=np.int64) for lo, hi in limits]
+    moves = [np.zeros(hi - lo + 1, dtype=np.int8) for lo, hi in limits]
+
+    def score_at(i, j):
+        lo, hi = limits[i]
+        return scores[i][j - lo] if lo <= j <= hi else neg_inf
+
+    for i in range(n + 1):
+        lo, hi = limits[i]
+        if i > 0:
+            cols = np.arange(max(lo, 1), hi + 1)
+            same = ((csv_codes[cols - 1] == bdf_codes[i - 1]) &
+                    (np.abs(csv_rel[cols - 1] - bdf_rel[i - 1]) <= tol))
+            pair_scores = dict(zip(cols.tolist(),
+                                   np.where(same, MATCH_SCORE, MISMATCH_SCORE).tolist()))
+        row, row_moves = scores[i], moves[i]
+        for j in range(lo, hi + 1):
+            if i == 0 and j == 0:
+                row[0] = 0
+                continue
+            best, move = neg_inf, 0
+            if i > 0 and j > 0:
+                best = score_at(i - 1, j - 1) + pair_scores[j]
+            if i > 0 and score_at(i - 1, j) + GAP_SCORE > best:
+                best, move = score_at(i - 1, j) + GAP_SCORE, 1
+            if j > lo and row[j - 1 - lo] + GAP_SCORE > best:
+                best, move = row[j - 1 - lo] + GAP_SCORE, 2
+            row[j - lo], row_moves[j - lo] = best, move
+
+    steps = []
+    i, j = n, m
+    while i > 0 or j > 0:
+        move = moves[i][j - limits[i][0]]
+        if move == 0:
+            steps.append((i - 1, j - 1))
+            i, j = i - 1, j - 1
+        elif move == 1:
+            steps.append((i - 1, -1))
+            i -= 1
+        else:
+            steps.append((-1, j - 1))
+            j -= 1
+    return np.array(steps[::-1], dtype=np.int64).reshape(-1, 2)
+
+
+def match_anchors(bdf_codes: np.ndarray, csv_codes: np.ndarray,
+                  anchor_codes: Tuple[int, int] = BLOCK_START_CODES) -> np.ndarray:
+    """
+    Pair the anchor (block-start) events of both sequences, in order.
+
+    Parameters
+    ----------
+    bdf_codes, csv_codes : np.ndarray
+        Recorded and intended codes
+    anchor_codes : (int, int)
+        Inclusive code range of anchors
+
+    Returns
+    -------
+    np.ndarray
+        (n_anchors, 2) (bdf_index, csv_index) of anchors found in both
+    """
+    bdf_anchors = np.flatnonzero(_in_range(bdf_codes, anchor_codes))
+    csv_anchors = np.flatnonzero(_in_range(csv_codes, anchor_codes))
+    pairs, start = [], 0
+    for j in csv_anchors:
+        hits = np.flatnonzero(bdf_codes[bdf_anchors[start:]] == csv_codes[j])
+        if len(hits):
+            pairs.append((bdf_anchors[start + hits[0]], j))
+            start += hits[0] + 1
+    return np.array(pairs, dtype=np.int64).reshape(-1, 2)
+
+
+def align_events(bdf_codes: np.ndarray, bdf_times: np.ndarray, csv_codes: np.ndarray,
+                 csv_times: np.ndarray, tol: float = 0.05, band: int = 16,
+                 anchor_codes: Tuple[int, int] = BLOCK_START_CODES) -> np.ndarray:
+    """
+    Align recorded and intended trigger sequences (anchor-and-extend).
+
+    Parameters
+    ----------
+    bdf_codes, bdf_times : np.ndarray
+        Recorded codes and onset times (seconds, EEG clock)
+    csv_codes, csv_times : np.ndarray
+        Intended codes and send times (seconds, PsychoPy clock)
+    tol : float
+        Maximum disagreement of a match after removing the anchor offset (s)
+    band : int
+        Band margin of the per-segment alignment (events)
+    anchor_codes : (int, int)
+        Inclusive code range of anchors (default: block starts)
+
+    Returns
+    -------
+    np.ndarray
+        (n_steps, 2) (bdf_index, csv_index) pairs in order, -1 for a gap
+    """
+    bdf_codes, csv_codes = np.asarray(bdf_codes), np.asarray(csv_codes)
+    bdf_times, csv_times = np.asarray(bdf_times, float), np.asarray(csv_times, float)
+    anchors = match_anchors(bdf_codes, csv_codes, anchor_codes)
+
+    # Segment boundaries: sequence starts, every anchor, sequence ends
+    starts = np.vstack([[0, 0], anchors])
+    stops = np.vstack([anchors, [len(bdf_codes), len(csv_codes)]])
+    if len(anchors):
+        offsets = bdf_times[anchors[:, 0]] - csv_times[anchors[:, 1]]
+        offsets = np.concatenate([offsets[:1], offsets])
+    elif len(bdf_codes) and len(csv_codes):
+        offsets = np.array([bdf_times[0] - csv_times[0]])
+    else:
+        offsets = np.zeros(1)
+
+    steps = []
+    for (b0, c0), (b1, c1), offset in zip(starts, stops, offsets):
+        segment = banded_align(bdf_codes[b0:b1], bdf_times[b0:b1] - offset,
+                               csv_codes[c0:c1], csv_times[c0:c1], tol, band)
+        segment[:, 0] = np.where(segment[:, 0] >= 0, segment[:, 0] + b0, -1)
+        segment[:, 1] = np.where(segment[:, 1] >= 0, segment[:, 1] + c0, -1)
+        steps.append(segment)
+    return np.vstack(steps)
+
+
+def alignment_blocks(steps: np.ndarray, bdf_codes: np.ndarray,
+                     csv_codes: np.ndarray) -> np.ndarray:
+    """
+    Block number (1-indexed, 0 before the first block start) of every step.
+
+    Parameters
+    ----------
+    steps : np.ndarray
+        Alignment from align_events()
+    bdf_codes, csv_codes : np.ndarray
+        Recorded and intended codes
+
+    Returns
+    -------
+    np.ndarray
+        (n_steps,) block numbers
+    """
+    bdf_codes, csv_codes = np.asarray(bdf_codes), np.asarray(csv_codes)
+    codes = np.where(steps[:, 1] >= 0, csv_codes[steps[:, 1]], bdf_codes[steps[:, 0]])
+    return event_blocks(codes)
+
+
+def alignment_report(steps: np.ndarray, bdf_codes: np.ndarray, bdf_times: np.ndarray,
+                     csv_codes: np.ndarray, csv_times: np.ndarray) -> pd.DataFrame:
+    """
+    Summarize an alignment per block.
+
+    Parameters
+    ----------
+    steps : np.ndarray
+        Alignment from align_events()
+    bdf_codes, bdf_times : np.ndarray
+        Recorded codes and onset times (seconds)
+    csv_codes, csv_times : np.ndarray
+        Intended codes and send times (seconds)
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per block: intended and recorded counts, matched, mismatched,
+        dropped and inserted triggers, mean BDF-CSV offset (ms) and clock
+        drift over the block (ppm, least-squares slope of the offset)
+    """
+    bdf_codes, csv_codes = np.asarray(bdf_codes), np.asarray(csv_codes)
+    bdf_times, csv_times = np.asarray(bdf_times, float), np.asarray(csv_times, float)
+    both = (steps[:, 0] >= 0) & (steps[:, 1] >= 0)
+    matched = both.copy()
+    matched[both] = bdf_codes[steps[both, 0]] == csv_codes[steps[both, 1]]
+
+    diffs = np.full(len(steps), np.nan)
+    diffs[matched] = bdf_times[steps[matched, 0]] - csv_times[steps[matched, 1]]
+    frame = pd.DataFrame({
+        'block': alignment_blocks(steps, bdf_codes, csv_codes),
+        'csv': steps[:, 1] >= 0,
+        'bdf': steps[:, 0] >= 0,
+        'matched': matched,
+        'mismatched': both & ~matched,
+        'dropped': steps[:, 0] < 0,
+        'inserted': steps[:, 1] < 0,
+        'csv_time': np.where(steps[:, 1] >= 0, csv_times[np.maximum(steps[:, 1], 0)], np.nan),
+        'diff': diffs,
+    })
+
+    def drift_ppm(block):
+        valid = block.dropna(subset=['diff'])
+        if len(valid) < 3 or np.ptp(valid['csv_time']) == 0:
+            return np.nan
+        return np.polyfit(valid['csv_time'], valid['diff'], 1)[0] * 1e6
+
+    grouped = frame.groupby('block')
+    report = grouped[['csv', 'bdf', 'matched', 'mismatched', 'dropped', 'inserted']].sum()
+    report['offset_ms'] = grouped['diff'].mean() * 1e3
+    report['drift_ppm'] = [drift_ppm(block) for _, block in grouped]
+    return report.reset_index()
@@ -0,0 +1,113 @@
+"""
+Band-selection utilities for filter-bank decoding.
+
+Ranks frequency bands inside a training fold from per-band tangent-space
+features that are computed once per fold and then reused, unchanged, for the
+final fit on the selected bands. Only training epochs are used for ranking,
+so the selection never sees the fold's test data.
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+from sklearn.feature_selection import f_classif
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold, cross_val_score
+
+BAND_RANKING_METHODS = ('anova', 'inner-cv')
+
+
+def score_bands(features: np.ndarray, y: np.ndarray, train_idx: Sequence[int],
+                method: str = 'anova', n_splits: int = 3,
+                random_state: Optional[int] = 0) -> np.ndarray:
+    """
+    Score every band on the training epochs of one fold.
+
+    Parameters
+    ----------
+    features : np.ndarray
+        (bands, epochs, n_features) per-band features of all epochs
+    y : np.ndarray
+        Labels of all epochs
+    train_idx : sequence of int
+        Training epoch indices (only these are used)
+    method : str
+        'anova': mean ANOVA F-statistic of the band's features (fast, default)
+        'inner-cv': inner cross-validated accuracy of an L2 logistic regression
+        on the band's features
+    n_splits : int
+        Inner folds for 'inner-cv'
+    random_state : int, optional
+        Seed of the inner split for 'inner-cv'
+
+    Returns
+    -------
+    np.ndarray
+        (bands,) scores, higher is better
+    """
+    x_train, y_train = features[:, train_idx], y[train_idx]
+
+    if method == 'anova':
+        scores = np.empty(len(features))
+        for b, band in enumerate(x_train):
+            f_stat, _ = f_classif(band, y_train)
+            scores[b] = np.nanmean(f_stat)
+        return np.nan_to_num(scores, nan=0.0)
+
+    if method == 'inner-cv':
+        inner_cv = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+        clf = LogisticRegression(max_iter=200)
+        return np.array([cross_val_score(clf, band, y_train, cv=inner_cv).mean()
+                         for band in x_train])
+
+    raise ValueError(f"Unknown band ranking method: {method} (expected one of {BAND_RANKING_METHODS})")
+
+
+def select_bands(features: np.ndarray, y: np.ndarray, train_idx: Sequence[int],
+                 top_n_bands: Optional[int], method: str = 'anova') -> np.ndarray:
+    """
+    Pick the top_n_bands best-scoring bands of one training fold.
+
+    Parameters
+    ----------
+    features : np.ndarray
+        (bands, epochs, n_features) per-band features of all epochs
+    y : np.ndarray
+        Labels of all epochs
+    train_idx : sequence of int
+        Training epoch indices
+    top_n_bands : int or None
+        Number of bands to keep (None or >= bands: keep all)
+    method : str
+        Ranking method (see score_bands())
+
+    Returns
+    -------
+    np.ndarray
+        Sorted indices of the selected bands
+    """
+    n_bands = len(features)
+    if top_n_bands is None or top_n_bands >= n_bands:
+        return np.arange(n_bands)
+    scores = score_bands(features, y, train_idx, method=method)
+    return np.sort(np.argsort(scores, kind='stable')[::-1][:top_n_bands])
+
+
+def concat_bands(features: np.ndarray, bands: Sequence[int]) -> np.ndarray:
+    """
+    Concatenate the features of selected bands per epoch.
+
+    Parameters
+    ----------
+    features : np.ndarray
+        (bands, epochs, n_features) per-band features
+    bands : sequence of int
+        Bands to keep
+
+    Returns
+    -------
+    np.ndarray
+        (epochs, len(bands) * n_features) feature matrix
+    """
+    selected = features[np.asarray(bands)]
+    return np.transpose(selected, (1, 0, 2)).reshape(selected.shape[1], -1)
@@ -0,0 +1,150 @@
+"""
+BDF utilities for reading trigger events without loading the recording.
+
+A BDF file is a text header followed by fixed-size data records; every record
+holds a block of 24-bit little-endian samples for each channel in turn. The
+Status channel is therefore one strided column of bytes in the file, which is
+memory-mapped and read on its own: a one-hour 64-channel session is decoded
+from a few MB of Status bytes instead of GBs of EEG.
+
+Trigger codes live in the low byte of the Status channel (the upper bytes hold
+BioSemi status flags), so decoding by default touches only that byte.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from .epoching_utils import decode_status
+
+BDF_SAMPLE_BYTES = 3
+
+
+def _field(header: bytes, start: int, width: int, count: int = 1):
+    """Split count consecutive fixed-width ASCII fields starting at start."""
+    return [header[start + i * width:start + (i + 1) * width].decode('ascii', 'replace').strip()
+            for i in range(count)]
+
+
+def read_bdf_header(bdf_path: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Parse the parts of a BDF header needed to locate channel samples.
+
+    Parameters
+    ----------
+    bdf_path : str or Path
+        BDF file
+
+    Returns
+    -------
+    dict
+        'header_bytes', 'n_records', 'record_duration' (s), 'labels',
+        'samples_per_record' (per channel), 'record_bytes' and 'sfreq' (per channel)
+    """
+    with open(bdf_path, 'rb') as f:
+        fixed = f.read(256)
+        n_channels = int(_field(fixed, 252, 4)[0])
+        signals = f.read(256 * n_channels)
+
+    header_bytes = int(_field(fixed, 184, 8)[0])
+    record_duration = float(_field(fixed, 244, 8)[0])
+    labels = _field(signals, 0, 16, n_channels)
+    # Per-signal fields are stored field by field: label, transducer, unit,
+    # physical min/max, digital min/max, prefiltering, then samples per record
+    samples_offset = n_channels * (16 + 80 + 8 + 8 + 8 + 8 + 8 + 80)
+    samples_per_record = np.array([int(v) for v in _field(signals, samples_offset, 8, n_channels)])
+    record_bytes = int(samples_per_record.sum()) * BDF_SAMPLE_BYTES
+
+    # The record count is -1 while recording; trust the file size for complete records
+    n_records = (Path(bdf_path).stat().st_size - header_bytes) // record_bytes
+
+    return {
+        'header_bytes': header_bytes,
+        'n_records': int(n_records),
+        'record_duration': record_duration,
+        'labels': labels,
+        'samples_per_record': samples_per_record,
+        'record_bytes': record_bytes,
+        'sfreq': samples_per_record / record_duration,
+    }
+
+
+def find_status_channel(labels) -> Optional[int]:
+    """Index of the trigger channel (Status/STIM label), or None."""
+    for i, label in enumerate(labels):
+        if 'status' in label.lower() or 'stim' in label.lower():
+            return i
+    return None
+
+
+def read_bdf_status(bdf_path: Union[str, Path], channel: Optional[str] = None,
+                    low_byte_only: bool = False) -> Tuple[np.ndarray, float]:
+    """
+    Read one channel of a BDF (by default the Status channel) via a memory map.
+
+    Parameters
+    ----------
+    bdf_path : str or Path
+        BDF file
+    channel : str, optional
+        Channel label (default: the Status/STIM channel)
+    low_byte_only : bool
+        Return only the low byte of each sample (the trigger code), reading a
+        third of the channel's bytes
+
+    Returns
+    -------
+    values : np.ndarray
+        (n_samples,) unsigned 24-bit values (int32), or uint8 low bytes
+    sfreq : float
+        Sampling frequency of the channel (Hz)
+    """
+    header = read_bdf_header(bdf_path)
+    if channel is None:
+        index = find_status_channel(header['labels'])
+        if index is None:
+            raise ValueError(f"No Status/STIM channel found in {bdf_path}")
+    else:
+        index = header['labels'].index(channel)
+
+    n_samples = int(header['samples_per_record'][index])
+    start = int(header['samples_per_record'][:index].sum()) * BDF_SAMPLE_BYTES
+    records = np.memmap(bdf_path, dtype=np.uint8, mode='r', offset=header['header_bytes'],
+                        shape=(header['n_records'], header['record_bytes']))
+    samples = records[:, start:start + n_samples * BDF_SAMPLE_BYTES].reshape(
+        header['n_records'], n_samples, BDF_SAMPLE_BYTES)
+
+    if low_byte_only:
+        values = np.ascontiguousarray(samples[..., 0]).reshape(-1)
+    else:
+        values = (samples[..., 0].astype(np.int32) | (samples[..., 1].astype(np.int32) << 8) |
+                  (samples[..., 2].astype(np.int32) << 16)).reshape(-1)
+    del records
+    return values, float(header['sfreq'][index])
+
+
+def read_bdf_events(bdf_path: Union[str, Path],
+                    mask: int = 0xFF) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    Decode trigger onsets and codes straight from a BDF's Status channel.
+
+    Parameters
+    ----------
+    bdf_path : str or Path
+        BDF file
+    mask : int
+        Bit mask of the trigger code (default: low byte, the only byte read)
+
+    Returns
+    -------
+    onsets : np.ndarray
+        Sample index of every trigger onset
+    codes : np.ndarray
+        Trigger code at each onset
+    sfreq : float
+        Sampling frequency (Hz)
+    """
+    status, sfreq = read_bdf_status(bdf_path, low_byte_only=mask <= 0xFF)
+    onsets, codes = decode_status(status, mask)
+    return onsets, codes, sfreq
@@ -0,0 +1,148 @@
+"""
+Filter-bank cache utilities.
+
+Content-addressed on-disk cache for band-filtered epoch data (or arrays derived
+from it, such as per-band covariances). Each entry is keyed
+by the SHA-256 of the epoch file plus every parameter that changes the filter-bank
+output (band edges, crop window, resample rate, notch settings, ...). Arrays are
+stored as .npy and memory-mapped on load, so repeat runs and other class pairs
+on the same subject skip filtering entirely.
+
+Cache layout:
+  <cache_dir>/
+    <key>/
+      filter_bank.npy   # (bands, epochs, channels, times)
+      covariances.npy   # (bands, epochs, channels, channels), streaming loader
+      metadata.json     # parameters the key was built from
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+import numpy as np
+
+FILTER_BANK_FILENAME = 'filter_bank.npy'
+COVARIANCES_FILENAME = 'covariances.npy'
+METADATA_FILENAME = 'metadata.json'
+
+
+def hash_file(file_path: Union[str, Path], chunk_size: int = 1 << 20) -> str:
+    """
+    Compute the SHA-256 hex digest of a file, reading it in chunks.
+
+    Parameters
+    ----------
+    file_path : str or Path
+        File to hash
+    chunk_size : int
+        Bytes read per chunk (default: 1 MiB)
+
+    Returns
+    -------
+    str
+        Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def filter_bank_key(epoch_file: Union[str, Path], params: Dict[str, Any]) -> str:
+    """
+    Build the content-addressed cache key for a filter bank.
+
+    Parameters
+    ----------
+    epoch_file : str or Path
+        Epoch file the filter bank is computed from (e.g. ica_epo.fif)
+    params : dict
+        JSON-serialisable parameters that affect the filter-bank output
+
+    Returns
+    -------
+    str
+        Hex digest identifying the cache entry
+    """
+    payload = {'epoch_file_sha256': hash_file(epoch_file), 'params': params}
+    encoded = json.dumps(payload, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def load_filter_bank(cache_dir: Union[str, Path], key: str,
+                     filename: str = FILTER_BANK_FILENAME) -> Optional[np.ndarray]:
+    """
+    Load a cached filter bank as a read-only memory map.
+
+    Parameters
+    ----------
+    cache_dir : str or Path
+        Cache root directory
+    key : str
+        Cache key from filter_bank_key()
+    filename : str
+        Array stored in the entry (default: the filter bank)
+
+    Returns
+    -------
+    np.ndarray or None
+        Memory-mapped (bands, epochs, channels, times) array, or None on a cache miss
+    """
+    path = Path(cache_dir) / key / filename
+    if not path.exists():
+        return None
+    return np.load(path, mmap_mode='r')
+
+
+def save_filter_bank(cache_dir: Union[str, Path], key: str, data: np.ndarray,
+                     params: Optional[Dict[str, Any]] = None,
+                     filename: str = FILTER_BANK_FILENAME) -> np.ndarray:
+    """
+    Store a filter bank in the cache and return it memory-mapped.
+
+    The entry is written to a temporary folder and renamed into place, so a
+    crashed run or a concurrent writer never leaves a half-written entry behind.
+
+    Parameters
+    ----------
+    cache_dir : str or Path
+        Cache root directory (created if needed)
+    key : str
+        Cache key from filter_bank_key()
+    data : np.ndarray
+        (bands, epochs, channels, times) array to store
+    params : dict, optional
+        Parameters the key was built from (saved for inspection)
+    filename : str
+        Name of the stored array (default: the filter bank)
+
+    Returns
+    -------
+    np.ndarray
+        Memory-mapped view of the stored array
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    entry = cache_dir / key
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f'.{key[:12]}_', dir=cache_dir))
+    try:
+        np.save(tmp_dir / filename, data)
+        with open(tmp_dir / METADATA_FILENAME, 'w') as f:
+            json.dump({'key': key, 'shape': list(data.shape), 'dtype': str(data.dtype),
+                       'params': params or {}}, f, indent=2)
+        os.replace(tmp_dir, entry)
+    except OSError:
+        # Another process stored the same entry first - keep theirs
+        if not (entry / filename).exists():
+            raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return np.load(entry / filename, mmap_mode='r')
@@ -0,0 +1,267 @@
+"""
+Clock utilities: mapping PsychoPy trigger times onto the EEG sample clock.
+
+The paradigm logs every trigger with its TriggerHandler.clock time (CSV) and
+the amplifier records it on its own sample clock (BDF). The two clocks differ
+by an offset (start time plus send latency) and a drift (crystal mismatch, in
+ppm), and every trigger adds some jitter. Per block, BDF onset times of the
+aligned triggers are regressed on their CSV times with a Huber-weighted line
+(the CSV clock restarts in every block, so lines are never fitted across
+blocks), so a few late or misaligned triggers do not bias the fit:
+
+    bdf_time = bdf_ref + slope * (csv_time - csv_ref)
+
+The fitted model reports offset, drift and residual jitter, is saved as JSON
+next to the session results, and maps any CSV time to an EEG sample, so
+epochs can be cut at corrected onsets (including triggers the recording
+dropped).
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .epoching_utils import event_blocks
+
+JITTER_PERCENTILES = (50, 95, 99)
+OUTLIER_FLOOR = 1e-3  # seconds
+
+
+def huber_line(x: np.ndarray, y: np.ndarray, k: float = 1.345,
+               n_iter: int = 50, tol: float = 1e-12) -> Tuple[float, float, np.ndarray]:
+    """
+    Robust straight-line fit by iteratively reweighted least squares (Huber).
+
+    Parameters
+    ----------
+    x, y : np.ndarray
+        (n,) abscissa and ordinate (x should be centred for precision)
+    k : float
+        Huber threshold in robust standard deviations (MAD)
+    n_iter : int
+        Maximum reweighting iterations
+    tol : float
+        Stop when the coefficients change less than this
+
+    Returns
+    -------
+    intercept, slope : float
+        Fitted line y = intercept + slope * x
+    weights : np.ndarray
+        (n,) final Huber weights (1 for inliers)
+    """
+    design = np.column_stack([np.ones_like(x), x])
+    weights = np.ones_like(x)
+    coef = np.zeros(2)
+    for _ in range(n_iter):
+        sqrt_w = np.sqrt(weights)
+        new_coef = np.linalg.lstsq(design * sqrt_w[:, None], y * sqrt_w, rcond=None)[0]
+        residuals = y - design @ new_coef
+        scale = 1.4826 * np.median(np.abs(residuals - np.median(residuals)))
+        converged = np.all(np.abs(new_coef - coef) < tol)
+        coef = new_coef
+        if scale == 0 or converged:
+            break
+        weights = np.minimum(1.0, k * scale / np.maximum(np.abs(residuals), 1e-300))
+    return float(coef[0]), float(coef[1]), weights
+
+
+class ClockModel:
+    """
+    Piecewise-linear (per block) map from CSV trigger times to EEG times.
+
+    The CSV clock restarts in every block, so each block has its own line.
+    Blocks with too few matched triggers for their own drift keep their own
+    offset but use the session drift, pooled over the within-block deviations
+    of all blocks; blocks without any matched trigger are not mapped.
+    """
+
+    def __init__(self, fits: Dict[int, Dict[str, float]], session: Dict[str, float]):
+        """
+        Create a model from fitted lines.
+
+        Parameters
+        ----------
+        fits : dict
+            Block number -> fit dict ('csv_ref', 'bdf_ref', 'slope', ...)
+        session : dict
+            Pooled within-block drift ('slope', 'drift_ppm', jitter)
+        """
+        self.fits = {int(block): fit for block, fit in fits.items()}
+        self.session = session
+
+    @staticmethod
+    def _fit_line(csv_times: np.ndarray, bdf_times: np.ndarray,
+                  slope: Optional[float] = None) -> Dict[str, float]:
+        """Fit one block (or only its offset, given a slope) and summarize offset, drift and jitter."""
+        csv_ref = float(csv_times[0])
+        if slope is None:
+            bdf_ref, slope, _ = huber_line(csv_times - csv_ref, bdf_times - bdf_times[0])
+            bdf_ref += float(bdf_times[0])
+        else:
+            bdf_ref = float(np.median(bdf_times - slope * (csv_times - csv_ref)))
+        residuals = bdf_times - (bdf_ref + slope * (csv_times - csv_ref))
+        jitter = np.percentile(np.abs(residuals), JITTER_PERCENTILES) * 1e3
+        # Outliers: beyond 3 robust SDs and at least OUTLIER_FLOOR (sub-sample noise is not one)
+        scale = 1.4826 * np.median(np.abs(residuals - np.median(residuals)))
+        outliers = np.abs(residuals) > max(3 * scale, OUTLIER_FLOOR)
+        fit = {
+            'csv_ref': csv_ref,
+            'bdf_ref': bdf_ref,
+            'slope': slope,
+            'n': int(len(csv_times)),
+            'n_outliers': int(np.sum(outliers)),
+            'offset_ms': (bdf_ref - csv_ref) * 1e3,
+            'drift_ppm': (slope - 1.0) * 1e6,
+            'span_s': float(csv_times[-1] - csv_ref),
+        }
+        fit.update({f'jitter_p{p}_ms': float(v) for p, v in zip(JITTER_PERCENTILES, jitter)})
+        fit['jitter_max_ms'] = float(np.max(np.abs(residuals)) * 1e3)
+        return fit
+
+    @classmethod
+    def fit(cls, csv_times: np.ndarray, bdf_times: np.ndarray, blocks: np.ndarray,
+            min_events: int = 10) -> 'ClockModel':
+        """
+        Fit the model on matched trigger pairs.
+
+        Parameters
+        ----------
+        csv_times, bdf_times : np.ndarray
+            (n,) CSV and BDF times (seconds) of the same (matched) triggers,
+            in send order (CSV times restart in every block)
+        blocks : np.ndarray
+            (n,) block number of each pair (see event_blocks())
+        min_events : int
+            Blocks with fewer pairs fit only their offset (session drift)
+
+        Returns
+        -------
+        ClockModel
+            Fitted model
+        """
+        csv_times, bdf_times = np.asarray(csv_times, float), np.asarray(bdf_times, float)
+        blocks = np.asarray(blocks)
+        if len(csv_times) < 2:
+            raise ValueError("At least two matched triggers are needed to fit a clock model")
+
+        # Session drift from the deviations around each block's mean, never across blocks
+        masks = [blocks == block for block in np.unique(blocks)]
+        pooled = [mask for mask in masks if np.sum(mask) >= 2]
+        if pooled:
+            session = cls._fit_line(np.concatenate([csv_times[m] - csv_times[m].mean() for m in pooled]),
+                                    np.concatenate([bdf_times[m] - bdf_times[m].mean() for m in pooled]))
+            session = {k: v for k, v in session.items()
+                       if k not in ('csv_ref', 'bdf_ref', 'offset_ms', 'span_s')}
+        else:
+            session = {'slope': 1.0, 'n': 0, 'drift_ppm': 0.0}  # No block with two pairs: no drift
+
+        fits = {}
+        for mask in masks:
+            block = int(blocks[mask][0])
+            own_slope = np.sum(mask) >= min_events
+            fits[block] = cls._fit_line(csv_times[mask], bdf_times[mask],
+                                        slope=None if own_slope else session['slope'])
+            fits[block]['pooled_slope'] = not own_slope
+        return cls(fits, session)
+
+    def predict(self, csv_times: np.ndarray, blocks: np.ndarray) -> np.ndarray:
+        """
+        Map CSV times to EEG times (seconds from the recording start).
+
+        Parameters
+        ----------
+        csv_times : np.ndarray
+            (n,) CSV trigger times
+        blocks : np.ndarray
+            (n,) block of each time
+
+        Returns
+        -------
+        np.ndarray
+            (n,) corrected EEG times (NaN in blocks the model has no fit for)
+        """
+        csv_times = np.asarray(csv_times, float)
+        blocks = np.asarray(blocks)
+        csv_ref, bdf_ref, slope = (np.full(len(csv_times), np.nan) for _ in range(3))
+        for block, fit in self.fits.items():
+            mask = blocks == block
+            csv_ref[mask], bdf_ref[mask], slope[mask] = fit['csv_ref'], fit['bdf_ref'], fit['slope']
+        return bdf_ref + slope * (csv_times - csv_ref)
+
+    def events(self, csv_codes: np.ndarray, csv_times: np.ndarray,
+               sfreq: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Corrected (onsets, codes) of the intended triggers, in EEG samples.
+
+        Parameters
+        ----------
+        csv_codes, csv_times : np.ndarray
+            Intended codes and CSV times of the whole session
+        sfreq : float
+            EEG sampling frequency (Hz)
+
+        Returns
+        -------
+        onsets : np.ndarray
+            Sample of every trigger on the EEG clock
+        codes : np.ndarray
+            Trigger codes (as accepted by make_beep_epochs(events=...)),
+            without the triggers of blocks the model has no fit for
+        """
+        csv_codes = np.asarray(csv_codes)
+        blocks = event_blocks(csv_codes)
+        times = self.predict(csv_times, blocks)
+        mapped = np.isfinite(times)
+        if not mapped.all():
+            print(f"[CLOCK] No fit for block(s) {sorted(set(blocks[~mapped].tolist()))}: "
+                  f"dropping {int((~mapped).sum())} trigger(s)")
+        return np.round(times[mapped] * sfreq).astype(np.int64), csv_codes[mapped].astype(np.int64)
+
+    def report(self) -> pd.DataFrame:
+        """Per-block fit summary (block 'all' is the pooled within-block drift)."""
+        rows = [{'block': block, **fit} for block, fit in sorted(self.fits.items())]
+        rows.append({'block': 'all', **self.session})
+        columns = ['block', 'n', 'n_outliers', 'offset_ms', 'drift_ppm', 'pooled_slope', 'span_s'] + \
+            [f'jitter_p{p}_ms' for p in JITTER_PERCENTILES] + ['jitter_max_ms']
+        return pd.DataFrame(rows).reindex(columns=columns)
+
+    def save(self, path: Union[str, Path]):
+        """Write the model as JSON."""
+        with open(path, 'w') as f:
+            json.dump({'blocks': {str(b): fit for b, fit in self.fits.items()},
+                       'session': self.session}, f, indent=2)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'ClockModel':
+        """Read a model written by save()."""
+        with open(path, 'r') as f:
+            data: Dict[str, Any] = json.load(f)
+        return cls(data['blocks'], data['session'])
+
+
+def load_sent_triggers(results_dir: Union[str, Path]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Load the triggers a session sent to the EEG from its trigger CSV.
+
+    Parameters
+    ----------
+    results_dir : str or Path
+        Session results folder containing *_triggers.csv
+
+    Returns
+    -------
+    codes : np.ndarray
+        Trigger codes in send order
+    times : np.ndarray
+        TriggerHandler clock times (seconds, restarting in every block)
+    """
+    csv_files = sorted(Path(results_dir).glob('*_triggers.csv'))
+    if not csv_files:
+        raise FileNotFoundError(f"No trigger CSV file found in {results_dir}")
+    df = pd.read_csv(csv_files[0])
+    df = df[df['sent_to_eeg'] == 'yes']  # Rows are in send order; the clock restarts per block
+    return df['trigger_code'].to_numpy(np.int64), df['timestamp_psychopy'].to_numpy(float)
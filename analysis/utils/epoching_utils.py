@@ -0,0 +1,245 @@
+"""
+Epoching utilities for beep-level (repetition) analysis.
+
+Builds one epoch per beep (codes 31-38) straight from a continuous recording:
+the Status channel is decoded once into onset/code arrays, every beep is
+labelled with its block (61-70), block-local trial (101-110) and the
+concept/category the randomization protocol assigned to that trial, and all
+windows are cut with a single fancy-index gather into an mne.EpochsArray.
+No step loops over events in Python.
+
+Each concept has one event id (its name), so the classifier's event-code
+labels are concept labels and epochs['eye'] selects every repetition of
+'eye'. Block, trial, beep number and category live only in epochs.metadata
+(e.g. epochs['category == "A"'] or epochs['beep == 1']).
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import mne
+
+from .preprocessing_utils import eeg_picks, external_channel_types
+
+# Trigger code ranges (see paradigm/utils/trigger_utils.py)
+BEEP_CODES = (31, 38)
+BLOCK_START_CODES = (61, 70)
+TRIAL_START_CODES = (101, 110)
+
+
+def decode_status(status: np.ndarray, mask: int = 0xFF) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decode trigger onsets from a BioSemi Status channel.
+
+    Only the masked (low) byte carries trigger codes; an onset is any sample
+    where it changes to a non-zero value.
+
+    Parameters
+    ----------
+    status : np.ndarray
+        (n_samples,) raw Status channel values, or uint8 low bytes
+    mask : int
+        Bit mask applied before decoding (default: low byte)
+
+    Returns
+    -------
+    onsets : np.ndarray
+        Sample index of every trigger onset
+    codes : np.ndarray
+        Trigger code at each onset
+    """
+    status = np.asarray(status)
+    if status.dtype == np.uint8 and mask == 0xFF:
+        low = status  # Low bytes already (see bdf_utils.read_bdf_status)
+    else:
+        low = status.astype(np.int64) & mask
+    onsets = np.flatnonzero(low[1:] != low[:-1]) + 1
+    codes = low[onsets].astype(np.int64)
+    keep = codes != 0
+    return onsets[keep], codes[keep]
+
+
+def _in_range(codes: np.ndarray, code_range: Tuple[int, int]) -> np.ndarray:
+    """Boolean mask of codes within an inclusive (low, high) range."""
+    return (codes >= code_range[0]) & (codes <= code_range[1])
+
+
+def _last_true(mask: np.ndarray) -> np.ndarray:
+    """Index of the most recent True at or before each position (-1 if none)."""
+    return np.maximum.accumulate(np.where(mask, np.arange(len(mask)), -1))
+
+
+def event_blocks(codes: np.ndarray) -> np.ndarray:
+    """Block number (1-indexed, 0 before the first block start) of every event."""
+    codes = np.asarray(codes)
+    last = _last_true(_in_range(codes, BLOCK_START_CODES))
+    return np.where(last >= 0, codes[np.maximum(last, 0)] - BLOCK_START_CODES[0] + 1, 0)
+
+
+def protocol_tables(protocol: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray, list]:
+    """
+    Lay out a randomization protocol as (block, trial) lookup tables.
+
+    Parameters
+    ----------
+    protocol : dict
+        Randomization protocol (see paradigm/utils/block_utils.py)
+
+    Returns
+    -------
+    concept_idx : np.ndarray
+        (n_blocks, max_trials) index into concepts, -1 where no trial exists
+    category : np.ndarray
+        (n_blocks, max_trials) category letter of every trial ('' if none)
+    concepts : list of str
+        Sorted concept names
+    """
+    blocks = protocol.get('all_blocks_trials', [])
+    concepts = sorted({trial['concept'] for block in blocks for trial in block})
+    lookup = {concept: i for i, concept in enumerate(concepts)}
+    max_trials = max((len(block) for block in blocks), default=0)
+
+    concept_idx = np.full((len(blocks), max_trials), -1)
+    category = np.full((len(blocks), max_trials), '', dtype=object)
+    for b, block in enumerate(blocks):
+        concept_idx[b, :len(block)] = [lookup[trial['concept']] for trial in block]
+        category[b, :len(block)] = [trial['category'] for trial in block]
+    return concept_idx, category, concepts
+
+
+def label_beep_events(onsets: np.ndarray, codes: np.ndarray,
+                      protocol: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Label every beep onset with its block, trial, beep number, concept and category.
+
+    Each beep inherits the most recent block-start (61-70) and trial-start
+    (101-110) codes before it; beeps without both, or outside the protocol,
+    are dropped.
+
+    Parameters
+    ----------
+    onsets : np.ndarray
+        Onset sample of every decoded trigger
+    codes : np.ndarray
+        Code of every decoded trigger
+    protocol : dict
+        Randomization protocol of the session
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per beep: sample, block (0-indexed), trial (block-local,
+        0-indexed), beep (1-8), concept, category
+    """
+    onsets, codes = np.asarray(onsets), np.asarray(codes)
+    is_beep = _in_range(codes, BEEP_CODES)
+    last_block = _last_true(_in_range(codes, BLOCK_START_CODES))[is_beep]
+    last_trial = _last_true(_in_range(codes, TRIAL_START_CODES))[is_beep]
+
+    # A beep belongs to a trial only if that trial started within the current block
+    valid = (last_block >= 0) & (last_trial > last_block)
+    positions = np.flatnonzero(is_beep)[valid]
+    block = codes[last_block[valid]] - BLOCK_START_CODES[0]
+    trial = codes[last_trial[valid]] - TRIAL_START_CODES[0]
+
+    concept_idx, category, concepts = protocol_tables(protocol)
+    in_protocol = (block < concept_idx.shape[0]) & (trial < concept_idx.shape[1])
+    concept = np.full(len(block), -1)
+    concept[in_protocol] = concept_idx[block[in_protocol], trial[in_protocol]]
+    keep = concept >= 0
+
+    return pd.DataFrame({
+        'sample': onsets[positions][keep],
+        'block': block[keep],
+        'trial': trial[keep],
+        'beep': codes[positions][keep] - BEEP_CODES[0] + 1,
+        'concept': np.array(concepts, dtype=object)[concept[keep]] if concepts else [],
+        'category': category[block[keep], trial[keep]],
+    })
+
+
+def gather_windows(data: np.ndarray, onsets: np.ndarray, start: int,
+                   n_times: int) -> np.ndarray:
+    """
+    Cut fixed-length windows around onsets with one fancy-index gather.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        (channels, samples) continuous data
+    onsets : np.ndarray
+        (n_events,) onset samples; windows must lie inside data
+    start : int
+        Window start relative to onset (samples, e.g. negative for a baseline)
+    n_times : int
+        Window length (samples)
+
+    Returns
+    -------
+    np.ndarray
+        (n_events, channels, n_times) epochs
+    """
+    index = np.asarray(onsets)[:, None] + start + np.arange(n_times)
+    return np.moveaxis(data[:, index], 0, 1)
+
+
+def make_beep_epochs(raw: mne.io.BaseRaw, protocol: Dict[str, Any], tmin: float = -0.3,
+                     tmax: float = 1.7, stim_channel: str = 'Status',
+                     events: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+                     data: Optional[np.ndarray] = None) -> mne.EpochsArray:
+    """
+    Build beep-level epochs from a continuous recording and its protocol.
+
+    Parameters
+    ----------
+    raw : mne.io.BaseRaw
+        Continuous recording (BDF or a preprocessed copy)
+    protocol : dict
+        Randomization protocol of the session
+    tmin, tmax : float
+        Epoch window around each beep (seconds, tmax included)
+    stim_channel : str
+        Status channel decoded when events is not given
+    events : (np.ndarray, np.ndarray), optional
+        Precomputed (onsets, codes) in raw samples, e.g. from a drift-corrected
+        decoder; the Status channel is not read when given
+    data : np.ndarray, optional
+        (EEG channels, samples) array to cut instead of the raw EEG, e.g. a
+        memory-mapped preprocessed copy of the recording
+
+    Returns
+    -------
+    mne.EpochsArray
+        One epoch per beep (EEG channels, bads kept and marked, EXG typed
+        as 'eog'); one event
+        id per concept, everything else in metadata
+    """
+    if events is None:
+        events = decode_status(raw.get_data(picks=[stim_channel])[0])
+    beeps = label_beep_events(*events, protocol)
+
+    sfreq = raw.info['sfreq']
+    start = int(round(tmin * sfreq))
+    n_times = int(round(tmax * sfreq)) - start + 1
+    inside = (beeps['sample'] + start >= 0) & (beeps['sample'] + start + n_times <= raw.n_times)
+    if not inside.all():
+        print(f"[EPOCHS] Dropping {int((~inside).sum())} beep(s) too close to the recording edges")
+    beeps = beeps[inside].reset_index(drop=True)
+
+    picks = eeg_picks(raw.info)
+    if data is None:
+        data = raw.get_data(picks=picks)  # One read of the continuous data
+    epochs_data = gather_windows(data, beeps['sample'].to_numpy(), start, n_times)
+
+    names = beeps['concept']
+    event_names = sorted(names.unique())
+    event_id = {name: i + 1 for i, name in enumerate(event_names)}
+    mne_events = np.column_stack([beeps['sample'].to_numpy() + raw.first_samp,
+                                  np.zeros(len(beeps), dtype=int),
+                                  names.map(event_id).to_numpy()])
+
+    info = mne.pick_info(raw.info, picks)
+    epochs = mne.EpochsArray(epochs_data, info, events=mne_events, tmin=start / sfreq,
+                             event_id=event_id, metadata=beeps, verbose=False)
+    return epochs.set_channel_types(external_channel_types(info), verbose=False)
@@ -0,0 +1,111 @@
+"""
+Memory-bounded epoch loading utilities.
+
+Streams an unloaded (preload=False) Epochs object from disk in chunks of
+epochs and reduces every chunk to per-band covariance matrices straight away,
+so only one chunk of raw and band-filtered time series is in memory at a time
+and the only array that grows with the recording is the
+(bands, epochs, channels, channels) covariance tensor.
+
+Preprocessing, filtering, notching and covariance estimation all act on each
+epoch independently, so the result is identical to processing the fully
+loaded epochs in one go.
+"""
+
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+import mne
+
+from .filterbank_utils import FilterBank, apply_iir_notch
+
+
+def iter_epoch_chunks(epochs: mne.BaseEpochs, chunk_size: int = 64,
+                      transform: Optional[Callable[[mne.BaseEpochs], mne.BaseEpochs]] = None
+                      ) -> Iterator[Tuple[slice, mne.BaseEpochs]]:
+    """
+    Read epochs from disk a chunk at a time.
+
+    Parameters
+    ----------
+    epochs : mne.BaseEpochs
+        Epochs read with preload=False
+    chunk_size : int
+        Epochs loaded per chunk
+    transform : callable, optional
+        Per-chunk preprocessing, called on the loaded chunk (e.g. drop bad
+        channels, baseline, resample); must act on each epoch independently
+
+    Yields
+    ------
+    (slice, mne.BaseEpochs)
+        Position of the chunk within epochs and the loaded, transformed chunk
+    """
+    for start in range(0, len(epochs), chunk_size):
+        chunk_slice = slice(start, min(start + chunk_size, len(epochs)))
+        # Per-chunk "Loading data" / baseline messages would repeat for every chunk
+        with mne.utils.use_log_level('WARNING'):
+            chunk = epochs[chunk_slice].load_data()
+            if transform is not None:
+                chunk = transform(chunk)
+        yield chunk_slice, chunk
+
+
+def stream_band_covariances(epochs: mne.BaseEpochs, filter_bank: FilterBank,
+                            covariance: Callable[[np.ndarray], np.ndarray],
+                            crop: Optional[slice] = None,
+                            notches: Optional[Dict[int, Sequence[float]]] = None,
+                            transform: Optional[Callable[[mne.BaseEpochs], mne.BaseEpochs]] = None,
+                            chunk_size: int = 64, out: Optional[np.ndarray] = None,
+                            dtype: Optional[np.dtype] = None) -> np.ndarray:
+    """
+    Compute per-band covariance matrices of all epochs without loading them all.
+
+    Parameters
+    ----------
+    epochs : mne.BaseEpochs
+        Epochs read with preload=False
+    filter_bank : FilterBank
+        Bank applied to each chunk (its sfreq must match the transformed data)
+    covariance : callable
+        Maps (bands, epochs, channels, times) to (bands, epochs, channels,
+        channels), e.g. lwf_covariances
+    crop : slice, optional
+        Time samples kept after filtering (default: all)
+    notches : dict, optional
+        Band index -> frequencies to notch out of that band
+    transform : callable, optional
+        Per-chunk preprocessing (see iter_epoch_chunks())
+    chunk_size : int
+        Epochs processed per chunk (bounds memory)
+    out : np.ndarray, optional
+        Preallocated (bands, epochs, channels, channels) buffer
+    dtype : np.dtype, optional
+        Precision of the filtered chunks and of out (default: float64)
+
+    Returns
+    -------
+    np.ndarray
+        (bands, epochs, channels, channels) covariance matrices
+    """
+    notches = notches or {}
+    dtype = dtype or (out.dtype if out is not None else np.float64)
+    bank = None
+    for chunk_slice, chunk in iter_epoch_chunks(epochs, chunk_size, transform):
+        data = chunk.get_data()
+        if out is None:
+            n_ch = data.shape[1]
+            out = np.empty((len(filter_bank.bands), len(epochs), n_ch, n_ch), dtype=dtype)
+        n_times = len(np.arange(data.shape[-1])[crop if crop is not None else slice(None)])
+        if bank is None or bank.shape[1] < len(data) or bank.shape[-1] != n_times:
+            bank = np.empty((len(filter_bank.bands), len(data)) + data.shape[1:2] + (n_times,),
+                            dtype=dtype)
+
+        # Reuse one (bands, chunk, channels, times) buffer for every chunk
+        chunk_bank = filter_bank.apply(data, crop=crop, out=bank[:, :len(data)])
+        for b, band_freqs in notches.items():
+            for freq in band_freqs:
+                chunk_bank[b] = apply_iir_notch(chunk_bank[b], filter_bank.sfreq, freq)
+        out[:, chunk_slice] = covariance(chunk_bank)  # All bands in one batched call
+
+    return out
@@ -0,0 +1,56 @@
+"""
+Shared parameters of the tangent-space logistic regression pipeline.
+
+The classifier (analysis/tangent_space_logistic_regressor_classifier.py) and
+the benchmark (scripts/benchmark_analysis_pipeline.py) both read their
+filter-bank bands, notch frequencies, epoch windows and C grid from here, so
+a benchmark run always times the pipeline as it is actually configured.
+POWER_NOISE is also the default notch of scripts/preprocess_bdf.py, so the
+continuous recording and the filter bank are notched at the same mains
+frequency.
+"""
+
+from typing import List, Tuple
+
+POWER_NOISE = [60]  # Power line noise frequency (Hz); the one setting for every notch
+MAX_FREQ = 127  # Maximum frequency limit (Hz)
+SFREQ = 256  # Sampling frequency after resampling (Hz)
+BASELINE = (-.3, 0)  # Baseline correction window (s)
+CROP = (0.1, 1.7)  # Decoding window (s)
+C_GRID = (1e-2, 1e2, 9)  # Default regularization path: C_MIN, C_MAX, N_CS
+LR_MAX_ITER = 600  # saga iterations of the L1 logistic regression
+CV_SPLITS = 10  # Stratified cross-validation folds
+CV_RANDOM_STATE = 36
+
+
+def get_possible_freqs(min_freq: int = 2, freq_step: int = 6, freq_size: int = 8,
+                       max_freq: int = MAX_FREQ) -> List[Tuple[int, int]]:
+    """
+    Generate overlapping frequency bands for filtering.
+
+    Parameters
+    ----------
+    min_freq : int
+        Lower edge of the first band (Hz)
+    freq_step : int
+        Step between band lower edges (Hz)
+    freq_size : int
+        Band width (Hz)
+    max_freq : int
+        No band extends above this frequency (Hz)
+
+    Returns
+    -------
+    list of tuple
+        Sorted (low, high) bands
+    """
+    frequency_ranges = []
+    start_freq = min_freq
+    while start_freq < max_freq:
+        end_freq = start_freq + freq_size
+        if end_freq <= max_freq:
+            frequency_ranges.append((start_freq, end_freq))
+        start_freq += freq_step
+
+    unique_ranges = sorted(list(set(frequency_ranges)))
+    return unique_ranges
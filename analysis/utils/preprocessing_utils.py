@@ -0,0 +1,352 @@
+"""
+Preprocessing utilities for continuous BDF recordings.
+
+Streams a session through high-pass, notch and average reference in
+overlapping chunks instead of loading the whole recording. The average is
+taken over the scalp electrodes only: BioSemi's external EXG channels (EOG,
+mastoids) are kept in the output and re-referenced like every channel, but
+they are not scalp EEG, so they do not enter the average itself. The high-pass and
+notch kernels are MNE's zero-phase FIR designs convolved into a single kernel,
+so every chunk is filtered in one FFT convolution. Each chunk reads half a
+kernel of extra samples on both sides; the result is therefore identical to
+filtering the full recording at once, and the recording edges are
+odd-reflected as MNE's 'reflect_limited' padding does. Chunks are independent
+and can run in a process pool, each writing its slice of one on-disk array.
+
+ICA is fitted on a decimated copy of the filtered recording and applied to
+the epochs only.
+
+Every stage writes a checkpoint under a key built from its inputs and
+parameters (see CheckpointStore), so a rerun skips the stages whose inputs
+did not change:
+  raw_filtered.npy   # (EEG channels, samples) filtered, re-referenced data
+  raw_ica.fif        # ICA solution
+  ica_epo.fif        # cleaned epochs
+  checkpoints.json   # key and parameters of every finished stage
+"""
+
+import json
+import os
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import mne
+from mne.filter import create_filter
+from mne.preprocessing import ICA
+from scipy.signal import fftconvolve
+
+from .results_utils import run_key
+from .scheduler_utils import run_tasks
+
+CHECKPOINTS_FILENAME = 'checkpoints.json'
+EXTERNAL_CHANNEL_PREFIX = 'EXG'  # BioSemi external electrodes (typed as EEG by read_raw_bdf)
+STAGE_FILES = {
+    'filtered': 'raw_filtered.npy',
+    'ica': 'raw_ica.fif',
+    'epochs': 'ica_epo.fif',
+}
+
+
+def design_preprocessing_kernel(sfreq: float, l_freq: Optional[float],
+                                notch_freqs: Sequence[float] = (),
+                                trans_bandwidth: float = 1.0) -> np.ndarray:
+    """
+    Combine a high-pass and power-line notches into one zero-phase FIR kernel.
+
+    Parameters
+    ----------
+    sfreq : float
+        Sampling frequency (Hz)
+    l_freq : float, optional
+        High-pass edge (Hz, None for no high-pass)
+    notch_freqs : sequence of float
+        Frequencies to remove (Hz); notch widths as mne.filter.notch_filter
+    trans_bandwidth : float
+        Total transition bandwidth of each notch (Hz, default as in MNE)
+
+    Returns
+    -------
+    np.ndarray
+        Odd-length symmetric kernel (a unit impulse if no filter is requested)
+    """
+    kernel = np.ones(1)
+    if l_freq is not None:
+        kernel = create_filter(None, sfreq, l_freq, None, verbose=False)
+    for freq in notch_freqs:
+        half_width = freq / 400.0 + trans_bandwidth / 2.0
+        band_stop = create_filter(None, sfreq, freq + half_width, freq - half_width,
+                                  l_trans_bandwidth=trans_bandwidth / 2.0,
+                                  h_trans_bandwidth=trans_bandwidth / 2.0, verbose=False)
+        kernel = np.convolve(kernel, band_stop)
+    return kernel
+
+
+@lru_cache(maxsize=2)
+def _open_raw(bdf_file: str) -> mne.io.BaseRaw:
+    """Open a BDF without loading it (once per process)."""
+    return mne.io.read_raw_bdf(bdf_file, preload=False, verbose=False)
+
+
+def eeg_picks(info: mne.Info) -> np.ndarray:
+    """EEG channels kept by preprocessing, EXG included (bads kept and marked)."""
+    return mne.pick_types(info, eeg=True, eog=True, exclude=[])
+
+
+def external_channel_types(info: mne.Info) -> Dict[str, str]:
+    """
+    Channel types that mark the EXG channels as non-scalp.
+
+    Parameters
+    ----------
+    info : mne.Info
+        Measurement info of the recording
+
+    Returns
+    -------
+    dict
+        Mapping for set_channel_types() that retypes every EXG channel to
+        'eog', so pick('eeg') and ICA fitting keep only the scalp channels
+    """
+    return {name: 'eog' for name in info['ch_names']
+            if name.upper().startswith(EXTERNAL_CHANNEL_PREFIX)}
+
+
+def reference_picks(info: mne.Info) -> np.ndarray:
+    """
+    Channels averaged for the average reference.
+
+    Parameters
+    ----------
+    info : mne.Info
+        Measurement info of the recording
+
+    Returns
+    -------
+    np.ndarray
+        Positions within eeg_picks(info) of the scalp channels, i.e. without
+        the EXG channels (all EEG channels if there are no others)
+    """
+    names = [info['ch_names'][pick] for pick in eeg_picks(info)]
+    scalp = np.array([i for i, name in enumerate(names)
+                      if not name.upper().startswith(EXTERNAL_CHANNEL_PREFIX)], dtype=int)
+    return scalp if len(scalp) else np.arange(len(names))
+
+
+def chunk_spans(n_times: int, chunk_size: int) -> List[Tuple[int, int]]:
+    """
+    Split a recording into consecutive (start, stop) sample spans.
+
+    Parameters
+    ----------
+    n_times : int
+        Samples in the recording
+    chunk_size : int
+        Samples per chunk
+
+    Returns
+    -------
+    list of (int, int)
+        Spans covering the recording
+    """
+    return [(start, min(start + chunk_size, n_times))
+            for start in range(0, n_times, chunk_size)]
+
+
+def _pad_edges(x: np.ndarray, pad_before: int, pad_after: int) -> np.ndarray:
+    """Odd-reflect a (channels, times) chunk at the recording edges, zeros beyond."""
+    n_reflect_before = min(pad_before, x.shape[-1] - 1)
+    n_reflect_after = min(pad_after, x.shape[-1] - 1)
+    return np.concatenate([
+        np.zeros((len(x), pad_before - n_reflect_before)),
+        2 * x[:, :1] - x[:, n_reflect_before:0:-1],
+        x,
+        2 * x[:, -1:] - x[:, -2:-n_reflect_after - 2:-1],
+        np.zeros((len(x), pad_after - n_reflect_after)),
+    ], axis=-1)
+
+
+def filter_chunk(span: Tuple[int, int], bdf_file: str, out_file: str, kernel: np.ndarray,
+                 reference: bool = True):
+    """
+    Filter and re-reference one span of the recording into the output array.
+
+    Parameters
+    ----------
+    span : (int, int)
+        (start, stop) samples written by this call
+    bdf_file : str
+        Continuous recording
+    out_file : str
+        (EEG channels, samples) .npy array opened in place
+    kernel : np.ndarray
+        Zero-phase kernel from design_preprocessing_kernel()
+    reference : bool
+        Subtract the average of the scalp channels (see reference_picks())
+    """
+    start, stop = span
+    raw = _open_raw(bdf_file)
+    half = (len(kernel) - 1) // 2
+
+    # Overlap of half a kernel on both sides makes the chunk output exact
+    read_start, read_stop = max(start - half, 0), min(stop + half, raw.n_times)
+    x = raw.get_data(picks=eeg_picks(raw.info), start=read_start, stop=read_stop)
+    pad_before, pad_after = half - (start - read_start), half - (read_stop - stop)
+    if pad_before or pad_after:
+        x = _pad_edges(x, pad_before, pad_after)
+
+    filtered = fftconvolve(x, kernel[None, :], mode='valid', axes=-1)
+    if reference:
+        filtered -= filtered[reference_picks(raw.info)].mean(axis=0, keepdims=True)
+
+    out = np.load(out_file, mmap_mode='r+')
+    out[:, start:stop] = filtered
+    out.flush()
+
+
+def filter_continuous(bdf_file: Union[str, Path], out_file: Union[str, Path],
+                      kernel: np.ndarray, reference: bool = True, chunk_seconds: float = 60.0,
+                      dtype: np.dtype = np.float32, n_workers: int = 1,
+                      threads_per_task: int = 1) -> np.ndarray:
+    """
+    Filter a whole recording chunk by chunk into a memory-mapped .npy file.
+
+    The array is written under a temporary name and renamed when every chunk
+    succeeded, so an interrupted run never leaves a partial checkpoint.
+
+    Parameters
+    ----------
+    bdf_file : str or Path
+        Continuous recording
+    out_file : str or Path
+        Output .npy file
+    kernel : np.ndarray
+        Zero-phase kernel from design_preprocessing_kernel()
+    reference : bool
+        Re-reference to the average of the scalp channels (EXG excluded)
+    chunk_seconds : float
+        Samples written per chunk, in seconds (does not change the result)
+    dtype : np.dtype
+        Stored precision (float32 holds the 24-bit BDF resolution)
+    n_workers : int
+        Worker processes filtering chunks in parallel
+    threads_per_task : int
+        Thread budget of each worker
+
+    Returns
+    -------
+    np.ndarray
+        Read-only memory map of the (EEG channels, samples) filtered data
+    """
+    bdf_file, out_file = str(bdf_file), Path(out_file)
+    raw = _open_raw(bdf_file)
+    shape = (len(eeg_picks(raw.info)), int(raw.n_times))
+    spans = chunk_spans(raw.n_times, max(int(chunk_seconds * raw.info['sfreq']), 1))
+
+    tmp_file = out_file.with_name(f'.{out_file.stem}.tmp.npy')
+    np.lib.format.open_memmap(tmp_file, mode='w+', dtype=dtype, shape=shape).flush()
+    done = run_tasks(partial(filter_chunk, bdf_file=bdf_file, out_file=str(tmp_file),
+                             kernel=kernel, reference=reference),
+                     spans, n_workers, threads_per_task)
+    if len(done) != len(spans):
+        tmp_file.unlink(missing_ok=True)
+        raise RuntimeError(f"{len(spans) - len(done)} of {len(spans)} chunks failed")
+    os.replace(tmp_file, out_file)
+    return np.load(out_file, mmap_mode='r')
+
+
+def fit_ica_decimated(data: np.ndarray, info: mne.Info, decim: int = 4,
+                      n_components: Optional[Union[int, float]] = 0.999,
+                      method: str = 'fastica', random_state: int = 97) -> ICA:
+    """
+    Fit ICA on a decimated copy of continuous data.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        (channels, samples) filtered data, e.g. the memory-mapped checkpoint
+    info : mne.Info
+        Measurement info of the channels in data (only EEG-typed channels
+        are fitted, see external_channel_types())
+    decim : int
+        Keep every decim-th sample for fitting (data must be high-passed)
+    n_components : int or float, optional
+        Passed to mne.preprocessing.ICA (a float keeps that fraction of the
+        variance, which also drops the rank lost to the average reference)
+    method : str
+        ICA algorithm
+    random_state : int
+        Seed of the ICA fit
+
+    Returns
+    -------
+    mne.preprocessing.ICA
+        Fitted ICA
+    """
+    decimated = np.asarray(data[:, ::decim], dtype=np.float64)
+    fit_info = mne.create_info(info['ch_names'], info['sfreq'] / decim, info.get_channel_types())
+    raw = mne.io.RawArray(decimated, fit_info, verbose=False)
+    ica = ICA(n_components=n_components, method=method, random_state=random_state,
+              max_iter='auto')
+    ica.fit(raw, verbose=False)
+    return ica
+
+
+class CheckpointStore:
+    """
+    Checkpoints of the preprocessing stages of one recording.
+
+    A stage is current when its output file exists and was written with the
+    same key; keys chain the key of the previous stage, so a change upstream
+    invalidates everything after it.
+    """
+
+    def __init__(self, directory: Union[str, Path]):
+        """
+        Open (or create) the checkpoint folder.
+
+        Parameters
+        ----------
+        directory : str or Path
+            Folder holding the stage outputs and checkpoints.json
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.index_file = self.directory / CHECKPOINTS_FILENAME
+        self.records: Dict[str, Dict[str, Any]] = {}
+        if self.index_file.exists():
+            with open(self.index_file, 'r') as f:
+                self.records = json.load(f)
+
+    def path(self, stage: str) -> Path:
+        """Output file of a stage."""
+        return self.directory / STAGE_FILES[stage]
+
+    def key(self, params: Dict[str, Any]) -> str:
+        """Key of a stage run with these (JSON-serialisable) inputs and parameters."""
+        return run_key(params)
+
+    def is_current(self, stage: str, key: str) -> bool:
+        """Whether the stage output exists and was written with this key."""
+        record = self.records.get(stage)
+        return record is not None and record['key'] == key and self.path(stage).exists()
+
+    def record(self, stage: str, key: str, params: Dict[str, Any]):
+        """
+        Mark a stage as finished.
+
+        Parameters
+        ----------
+        stage : str
+            Stage name (see STAGE_FILES)
+        key : str
+            Key the output was written with
+        params : dict
+            Inputs and parameters the key was built from (saved for inspection)
+        """
+        self.records[stage] = {'key': key, 'file': STAGE_FILES[stage], 'params': params}
+        tmp_file = self.index_file.with_suffix('.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump(self.records, f, indent=2)
+        os.replace(tmp_file, self.index_file)
@@ -0,0 +1,208 @@
+"""
+Results store utilities for the offline classifiers.
+
+Append-only SQLite store with one row per subject/fold (score, selected bands,
+coefficients, test indices, timing) and one row per finished subject. A
+subject's fold rows and its completion row are written in a single
+transaction, so a crash never leaves a half-recorded subject, and reruns with
+the same configuration can skip every subject already finished.
+
+Rows are never updated or deleted: recomputing a subject appends new rows and
+readers use the most recent ones.
+
+Store layout:
+  folds     (run_key, subject, fold, score, bands, coef, intercept, test_idx, seconds, created,
+             path)
+  subjects  (run_key, subject, n_folds, median_score, seconds, created)
+  runs      (run_key, config, created)
+"""
+
+import hashlib
+import io
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set, Union
+
+import numpy as np
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_key TEXT PRIMARY KEY,
+    config TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS folds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_key TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    fold INTEGER NOT NULL,
+    score REAL NOT NULL,
+    bands TEXT NOT NULL,
+    coef BLOB,
+    intercept BLOB,
+    test_idx BLOB,
+    seconds REAL,
+    created REAL NOT NULL,
+    path TEXT
+);
+CREATE TABLE IF NOT EXISTS subjects (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_key TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    n_folds INTEGER NOT NULL,
+    median_score REAL NOT NULL,
+    seconds REAL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS folds_run_subject ON folds (run_key, subject);
+CREATE INDEX IF NOT EXISTS subjects_run_subject ON subjects (run_key, subject);
+"""
+
+
+def run_key(config: Dict[str, Any]) -> str:
+    """
+    Build the key identifying one analysis configuration.
+
+    Parameters
+    ----------
+    config : dict
+        JSON-serialisable parameters that affect the results (classes, bands, ...)
+
+    Returns
+    -------
+    str
+        Hex digest of the configuration
+    """
+    encoded = json.dumps(config, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _to_blob(array: Optional[np.ndarray]) -> Optional[bytes]:
+    """Serialise an array as .npy bytes (keeps dtype and shape)."""
+    if array is None:
+        return None
+    buffer = io.BytesIO()
+    np.save(buffer, np.asarray(array), allow_pickle=False)
+    return buffer.getvalue()
+
+
+def _from_blob(blob: Optional[bytes]) -> Optional[np.ndarray]:
+    """Deserialise .npy bytes written by _to_blob."""
+    if blob is None:
+        return None
+    return np.load(io.BytesIO(blob), allow_pickle=False)
+
+
+class ResultsStore:
+    """
+    Append-only per-subject/fold results store for one analysis configuration.
+
+    Only the process that owns the store writes to it (e.g. the parent of a
+    worker pool, from its on_result callback).
+    """
+
+    def __init__(self, db_path: Union[str, Path], config: Dict[str, Any]):
+        """
+        Open (or create) the store and register the configuration.
+
+        Parameters
+        ----------
+        db_path : str or Path
+            SQLite database file
+        config : dict
+            JSON-serialisable parameters of this run (see run_key())
+        """
+        self.db_path = Path(db_path)
+        self.config = config
+        self.run_key = run_key(config)
+        self.conn = sqlite3.connect(str(self.db_path))
+        with self.conn:
+            self.conn.executescript(_SCHEMA)
+            # Stores created before the regularization path was recorded
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(folds)")}
+            if 'path' not in columns:
+                self.conn.execute("ALTER TABLE folds ADD COLUMN path TEXT")
+            self.conn.execute(
+                "INSERT OR IGNORE INTO runs (run_key, config, created) VALUES (?, ?, ?)",
+                (self.run_key, json.dumps(config, sort_keys=True), time.time()))
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+
+    def finished_subjects(self) -> Set[str]:
+        """
+        Get the subjects already finished with this configuration.
+
+        Returns
+        -------
+        set of str
+            Subject identifiers
+        """
+        rows = self.conn.execute(
+            "SELECT DISTINCT subject FROM subjects WHERE run_key = ?", (self.run_key,))
+        return {row[0] for row in rows}
+
+    def add_subject(self, subject: str, folds: Sequence[Dict[str, Any]],
+                    seconds: Optional[float] = None):
+        """
+        Append a finished subject's fold results in one transaction.
+
+        Parameters
+        ----------
+        subject : str
+            Subject identifier
+        folds : sequence of dict
+            Per-fold results with keys 'score', 'bands' and optionally 'coef',
+            'intercept', 'test_idx', 'seconds' and 'path' (dict of
+            JSON-serialisable lists, e.g. the regularization path)
+        seconds : float, optional
+            Total wall time of the subject
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO folds (run_key, subject, fold, score, bands, coef, intercept,"
+                " test_idx, seconds, created, path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(self.run_key, subject, i, float(fold['score']),
+                  json.dumps([int(b) for b in fold['bands']]),
+                  _to_blob(fold.get('coef')), _to_blob(fold.get('intercept')),
+                  _to_blob(fold.get('test_idx')), fold.get('seconds'), now,
+                  json.dumps(fold['path']) if fold.get('path') else None)
+                 for i, fold in enumerate(folds)])
+            self.conn.execute(
+                "INSERT INTO subjects (run_key, subject, n_folds, median_score, seconds, created)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (self.run_key, subject, len(folds),
+                 float(np.median([fold['score'] for fold in folds])), seconds, now))
+
+    def load_subject(self, subject: str) -> List[Dict[str, Any]]:
+        """
+        Load the most recent fold results of a subject.
+
+        Parameters
+        ----------
+        subject : str
+            Subject identifier
+
+        Returns
+        -------
+        list of dict
+            Per-fold results (empty if the subject is not finished)
+        """
+        row = self.conn.execute(
+            "SELECT created FROM subjects WHERE run_key = ? AND subject = ?"
+            " ORDER BY id DESC LIMIT 1", (self.run_key, subject)).fetchone()
+        if row is None:
+            return []
+        rows = self.conn.execute(
+            "SELECT fold, score, bands, coef, intercept, test_idx, seconds, path FROM folds"
+            " WHERE run_key = ? AND subject = ? AND created = ? ORDER BY fold",
+            (self.run_key, subject, row[0]))
+        return [{'fold': fold, 'score': score, 'bands': json.loads(bands),
+                 'coef': _from_blob(coef), 'intercept': _from_blob(intercept),
+                 'test_idx': _from_blob(test_idx), 'seconds': seconds,
+                 'path': json.loads(path) if path else None}
+                for fold, score, bands, coef, intercept, test_idx, seconds, path in rows]
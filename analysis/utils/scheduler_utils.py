@@ -0,0 +1,134 @@
+"""
+Scheduling utilities for running analysis tasks in a bounded process pool.
+
+Each task (e.g. one subject) runs as a top-level job in its own process with a
+fixed thread budget applied to BLAS/OpenMP pools, so the machine is neither
+oversubscribed by nested parallelism nor left idle between subjects. Results
+are handed back as soon as each task finishes, so callers can stream them to disk.
+"""
+
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Iterable, Optional
+
+from threadpoolctl import threadpool_limits
+
+THREAD_ENV_VARS = (
+    'OMP_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'NUMEXPR_NUM_THREADS',
+)
+
+
+def limit_threads(n_threads: int):
+    """
+    Cap the thread pools of the current process.
+
+    Sets the usual environment variables (inherited by any child processes) and
+    applies the limit to already-loaded BLAS/OpenMP libraries via threadpoolctl.
+
+    Parameters
+    ----------
+    n_threads : int
+        Maximum threads per pool
+    """
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(n_threads)
+    threadpool_limits(limits=n_threads)
+
+
+def plan_workers(n_tasks: int, n_cores: int, threads_per_task: int,
+                 memory_budget: Optional[float] = None,
+                 task_memory: Optional[float] = None) -> int:
+    """
+    Number of concurrent tasks that fits the core and memory budgets.
+
+    Parameters
+    ----------
+    n_tasks : int
+        Number of tasks to run
+    n_cores : int
+        Total cores available
+    threads_per_task : int
+        Threads given to each task
+    memory_budget : float, optional
+        Total memory available to tasks (bytes, default: unlimited)
+    task_memory : float, optional
+        Estimated peak memory of one task (bytes)
+
+    Returns
+    -------
+    int
+        Number of worker processes (at least 1)
+    """
+    n_workers = min(n_tasks, max(1, n_cores // max(1, threads_per_task)))
+    if memory_budget is not None and task_memory:
+        n_workers = min(n_workers, int(memory_budget // task_memory))
+    return max(1, n_workers)
+
+
+def run_tasks(func: Callable[[Any], Any], tasks: Iterable[Any], n_workers: int,
+              threads_per_task: int,
+              on_result: Optional[Callable[[Any, Any], None]] = None,
+              on_error: Optional[Callable[[Any, BaseException], None]] = None) -> dict:
+    """
+    Run func over tasks in a process pool, reporting each result as it completes.
+
+    With a single worker the tasks run sequentially in this process.
+
+    Parameters
+    ----------
+    func : callable
+        Picklable (module-level) function called as func(task)
+    tasks : iterable
+        Task arguments (e.g. subject folders)
+    n_workers : int
+        Number of worker processes
+    threads_per_task : int
+        Thread budget applied inside each worker
+    on_result : callable, optional
+        Called in this process as on_result(task, result) when a task finishes
+    on_error : callable, optional
+        Called as on_error(task, exception) when a task fails (default: print traceback)
+
+    Returns
+    -------
+    dict
+        Results of successful tasks, keyed by task
+    """
+    results = {}
+
+    def report(task, result=None, error=None):
+        if error is not None:
+            if on_error is not None:
+                on_error(task, error)
+            else:
+                print(f"[ERROR] Task {task} failed: {error}")
+                traceback.print_exception(type(error), error, error.__traceback__)
+            return
+        results[task] = result
+        if on_result is not None:
+            on_result(task, result)
+
+    if n_workers <= 1:
+        limit_threads(threads_per_task)
+        for task in tasks:
+            try:
+                result = func(task)
+            except Exception as e:
+                report(task, error=e)
+            else:
+                report(task, result)
+        return results
+
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=limit_threads,
+                             initargs=(threads_per_task,)) as pool:
+        futures = {pool.submit(func, task): task for task in tasks}
+        for future in as_completed(futures):
+            task = futures[future]
+            error = future.exception()
+            report(task, None if error else future.result(), error)
+
+    return results
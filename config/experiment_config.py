@@ -188,6 +188,8 @@ FIXATION_HEIGHT = 0.1        # Height of fixation cross
 TEXT_COLOR = 'white'
 BACKGROUND_COLOR = 'black'
 BOLD_TEXT = True
+FRAME_RATE = None            # Display refresh rate in Hz for frame-locked phase timing
+                              # (None = measure at the start of each block)
 
 # =============================================================================
 # AUDIO PARAMETERS
@@ -212,6 +214,11 @@ BIOSEMI_ENABLED = True       # Enable Biosemi connection (for live experiments)
 # =============================================================================
 
 PARALLEL_PORT_ADDRESS = 0x0378  # Parallel port address (default: LPT1)
+TRIGGER_DISPATCH_THREAD = False  # Send Biosemi triggers from a dedicated high-priority thread
+                                  # (stimulus loop only enqueues; 5 ms byte spacing kept by the thread;
+                                  # CSV rows get the hardware send time, written between trials)
+TRIGGER_LOG_FLUSH_INTERVAL = None  # Trigger CSV rows are buffered during trials and written in the ITI;
+                                    # set to seconds (e.g. 1.0) to also flush from a background thread
 
 # =============================================================================
 # DATA COLLECTION
@@ -27,14 +27,13 @@ sys.path.insert(0, str(project_root))
 from config import load_config
 from paradigm.utils import (
     TriggerHandler, TRIGGER_CODES, create_trigger_handler,
-    get_trial_start_code, get_trial_end_code,
     get_block_start_code, get_block_end_code,
-    get_beep_code, get_beep_codes,
     DisplayManager, create_window,
     create_metadata, create_trial_data_dict, save_trial_data, print_experiment_summary,
     create_balanced_sequence, validate_trial_sequence, create_stratified_block_sequence,
     create_beep_sound, play_beep,
-    jittered_wait,
+    DeadlineScheduler, FrameTimeline, TimelinePhase,
+    SCHEDULE_PHASES, BlockSchedule, compile_block_schedule, schedule_seed,
     get_subject_folder, find_subject_folders, get_latest_subject_folder,
     find_block_folders, get_next_block_number, get_block_folder_path, ensure_block_folder,
     save_randomization_protocol, load_randomization_protocol, get_block_trials_from_protocol,
@@ -45,19 +44,22 @@ from paradigm.utils import (
 def run_visualization_period(
     win: visual.Window,
     display: DisplayManager,
-    n_beeps: int,
+    beep_codes: List[int],
     beep_interval: float,
     beep_sound: sound.Sound,
     trigger_handler: TriggerHandler,
     trial_num: int,
     total_trials: int,
     block_trial_num: int = None,
-    trials_per_block: int = None
-) -> List[float]:
+    trials_per_block: int = None,
+    event_names: Optional[List[str]] = None
+) -> Tuple[List[float], List[float]]:
     """
     Run visualization period with beeps.
     
-    Fixation cross stays on screen during beeps.
+    Fixation cross stays on screen during beeps. Beeps are scheduled at
+    absolute deadlines (first beep + k * beep_interval, see DeadlineScheduler),
+    so trigger, sound, drawing and printing overhead never stretches the rhythm.
     
     Parameters
     ----------
@@ -65,8 +67,8 @@ def run_visualization_period(
         PsychoPy window
     display : DisplayManager
         Display manager
-    n_beeps : int
-        Number of beeps
+    beep_codes : list of int
+        Trigger code of each beep (OUR codes: 31-38); one beep per code
     beep_interval : float
         Time between beeps
     beep_sound : sound.Sound
@@ -77,12 +79,19 @@ def run_visualization_period(
         Current trial number
     total_trials : int
         Total number of trials
+    event_names : list of str, optional
+        Event name of each beep trigger (default: 'beep_<k>_<n>')
     
     Returns
     -------
-    list
-        List of beep timestamps
+    beep_timestamps : list
+        Beep start timestamp followed by each beep's timestamp
+    beep_lateness : list
+        Lateness of each beep relative to its deadline (ms)
     """
+    n_beeps = len(beep_codes)
+    if event_names is None:
+        event_names = [f'beep_{k + 1}_{n_beeps}' for k in range(n_beeps)]
     beep_timestamps = []
     
     # Send beep start trigger
@@ -93,49 +102,52 @@ def run_visualization_period(
     beep_timestamps.append(timestamp)
     
     # Visualization period with beeps (fixation stays on screen)
-    # Get beep trigger codes dynamically based on n_beeps (OUR codes: 31-38)
-    beep_trigger_codes = get_beep_codes(n_beeps, max_beeps=8)
+    # Fixed interval - NO JITTER (critical for rhythmic protocol)
+    # Beep k is due at t0 + k * beep_interval; the period ends at beep n_beeps' deadline
+    scheduler = DeadlineScheduler(beep_interval)
+    scheduler.start()
     
-    for beep_idx in range(n_beeps):
-        # Redraw fixation (keeps it visible during beeps)
-        display.show_fixation()
+    for beep_idx, (trigger_code, event_name) in enumerate(zip(beep_codes, event_names)):
+        scheduler.wait(beep_idx)
         
-        # Use dynamic beep code (OUR codes: 31-38)
-        trigger_code = beep_trigger_codes[beep_idx]
-        timestamp, _ = trigger_handler.send_trigger(
-            trigger_code,
-            event_name=f'beep_{beep_idx + 1}_{n_beeps}'
-        )
+        timestamp, _ = trigger_handler.send_trigger(trigger_code, event_name=event_name)
         beep_timestamps.append(timestamp)
         
         # Play beep using utility function
         play_beep(beep_sound, stop_first=True)
         
-        print(f"  Beep {beep_idx + 1}/{n_beeps} (trigger {trigger_code}) at {timestamp:.3f}s")
+        # Redraw fixation (keeps it visible during beeps); the flip waits for the
+        # next refresh, so it runs after the beep, inside the slack before the next deadline
+        display.show_fixation()
         
-        # Fixed interval - NO JITTER (critical for rhythmic protocol)
-        # 0.8s interval provides sufficient buffer time between triggers
-        core.wait(beep_interval)
+        print(f"  Beep {beep_idx + 1}/{n_beeps} (trigger {trigger_code}) at {timestamp:.3f}s "
+              f"(late {scheduler.lateness[-1] * 1e3:.3f} ms)")
     
-    return beep_timestamps
+    scheduler.wait(n_beeps)
+    return beep_timestamps, scheduler.lateness_ms()[:n_beeps]
 
 
 def run_single_trial_live(
     win: visual.Window,
     display: DisplayManager,
     trial_spec: Dict[str, any],
-    config: Dict[str, any],
+    schedule: BlockSchedule,
+    trial_index: int,
     trigger_handler: TriggerHandler,
     beep_sound: sound.Sound,
     trial_num: int,
     total_trials: int,
+    timeline: FrameTimeline,
     block_trial_num: int = None,
     trials_per_block: int = None
 ) -> Dict[str, any]:
     """
     Run a single trial with live EEG capture.
     
-    Same structure as simulation but uses real triggers.
+    Same structure as simulation but uses real triggers. The trial walks its
+    rows of the precompiled block schedule (durations with pre-drawn jitter,
+    trigger codes, event names); visual phases run on a frame-locked
+    timeline, so each phase's trigger is sent on the flip that shows it.
     
     Parameters
     ----------
@@ -145,8 +157,10 @@ def run_single_trial_live(
         Display manager
     trial_spec : dict
         Trial specification
-    config : dict
-        Configuration dictionary
+    schedule : BlockSchedule
+        Compiled schedule of the block
+    trial_index : int
+        Block-local trial index (0-based) into the schedule
     trigger_handler : TriggerHandler
         Trigger handler
     beep_sound : sound.Sound
@@ -155,11 +169,13 @@ def run_single_trial_live(
         Current trial number
     total_trials : int
         Total number of trials
+    timeline : FrameTimeline
+        Frame-locked timeline runner
     
     Returns
     -------
     dict
-        Complete trial data with timestamps
+        Complete trial data with timestamps and per-phase frame timing ('frames')
     """
     concept = trial_spec['concept']
     category = trial_spec['category']
@@ -173,120 +189,77 @@ def run_single_trial_live(
     
     print(f"\nTrial {trial_num}/{total_trials}: {display_concept} (Category {category})")
     
-    # Initialize jitter settings (used throughout trial)
-    use_jitter = config.get('USE_JITTER', True)
-    jitter_range = config.get('JITTER_RANGE', 0.1)
+    # Build this trial's phases from the schedule BEFORE the first trigger
+    draw = {
+        'trial_indicator': lambda: display.draw_trial_indicator(trial_num, total_trials),
+        'concept': lambda: display.draw_concept(concept, case=case),
+        'mask': display.draw_mask,
+        'fixation': display.draw_fixation
+    }
+    rows = schedule.trial_slice(trial_index)
+    pre_beep_phases, beep_codes, beep_names = [], [], []
+    for row_event, event_name in zip(schedule.events[rows], schedule.event_names[rows]):
+        phase = SCHEDULE_PHASES[row_event['phase']]
+        code = int(row_event['code']) if row_event['code'] >= 0 else None
+        if phase == 'trial_start':
+            trial_start = (code, event_name)
+        elif phase == 'beep':
+            beep_codes.append(code)
+            beep_names.append(event_name)
+            beep_interval = float(row_event['duration'])
+        elif phase == 'rest':
+            rest_phase = TimelinePhase(phase, float(row_event['duration']), trigger_code=code,
+                                       event_name=event_name)
+        elif phase not in ('beep_start', 'iti'):
+            # Indicator, concept, mask, fixation (trigger on onset flip) and blank pauses
+            pre_beep_phases.append(TimelinePhase(phase, float(row_event['duration']),
+                                                 draw=draw.get(phase), trigger_code=code,
+                                                 event_name=event_name))
     
     # Send trial start trigger (unique code for this trial number)
-    trial_start_code = get_trial_start_code(trial_num)
-    timestamp, _ = trigger_handler.send_trigger(
-        trial_start_code,
-        event_name=f'trial_{trial_num}_start'
-    )
+    timestamp, _ = trigger_handler.send_trigger(trial_start[0], event_name=trial_start[1])
     trial_data['timestamps']['trial_start'] = timestamp
-    print(f"  Trial {trial_num} start (trigger {trial_start_code}) at {timestamp:.3f}s")
-    
-    # 1. TRIAL INDICATOR (centered text, like concept word) - FIRST ELEMENT
-    display.show_trial_indicator(trial_num, total_trials)
-    timestamp, _ = trigger_handler.send_trigger(
-        TRIGGER_CODES['trial_indicator'],
-        event_name=f'trial_indicator_{trial_num}'
-    )
-    trial_data['timestamps']['trial_indicator'] = timestamp
-    print(f"  Trial indicator at {timestamp:.3f}s")
-    trial_indicator_duration = 1.0  # Show trial indicator for 1 second
-    core.wait(trial_indicator_duration)
-    
-    # Pause after trial indicator (JITTERED - pause event)
-    display.clear_screen()
-    post_indicator_pause = config.get('POST_FIXATION_PAUSE', 0.5)  # Use same pause duration
-    core.wait(jittered_wait(post_indicator_pause, jitter_range) if use_jitter else post_indicator_pause)
-    
-    # 3. CONCEPT PRESENTATION (with case)
-    display.show_concept(concept, case=case)
-    
-    # Send category-specific trigger (OUR codes)
-    trigger_code = (TRIGGER_CODES['concept_category_a'] if category == 'A' 
-                   else TRIGGER_CODES['concept_category_b'])
-    event_name = f'concept_{concept}_category_{category}'
-    timestamp, _ = trigger_handler.send_trigger(trigger_code, event_name=event_name)
-    trial_data['timestamps']['concept'] = timestamp
-    print(f"  Concept '{concept}' (Category {category}) at {timestamp:.3f}s")
-    
-    # NO JITTER - important timing for concept presentation
-    core.wait(config.get('PROMPT_DURATION', 3.5))
-    
-    # Pause after concept (JITTERED - pause event)
-    display.clear_screen()
-    post_concept_word_pause = config.get('POST_FIXATION_PAUSE', 0.5)  # Use same pause duration
-    core.wait(jittered_wait(post_concept_word_pause, jitter_range) if use_jitter else post_concept_word_pause)
-    
-    # 3. VISUAL MASK (after concept word)
-    display.show_mask()
-    timestamp, _ = trigger_handler.send_trigger(
-        TRIGGER_CODES['mask'],
-        event_name='mask'
-    )
-    trial_data['timestamps']['mask'] = timestamp
-    print(f"  Mask at {timestamp:.3f}s")
-    mask_duration = config.get('MASK_DURATION', 0.3)
-    core.wait(mask_duration)
-    
-    # Pause after mask (JITTERED - pause event)
-    display.clear_screen()
-    post_mask_pause = config.get('POST_MASK_PAUSE', 0.5)
-    core.wait(jittered_wait(post_mask_pause, jitter_range) if use_jitter else post_mask_pause)
-    
-    # Pause after mask (JITTERED - pause event)
-    post_concept_pause = config.get('POST_CONCEPT_PAUSE', 3.0)
-    core.wait(jittered_wait(post_concept_pause, jitter_range) if use_jitter else post_concept_pause)
-    
-    # 4. FIXATION CROSS (for beep presentation - stays on during beeps)
-    display.show_fixation()
-    timestamp, _ = trigger_handler.send_trigger(
-        TRIGGER_CODES['fixation'],
-        event_name='fixation'
-    )
-    trial_data['timestamps']['fixation'] = timestamp
-    print(f"  Fixation at {timestamp:.3f}s")
-    
-    # 3. VISUALIZATION PERIOD (fixation stays on screen)
-    n_beeps = config.get('N_BEEPS', 8)
-    beep_interval = config.get('BEEP_INTERVAL', 0.8)
-    
-    beep_timestamps = run_visualization_period(
+    print(f"  Trial {trial_num} start (trigger {trial_start[0]}) at {timestamp:.3f}s")
+    
+    # 1-4. Trial indicator -> concept -> mask -> fixation (pauses between are blank)
+    frames = timeline.run(pre_beep_phases)
+    for record in frames:
+        if record['trigger_timestamp'] is not None:
+            trial_data['timestamps'][record['phase']] = record['trigger_timestamp']
+            print(f"  {record['phase'].replace('_', ' ').capitalize()} at "
+                  f"{record['trigger_timestamp']:.3f}s ({record['n_frames']} frames)")
+    
+    # 5. VISUALIZATION PERIOD (fixation stays on screen)
+    beep_timestamps, beep_lateness = run_visualization_period(
         win=win,
         display=display,
-        n_beeps=n_beeps,
+        beep_codes=beep_codes,
         beep_interval=beep_interval,
         beep_sound=beep_sound,
         trigger_handler=trigger_handler,
         trial_num=trial_num,
         total_trials=total_trials,
         block_trial_num=block_trial_num,
-        trials_per_block=trials_per_block
+        trials_per_block=trials_per_block,
+        event_names=beep_names
     )
     
     trial_data['timestamps']['beep_start'] = beep_timestamps[0]
     trial_data['timestamps']['beeps'] = beep_timestamps[1:]  # Rest are beep timestamps
+    trial_data['timestamps']['beep_lateness_ms'] = beep_lateness
+    print(f"  Beep lateness: max {max(beep_lateness):.3f} ms")
     
-    # 4. REST PERIOD
-    display.clear_screen()
-    
-    # Send trial end trigger (unique code for this trial number)
-    trial_end_code = get_trial_end_code(trial_num)
-    timestamp, _ = trigger_handler.send_trigger(
-        trial_end_code,
-        event_name=f'trial_{trial_num}_end'
-    )
-    trial_data['timestamps']['rest'] = timestamp
-    print(f"  Trial {trial_num} end (trigger {trial_end_code}) at {timestamp:.3f}s")
+    # 6. REST PERIOD (blank; trial end trigger on its first flip)
+    rest_frames = timeline.run([rest_phase])
+    trial_data['timestamps']['rest'] = rest_frames[0]['trigger_timestamp']
+    print(f"  Trial {trial_num} end (trigger {rest_phase.trigger_code}) at "
+          f"{trial_data['timestamps']['rest']:.3f}s")
     
-    # Rest (JITTERED - pause event)
-    use_jitter = config.get('USE_JITTER', True)
-    jitter_range = config.get('JITTER_RANGE', 0.1)
-    rest_duration = config.get('REST_DURATION', 2.0)
-    core.wait(jittered_wait(rest_duration, jitter_range) if use_jitter else rest_duration)
+    trial_data['frames'] = frames + rest_frames
+    dropped = sum(record['dropped_frames'] for record in trial_data['frames'])
+    if dropped:
+        late_phases = [record['phase'] for record in trial_data['frames'] if record['dropped_frames']]
+        print(f"  [WARNING] {dropped} dropped frame(s) in: {', '.join(late_phases)}")
     
     return trial_data
 
@@ -561,20 +534,27 @@ def run_experiment_live(
         port_address=config.get('PARALLEL_PORT_ADDRESS', 0x0378),
         use_triggers=True,  # Live mode - real triggers
         csv_log_path=csv_log_path,  # Enable CSV mirror logging (will append if exists)
-        biosemi_connection=biosemi_conn  # Pass Biosemi connection
+        biosemi_connection=biosemi_conn,  # Pass Biosemi connection
+        dispatch_thread=config.get('TRIGGER_DISPATCH_THREAD', False),
+        log_flush_interval=config.get('TRIGGER_LOG_FLUSH_INTERVAL')
     )
     if biosemi_conn:
         print("\n[TRIGGER] Live mode enabled (triggers sent to Biosemi)")
     else:
         print("\n[TRIGGER] Fallback mode (triggers simulated, Biosemi not connected)")
+    if trigger_handler.dispatcher is not None:
+        print("[TRIGGER] Dispatch thread enabled (triggers queued, sent off the stimulus thread)")
     print(f"[TRIGGER] CSV logging enabled: {csv_log_path}")
     
     # Send Block Start trigger IMMEDIATELY after connection (same as reference project)
     # This should appear in ActiView right away
+    # Sent through the handler so it goes via the dispatch thread (if enabled) and the CSV log
     block_start_code = get_block_start_code(trigger_block_num)
-    from paradigm.utils.biosemi_utils import send_biosemi_trigger
-    send_biosemi_trigger(block_start_code, f'block_{trigger_block_num}_start')
-    print(f"[TRIGGER] Block {trigger_block_num} start (trigger {block_start_code}) sent immediately after connection")
+    timestamp, _ = trigger_handler.send_trigger(
+        block_start_code,
+        event_name=f'block_{trigger_block_num}_start'
+    )
+    print(f"[TRIGGER] Block {trigger_block_num} start (trigger {block_start_code}) sent immediately after connection at {timestamp:.3f}s")
     
     # Create window (fullscreen on configured monitor, e.g. second monitor)
     win = create_window(
@@ -601,6 +581,10 @@ def run_experiment_live(
     }
     display = DisplayManager(win, display_config)
     
+    # Frame-locked timeline (refresh rate measured once per block unless FRAME_RATE is set)
+    timeline = FrameTimeline(win, trigger_handler, frame_rate=config.get('FRAME_RATE'))
+    print(f"[DISPLAY] Frame-locked timeline at {timeline.frame_rate:.2f} Hz")
+    
     # Create clocks
     clock = core.Clock()
     experiment_clock = core.Clock()
@@ -710,6 +694,19 @@ def run_experiment_live(
     else:
         print(f"[OK] Trial sequence validated: {len(trials)} trials")
     
+    # Compile the block schedule (all jitter, codes and event names) before it starts
+    # Global trial numbers are 1-indexed across all blocks
+    n_trials_total = config.get('N_TRIALS', 20)  # Total across all blocks
+    global_trial_start = block_num * len(trials) + 1
+    seed = schedule_seed(participant_id, session_timestamp, block_num)
+    schedule = compile_block_schedule(trials, config, first_trial_num=global_trial_start,
+                                      total_trials=n_trials_total, seed=seed)
+    schedule_path = block_folder / f"sub-{participant_id}_{session_timestamp}_schedule.json"
+    schedule.save(schedule_path)
+    print(f"[OK] Block schedule compiled: {len(schedule.events)} events, "
+          f"{schedule.events['onset'][-1] + schedule.events['duration'][-1]:.1f} s planned (seed {seed})")
+    print(f"[OK] Block schedule saved: {schedule_path}")
+    
     # Start experiment
     print("\n" + "="*80)
     print(f"STARTING LIVE EXPERIMENT - BLOCK {block_num} (Block_{block_num:04d})")
@@ -719,21 +716,11 @@ def run_experiment_live(
     
     # Trials are already for this block (from protocol)
     block_trials = trials
-    n_trials_total = config.get('N_TRIALS', 20)  # Total across all blocks
-    
-    # Calculate global trial numbers (1-indexed across all blocks)
     trials_per_block = len(block_trials)
-    global_trial_start = block_num * trials_per_block + 1
     
     print(f"\n[BLOCK {block_num}] Running {len(block_trials)} trials (global trials {global_trial_start}-{global_trial_start + len(block_trials) - 1})")
     
-    # Block start trigger was already sent immediately after connection
-    # Log it here for CSV/timing purposes (but trigger was sent earlier)
-    block_start_code = get_block_start_code(trigger_block_num)
-    timestamp = experiment_clock.getTime()
-    # Log to CSV (trigger was already sent to Biosemi earlier)
-    trigger_handler._log_trigger_to_csv(timestamp, block_start_code, f'block_{trigger_block_num}_start', True)
-    print(f"[TRIGGER] Block {trigger_block_num} start (trigger {block_start_code}) logged at {timestamp:.3f}s (sent earlier)")
+    # Block start trigger was already sent (and logged to CSV) immediately after connection
     
     # Wrap block execution in try/finally to ensure data is always saved
     interrupted = False
@@ -760,24 +747,24 @@ def run_experiment_live(
                 win=win,
                 display=display,
                 trial_spec=trial_spec,
-                config=config,
+                schedule=schedule,
+                trial_index=trial_idx,
                 trigger_handler=trigger_handler,
                 beep_sound=beep_sound,
                 trial_num=global_trial_num,
                 total_trials=n_trials_total,
+                timeline=timeline,
                 block_trial_num=block_trial_num,
                 trials_per_block=trials_per_block
             )
             
             trial_data_list.append(trial_data)
             
-            # Inter-trial interval (jittered) - only if not last trial in block
-            if len(trial_data_list) < len(block_trials):
-                use_jitter = config.get('USE_JITTER', True)
-                jitter_range = config.get('JITTER_RANGE', 0.1)
-                inter_trial_interval = config.get('INTER_TRIAL_INTERVAL', 3.0)
-                wait_duration = jittered_wait(inter_trial_interval, jitter_range) if use_jitter else inter_trial_interval
-                core.wait(wait_duration)
+            # Write buffered trigger CSV rows (and dispatch-thread sends) outside timed phases
+            trigger_handler.flush_log()
+            
+            # Inter-trial interval (jittered, from the schedule; zero after the last trial)
+            core.wait(schedule.phase_duration(trial_idx, 'iti'))
         
         # Block end (use 1-indexed for trigger codes) - only if not interrupted
         if not interrupted:
@@ -787,6 +774,7 @@ def run_experiment_live(
                 event_name=f'block_{trigger_block_num}_end'
             )
             print(f"[TRIGGER] Block {trigger_block_num} end (trigger {block_end_code}) at {timestamp:.3f}s")
+            trigger_handler.flush_log(sync=True)  # Block complete: trigger log on disk
         else:
             print(f"\n[WARNING] Block {block_num} was interrupted - saving partial data")
     
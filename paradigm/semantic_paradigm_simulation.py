@@ -653,6 +653,9 @@ def run_experiment_simulation(
         
         trial_data_list.append(trial_data)
         
+        # Write buffered trigger CSV rows outside timed phases
+        trigger_handler.flush_log()
+        
         # Inter-trial interval (jittered) - only if not last trial in block
         if len(trial_data_list) < len(block_trials):
             use_jitter = config.get('USE_JITTER', True)
@@ -42,11 +42,28 @@ from .audio_utils import (
 
 from .timing_utils import (
     jittered_wait,
-    get_jittered_duration
+    get_jittered_duration,
+    wait_until,
+    DeadlineScheduler
+)
+
+from .timeline_utils import (
+    TimelinePhase,
+    FrameTimeline,
+    measure_frame_rate,
+    duration_to_frames
+)
+
+from .schedule_utils import (
+    SCHEDULE_PHASES,
+    BlockSchedule,
+    compile_block_schedule,
+    schedule_seed
 )
 
 from .trigger_utils import (
     TriggerHandler,
+    TriggerLogWriter,
     TRIGGER_CODES,
     create_trigger_handler,
     get_trial_start_code,
@@ -62,6 +79,7 @@ from .biosemi_utils import (
     open_serial_port,
     close_serial_port,
     send_biosemi_trigger,
+    TriggerDispatcher,
     # Compatibility aliases
     connect_biosemi,
     verify_biosemi_connection,
@@ -83,6 +101,7 @@ __all__ = [
     
     # Trigger utilities
     'TriggerHandler',
+    'TriggerLogWriter',
     'TRIGGER_CODES',
     'create_trigger_handler',
     'get_trial_start_code',
@@ -116,11 +135,24 @@ __all__ = [
     # Timing utilities
     'jittered_wait',
     'get_jittered_duration',
+    'wait_until',
+    'DeadlineScheduler',
+    # Frame-locked timeline utilities
+    'TimelinePhase',
+    'FrameTimeline',
+    'measure_frame_rate',
+    'duration_to_frames',
+    # Block schedule utilities
+    'SCHEDULE_PHASES',
+    'BlockSchedule',
+    'compile_block_schedule',
+    'schedule_seed',
     # Biosemi utilities (same implementation style as reference, our codes)
     'get_default_port',
     'open_serial_port',
     'close_serial_port',
     'send_biosemi_trigger',
+    'TriggerDispatcher',
     # Compatibility aliases
     'connect_biosemi',
     'verify_biosemi_connection',
@@ -11,13 +11,21 @@ Date: January 26, 2026
 """
 
 import serial
+import os
+import queue
+import threading
 import time
 import warnings
-from typing import Optional
+from typing import Callable, List, Optional, Tuple
+
+from .timing_utils import wait_until
 
 # Global serial port instance
 _serial_port = None
 
+# Minimum spacing between trigger bytes (BioSemi drops or merges faster triggers)
+TRIGGER_SPACING = 0.005
+
 # Track trigger sending failures (for end-of-block reporting)
 _trigger_failures = []
 
@@ -213,11 +221,148 @@ def send_biosemi_trigger(trigger_code: int, marker_name: Optional[str] = None) -
     
     # Add 5ms delay to prevent trigger dropping due to rapid hardware timing
     # This delay is critical for BioSemi hardware to properly register each trigger
-    time.sleep(0.005)
+    time.sleep(TRIGGER_SPACING)
     
     return True
 
 
+def _raise_thread_priority() -> bool:
+    """
+    Best-effort real-time priority for the calling thread.
+    
+    Windows: THREAD_PRIORITY_TIME_CRITICAL. Linux: SCHED_FIFO (needs
+    CAP_SYS_NICE; silently skipped otherwise).
+    
+    Returns
+    -------
+    bool
+        True if the priority was raised
+    """
+    try:
+        if os.name == 'nt':
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            return bool(kernel32.SetThreadPriority(kernel32.GetCurrentThread(), 15))
+        if hasattr(os, 'sched_setscheduler'):
+            priority = os.sched_get_priority_min(os.SCHED_FIFO)
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+            return True
+    except Exception:
+        pass
+    return False
+
+
+class TriggerDispatcher:
+    """
+    Dedicated thread that owns the serial port and sends queued triggers.
+    
+    The stimulus loop only enqueues (submit() returns immediately); the
+    dispatch thread writes and flushes each byte and enforces the minimum
+    inter-byte spacing with a sleep-then-spin wait instead of blocking the
+    caller for 5 ms. The time each byte was actually written is reported
+    back through a results queue (see drain()).
+    
+    Both queues are queue.SimpleQueue (lock-free put/get in CPython), so
+    neither side ever waits on the other. While the dispatcher runs, no other
+    code should write to the serial port.
+    """
+    
+    def __init__(self, clock: Callable[[], float] = time.perf_counter,
+                 spacing: float = TRIGGER_SPACING, high_priority: bool = True):
+        """
+        Create (but do not start) a dispatcher.
+        
+        Parameters
+        ----------
+        clock : callable
+            Clock for the reported timestamps (e.g. TriggerHandler.clock.getTime)
+        spacing : float
+            Minimum time between two trigger bytes (seconds)
+        high_priority : bool
+            Raise the dispatch thread to real-time priority (best effort)
+        """
+        self.clock = clock
+        self.spacing = spacing
+        self.high_priority = high_priority
+        self.priority_raised = False
+        self._pending = queue.SimpleQueue()
+        self._sent = queue.SimpleQueue()
+        self._thread = None
+    
+    def start(self):
+        """Start the dispatch thread."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='TriggerDispatcher', daemon=True)
+        self._thread.start()
+    
+    def submit(self, trigger_code: int, marker_name: Optional[str] = None) -> float:
+        """
+        Queue a trigger for sending (never blocks).
+        
+        Parameters
+        ----------
+        trigger_code : int
+            Trigger code to send (0-255)
+        marker_name : str, optional
+            Human-readable name, returned with the send result
+        
+        Returns
+        -------
+        float
+            Enqueue time on the dispatcher clock
+        """
+        queued_at = self.clock()
+        self._pending.put((trigger_code, marker_name, queued_at))
+        return queued_at
+    
+    def drain(self) -> List[Tuple[int, Optional[str], float, float, float, bool]]:
+        """
+        Collect the triggers sent since the last call, in send order.
+        
+        Returns
+        -------
+        list of tuple
+            (trigger_code, marker_name, queued_at, sent_at, sent_wall, success)
+            per trigger; sent_at (clock) and sent_wall (time.time()) are taken
+            right after the byte was flushed
+        """
+        sent = []
+        while True:
+            try:
+                sent.append(self._sent.get_nowait())
+            except queue.Empty:
+                return sent
+    
+    def stop(self, timeout: float = 1.0):
+        """Send everything still queued, then stop the dispatch thread."""
+        if self._thread is None:
+            return
+        self._pending.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+    
+    def _run(self):
+        """Dispatch loop: wait for the spacing, write, report."""
+        if self.high_priority:
+            self.priority_raised = _raise_thread_priority()
+        next_allowed = 0.0
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            trigger_code, marker_name, queued_at = item
+            wait_until(next_allowed)
+            if 0 <= trigger_code <= 255:
+                success = _send_eeg_trigger(trigger_code, marker_name)
+            else:
+                warnings.warn(f"Trigger code {trigger_code} out of range (0-255)")
+                success = False
+            sent_at, sent_wall = self.clock(), time.time()
+            next_allowed = time.perf_counter() + self.spacing
+            self._sent.put((trigger_code, marker_name, queued_at, sent_at, sent_wall, success))
+
+
 # Compatibility aliases (for existing code)
 def connect_biosemi(port: str = None, baudrate: int = 115200) -> serial.Serial:
     """Alias for open_serial_port() for compatibility."""
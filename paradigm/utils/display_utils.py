@@ -296,14 +296,18 @@ class DisplayManager:
             color=config.get('text_color', 'white')
         )
     
+    def draw_fixation(self):
+        """Draw fixation cross (without flipping)."""
+        self.fixation.draw()
+    
     def show_fixation(self):
         """Display fixation cross."""
-        self.fixation.draw()
+        self.draw_fixation()
         self.win.flip()
     
-    def show_concept(self, concept: str, case: str = 'lower'):
+    def draw_concept(self, concept: str, case: str = 'lower'):
         """
-        Display concept word.
+        Draw concept word (without flipping).
         
         Parameters
         ----------
@@ -320,11 +324,24 @@ class DisplayManager:
         
         self.concept_text.text = display_text
         self.concept_text.draw()
+    
+    def show_concept(self, concept: str, case: str = 'lower'):
+        """
+        Display concept word.
+        
+        Parameters
+        ----------
+        concept : str
+            Concept to display
+        case : str
+            Case to display: 'upper' for uppercase, 'lower' for lowercase (default: 'lower')
+        """
+        self.draw_concept(concept, case=case)
         self.win.flip()
     
-    def show_trial_indicator(self, trial_num: int, total_trials: int):
+    def draw_trial_indicator(self, trial_num: int, total_trials: int):
         """
-        Display trial indicator as centered text (like concept word).
+        Draw trial indicator as centered text (without flipping).
         
         Parameters
         ----------
@@ -337,6 +354,19 @@ class DisplayManager:
         # Use concept_text stimulus to display trial indicator (centered, same style)
         self.concept_text.text = indicator_text
         self.concept_text.draw()
+    
+    def show_trial_indicator(self, trial_num: int, total_trials: int):
+        """
+        Display trial indicator as centered text (like concept word).
+        
+        Parameters
+        ----------
+        trial_num : int
+            Current trial number
+        total_trials : int
+            Total number of trials
+        """
+        self.draw_trial_indicator(trial_num, total_trials)
         self.win.flip()
     
     def show_instructions(self):
@@ -344,6 +374,10 @@ class DisplayManager:
         self.instruction_text.draw()
         self.win.flip()
     
+    def draw_mask(self):
+        """Draw visual mask (without flipping)."""
+        self.visual_mask.draw()
+    
     def show_mask(self):
         """
         Display visual mask (text-based hash pattern to prevent afterimages).
@@ -351,7 +385,7 @@ class DisplayManager:
         Shows a simple hash pattern mask to erase any afterimages from concept presentation.
         Standard practice for orthographic (text) stimuli masking.
         """
-        self.visual_mask.draw()
+        self.draw_mask()
         self.win.flip()
     
     
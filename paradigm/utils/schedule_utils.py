@@ -0,0 +1,231 @@
+"""
+Precompiled block schedule utilities.
+
+Before a block starts, its trial list (from the randomization protocol) is
+compiled into one flat event table: a NumPy structured array with a row per
+event (trial, phase, planned onset, duration, trigger code, stimulus id) and
+a parallel list of trigger event names. All pause jitter is drawn up front
+from a seeded generator, so the timed loop only reads the table, and the
+exact schedule is saved to the block folder for validation before it runs.
+"""
+
+import json
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from .trigger_utils import TRIGGER_CODES, get_trial_start_code, get_trial_end_code, get_beep_codes
+
+# Phases of one trial, in order (the 'phase' column indexes this tuple)
+SCHEDULE_PHASES = (
+    'trial_start',
+    'trial_indicator',
+    'post_indicator_pause',
+    'concept',
+    'post_concept_word_pause',
+    'mask',
+    'post_mask_pause',
+    'post_concept_pause',
+    'fixation',
+    'beep_start',
+    'beep',
+    'rest',
+    'iti'
+)
+
+SCHEDULE_DTYPE = np.dtype([
+    ('trial', np.int32),      # Block-local trial index (0-based)
+    ('phase', np.int16),      # Index into SCHEDULE_PHASES
+    ('onset', np.float64),    # Planned onset from block start (s)
+    ('duration', np.float64), # Planned duration (s)
+    ('code', np.int16),       # Trigger code, -1 for none
+    ('stimulus', np.int16)    # Index into the schedule's stimuli, -1 for none
+])
+
+TRIAL_INDICATOR_DURATION = 1.0  # Seconds (not configurable, as in the live paradigm)
+
+
+def schedule_seed(participant_id: str, timestamp: str, block_num: int) -> int:
+    """
+    Stable 32-bit seed of a block's jitter draws.
+
+    Unlike hash(), crc32 does not change between Python processes, so a
+    schedule can be recompiled exactly from the protocol.
+    """
+    return zlib.crc32(f"{participant_id}_{timestamp}_block{block_num}_schedule".encode())
+
+
+class BlockSchedule:
+    """
+    Flat event table of one block.
+
+    Attributes
+    ----------
+    events : np.ndarray
+        Structured array (SCHEDULE_DTYPE), trials in order
+    event_names : list of str
+        Trigger event name per row ('' for rows without a trigger)
+    stimuli : list of str
+        Concepts referenced by the 'stimulus' column
+    metadata : dict
+        Seed and compile parameters
+    """
+
+    def __init__(self, events: np.ndarray, event_names: List[str], stimuli: List[str],
+                 metadata: Dict[str, Any]):
+        self.events = events
+        self.event_names = event_names
+        self.stimuli = stimuli
+        self.metadata = metadata
+        # Row range of every trial (trials are contiguous)
+        bounds = np.searchsorted(events['trial'], np.arange(self.n_trials + 1))
+        self._trial_bounds = bounds.tolist()
+
+    @property
+    def n_trials(self) -> int:
+        """Number of trials in the block."""
+        return int(self.events['trial'][-1]) + 1 if len(self.events) else 0
+
+    def trial_slice(self, trial_index: int) -> slice:
+        """Rows of one trial (block-local, 0-based)."""
+        return slice(self._trial_bounds[trial_index], self._trial_bounds[trial_index + 1])
+
+    def phase_duration(self, trial_index: int, phase: str) -> float:
+        """Total planned duration of a phase within one trial (s)."""
+        rows = self.events[self.trial_slice(trial_index)]
+        return float(rows['duration'][rows['phase'] == SCHEDULE_PHASES.index(phase)].sum())
+
+    def save(self, path: Union[str, Path]):
+        """Write the schedule as JSON (one list per column)."""
+        columns = {name: self.events[name].tolist() for name in self.events.dtype.names}
+        columns['phase_name'] = [SCHEDULE_PHASES[p] for p in self.events['phase']]
+        columns['event_name'] = self.event_names
+        with open(path, 'w') as f:
+            json.dump({'metadata': self.metadata, 'stimuli': self.stimuli,
+                       'phases': list(SCHEDULE_PHASES), 'events': columns}, f, indent=2)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'BlockSchedule':
+        """Read a schedule written by save()."""
+        with open(path, 'r') as f:
+            data = json.load(f)
+        columns = data['events']
+        events = np.zeros(len(columns['trial']), dtype=SCHEDULE_DTYPE)
+        for name in SCHEDULE_DTYPE.names:
+            events[name] = columns[name]
+        return cls(events, columns['event_name'], data['stimuli'], data['metadata'])
+
+
+def compile_block_schedule(block_trials: List[Dict[str, Any]], config: Dict[str, Any],
+                           first_trial_num: int, total_trials: int,
+                           seed: Optional[int] = None) -> BlockSchedule:
+    """
+    Compile a block's trial list into a flat event table.
+
+    Parameters
+    ----------
+    block_trials : list of dict
+        Trial specs of the block ('concept', 'category', 'case')
+    config : dict
+        Experiment configuration (durations, N_BEEPS, BEEP_INTERVAL, jitter)
+    first_trial_num : int
+        Global (1-indexed) number of the block's first trial
+    total_trials : int
+        Total trials across blocks (shown by the trial indicator)
+    seed : int, optional
+        Seed of the jitter generator (see schedule_seed())
+
+    Returns
+    -------
+    BlockSchedule
+        Event table; ITI after the last trial is zero
+    """
+    n_beeps = config.get('N_BEEPS', 8)
+    beep_interval = config.get('BEEP_INTERVAL', 0.8)
+    use_jitter = config.get('USE_JITTER', True)
+    jitter_range = config.get('JITTER_RANGE', 0.1) if use_jitter else 0.0
+
+    # One trial's template: phase, base duration, jittered, fixed trigger code
+    # (per-trial codes of trial_start, concept and rest are filled in below)
+    template = [
+        ('trial_start', 0.0, False, -1),
+        ('trial_indicator', TRIAL_INDICATOR_DURATION, False, TRIGGER_CODES['trial_indicator']),
+        ('post_indicator_pause', config.get('POST_FIXATION_PAUSE', 0.5), True, -1),
+        ('concept', config.get('PROMPT_DURATION', 3.5), False, -1),
+        ('post_concept_word_pause', config.get('POST_FIXATION_PAUSE', 0.5), True, -1),
+        ('mask', config.get('MASK_DURATION', 0.3), False, TRIGGER_CODES['mask']),
+        ('post_mask_pause', config.get('POST_MASK_PAUSE', 0.5), True, -1),
+        ('post_concept_pause', config.get('POST_CONCEPT_PAUSE', 3.0), True, -1),
+        ('fixation', 0.0, False, TRIGGER_CODES['fixation']),
+        ('beep_start', 0.0, False, TRIGGER_CODES['beep_start']),
+    ]
+    template += [('beep', beep_interval, False, code) for code in get_beep_codes(n_beeps, max_beeps=8)]
+    template += [
+        ('rest', config.get('REST_DURATION', 2.0), True, -1),
+        ('iti', config.get('INTER_TRIAL_INTERVAL', 3.0), True, -1),
+    ]
+    phase_ids = np.array([SCHEDULE_PHASES.index(row[0]) for row in template], dtype=np.int16)
+    n_trials, n_rows = len(block_trials), len(template)
+
+    events = np.zeros(n_trials * n_rows, dtype=SCHEDULE_DTYPE)
+    events['trial'] = np.repeat(np.arange(n_trials), n_rows)
+    events['phase'] = np.tile(phase_ids, n_trials)
+    events['code'] = np.tile([row[3] for row in template], n_trials)
+    events['stimulus'] = -1
+
+    # Jitter: uniform within +/- jitter_range of the base duration, drawn for all trials at once
+    rng = np.random.default_rng(seed)
+    base = np.tile([row[1] for row in template], (n_trials, 1))
+    jittered = np.tile([row[2] for row in template], (n_trials, 1))
+    factors = rng.uniform(1 - jitter_range, 1 + jitter_range, size=base.shape)
+    durations = np.where(jittered, base * factors, base)
+    durations[-1, -1] = 0.0  # No ITI after the block's last trial
+    events['duration'] = durations.ravel()
+    events['onset'] = np.concatenate([[0.0], np.cumsum(events['duration'])[:-1]])
+
+    # Per-trial codes, stimuli and event names
+    stimuli = sorted({trial['concept'] for trial in block_trials})
+    row_of = {phase: int(np.flatnonzero(phase_ids == SCHEDULE_PHASES.index(phase))[0])
+              for phase in ('trial_start', 'concept', 'rest')}
+    event_names = []
+    for t, trial in enumerate(block_trials):
+        trial_num = first_trial_num + t
+        concept, category = trial['concept'], trial['category']
+        offset = t * n_rows
+        events['code'][offset + row_of['trial_start']] = get_trial_start_code(trial_num)
+        events['code'][offset + row_of['concept']] = (
+            TRIGGER_CODES['concept_category_a'] if category == 'A'
+            else TRIGGER_CODES['concept_category_b'])
+        events['code'][offset + row_of['rest']] = get_trial_end_code(trial_num)
+        events['stimulus'][offset + row_of['concept']] = stimuli.index(concept)
+
+        names = {
+            'trial_start': f'trial_{trial_num}_start',
+            'trial_indicator': f'trial_indicator_{trial_num}',
+            'concept': f'concept_{concept}_category_{category}',
+            'mask': 'mask',
+            'fixation': 'fixation',
+            'beep_start': 'beep_start',
+            'rest': f'trial_{trial_num}_end',
+        }
+        beep = 0
+        for phase, *_ in template:
+            if phase == 'beep':
+                beep += 1
+                event_names.append(f'beep_{beep}_{n_beeps}')
+            else:
+                event_names.append(names.get(phase, ''))
+
+    metadata = {
+        'seed': seed,
+        'first_trial_num': first_trial_num,
+        'total_trials': total_trials,
+        'n_beeps': n_beeps,
+        'beep_interval': beep_interval,
+        'use_jitter': use_jitter,
+        'jitter_range': jitter_range,
+        'trial_specs': [dict(trial) for trial in block_trials]
+    }
+    return BlockSchedule(events, event_names, stimuli, metadata)
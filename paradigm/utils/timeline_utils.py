@@ -0,0 +1,175 @@
+"""
+Frame-locked stimulus timeline utilities.
+
+A trial is declared as a list of phases (what to draw, for how long, which
+trigger marks its onset). Durations are converted to whole frames at the
+measured refresh rate, every frame of a phase is drawn and flipped, and the
+onset trigger is sent from win.callOnFlip, i.e. right after the buffer swap
+that puts the phase on screen rather than after flip() returns. Actual flip
+times are recorded, so each phase reports its real duration and any dropped
+frames.
+"""
+
+from typing import Callable, Dict, List, Optional, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from psychopy import visual
+    from .trigger_utils import TriggerHandler
+
+# A frame interval longer than (1 + DROP_TOLERANCE) refresh periods counts as dropped frame(s)
+DROP_TOLERANCE = 0.5
+
+
+class TimelinePhase:
+    """
+    One phase of a frame-locked timeline.
+
+    A phase without draw shows a blank screen; a phase with trigger_code sends
+    that trigger on the flip of its first frame.
+    """
+
+    def __init__(self, name: str, duration: float, draw: Optional[Callable[[], None]] = None,
+                 trigger_code: Optional[int] = None, event_name: Optional[str] = None):
+        """
+        Declare a phase.
+
+        Parameters
+        ----------
+        name : str
+            Phase name (key of the recorded timing)
+        duration : float
+            Intended duration (seconds); rounded to whole frames, at least one
+        draw : callable, optional
+            Draws the phase's stimuli (without flipping); None for blank
+        trigger_code : int, optional
+            Trigger sent on the phase's first flip
+        event_name : str, optional
+            Event name of the trigger (default: name)
+        """
+        self.name = name
+        self.duration = duration
+        self.draw = draw
+        self.trigger_code = trigger_code
+        self.event_name = event_name or name
+
+
+def measure_frame_rate(win: 'visual.Window', default: float = 60.0) -> float:
+    """
+    Measure the display refresh rate.
+
+    Parameters
+    ----------
+    win : visual.Window
+        PsychoPy window
+    default : float
+        Rate used if no stable measurement is obtained (Hz)
+
+    Returns
+    -------
+    float
+        Refresh rate (Hz)
+    """
+    try:
+        rate = win.getActualFrameRate(nIdentical=10, nMaxFrames=120, nWarmUpFrames=10, threshold=1)
+    except Exception:
+        rate = None
+    if rate is None:
+        print(f"[WARNING] Could not measure a stable refresh rate, assuming {default:g} Hz")
+        return float(default)
+    return float(rate)
+
+
+def duration_to_frames(duration: float, frame_rate: float) -> int:
+    """Whole number of frames (at least one) closest to a duration."""
+    return max(1, int(round(duration * frame_rate)))
+
+
+class FrameTimeline:
+    """
+    Runs declared phases frame by frame on a window.
+
+    Create once per block (the refresh rate is measured once) and call run()
+    for each part of a trial.
+    """
+
+    def __init__(self, win: 'visual.Window', trigger_handler: 'TriggerHandler',
+                 frame_rate: Optional[float] = None, drop_tolerance: float = DROP_TOLERANCE):
+        """
+        Create a timeline runner.
+
+        Parameters
+        ----------
+        win : visual.Window
+            PsychoPy window
+        trigger_handler : TriggerHandler
+            Handler used for phase onset triggers
+        frame_rate : float, optional
+            Refresh rate (Hz); measured on win if None
+        drop_tolerance : float
+            Extra fraction of a refresh period tolerated before a frame counts as dropped
+        """
+        self.win = win
+        self.trigger_handler = trigger_handler
+        self.frame_rate = frame_rate if frame_rate else measure_frame_rate(win)
+        self.frame_period = 1.0 / self.frame_rate
+        self.drop_tolerance = drop_tolerance
+
+    def _send_on_flip(self, phase: TimelinePhase, record: Dict[str, any]):
+        """win.callOnFlip target: send the phase trigger and keep its timestamp."""
+        timestamp, _ = self.trigger_handler.send_trigger(phase.trigger_code, event_name=phase.event_name)
+        record['trigger_timestamp'] = timestamp
+
+    def _dropped(self, intervals: np.ndarray) -> int:
+        """Frames missed in a sequence of flip-to-flip intervals."""
+        late = intervals > self.frame_period * (1 + self.drop_tolerance)
+        return int(np.sum(np.round(intervals[late] / self.frame_period) - 1))
+
+    def run(self, phases: List[TimelinePhase]) -> List[Dict[str, any]]:
+        """
+        Present phases back to back, one flip per frame.
+
+        The last phase stays on screen after run() returns (its final frame is
+        not followed by another flip), so its duration is estimated from its
+        last flip plus one refresh period.
+
+        Parameters
+        ----------
+        phases : list of TimelinePhase
+            Phases in presentation order
+
+        Returns
+        -------
+        list of dict
+            Per phase: 'phase', 'n_frames', 'planned_duration' (whole frames, s),
+            'onset' (flip time of the first frame), 'duration' (measured, s),
+            'dropped_frames' and 'trigger_timestamp' (TriggerHandler clock, or None)
+        """
+        records = []
+        flip_times = []
+        for phase in phases:
+            n_frames = duration_to_frames(phase.duration, self.frame_rate)
+            record = {
+                'phase': phase.name,
+                'n_frames': n_frames,
+                'planned_duration': n_frames * self.frame_period,
+                'trigger_timestamp': None
+            }
+            flips = np.empty(n_frames)
+            for frame in range(n_frames):
+                if phase.draw is not None:
+                    phase.draw()
+                if frame == 0 and phase.trigger_code is not None:
+                    self.win.callOnFlip(self._send_on_flip, phase, record)
+                flips[frame] = self.win.flip()
+            records.append(record)
+            flip_times.append(flips)
+
+        # Each phase ends at the next phase's first flip (the last one a period after its last flip)
+        for i, (record, flips) in enumerate(zip(records, flip_times)):
+            end = flip_times[i + 1][0] if i + 1 < len(flip_times) else flips[-1] + self.frame_period
+            record['onset'] = float(flips[0])
+            record['duration'] = float(end - flips[0])
+            record['dropped_frames'] = self._dropped(np.diff(np.append(flips, end)))
+        return records
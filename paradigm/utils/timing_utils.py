@@ -6,7 +6,12 @@ and reduce anticipatory responses in participants.
 """
 
 import random
-from typing import Optional
+import time
+from typing import Callable, List, Optional
+
+# Below this much time before a deadline, stop sleeping and spin (OS sleep
+# granularity is ~1 ms, up to 15.6 ms on older Windows timers)
+SPIN_WINDOW = 0.002
 
 
 def jittered_wait(base_duration: float, jitter_range: float = 0.1) -> float:
@@ -52,3 +57,95 @@ def get_jittered_duration(base_duration: float, jitter_range: float = 0.1) -> fl
         Jittered duration in seconds
     """
     return jittered_wait(base_duration, jitter_range)
+
+
+def wait_until(deadline: float, clock: Callable[[], float] = time.perf_counter,
+               spin_window: float = SPIN_WINDOW) -> float:
+    """
+    Wait until an absolute deadline with a hybrid sleep-then-spin.
+    
+    Sleeps (releasing the CPU) until spin_window before the deadline, then
+    busy-waits on the clock, so the wait ends within microseconds of the
+    deadline instead of within the OS sleep granularity.
+    
+    Parameters
+    ----------
+    deadline : float
+        Absolute time to wait for, on the same clock
+    clock : callable
+        Monotonic clock returning seconds (default: time.perf_counter)
+    spin_window : float
+        Busy-wait duration before the deadline (seconds)
+    
+    Returns
+    -------
+    float
+        Lateness: time past the deadline when the wait returned (seconds,
+        positive if the deadline had already passed)
+    """
+    remaining = deadline - clock()
+    if remaining > spin_window:
+        time.sleep(remaining - spin_window)
+    now = clock()
+    while now < deadline:
+        now = clock()
+    return now - deadline
+
+
+class DeadlineScheduler:
+    """
+    Drift-free scheduler for a periodic event train (e.g. the beep rhythm).
+    
+    Event k is due at the absolute deadline t0 + k * interval on a monotonic
+    clock. Waiting for an absolute deadline (rather than sleeping a fixed
+    interval after each event) means the work done between events (trigger,
+    sound, drawing, printing) never adds to the period, and lateness of one
+    event does not accumulate into the next.
+    """
+    
+    def __init__(self, interval: float, clock: Callable[[], float] = time.perf_counter,
+                 spin_window: float = SPIN_WINDOW):
+        """
+        Create a scheduler.
+        
+        Parameters
+        ----------
+        interval : float
+            Period between events (seconds)
+        clock : callable
+            Monotonic clock returning seconds (default: time.perf_counter)
+        spin_window : float
+            Busy-wait duration before each deadline (seconds)
+        """
+        self.interval = interval
+        self.clock = clock
+        self.spin_window = spin_window
+        self.t0 = None
+        self.lateness = []  # Per waited event, seconds past its deadline
+    
+    def start(self, t0: Optional[float] = None) -> float:
+        """Anchor event 0 at t0 (default: now) and reset the lateness log."""
+        self.t0 = self.clock() if t0 is None else t0
+        self.lateness = []
+        return self.t0
+    
+    def deadline(self, k: int) -> float:
+        """Absolute due time of event k."""
+        return self.t0 + k * self.interval
+    
+    def wait(self, k: int) -> float:
+        """
+        Wait for the deadline of event k and log its lateness.
+        
+        Returns
+        -------
+        float
+            Lateness (seconds past the deadline)
+        """
+        lateness = wait_until(self.deadline(k), self.clock, self.spin_window)
+        self.lateness.append(lateness)
+        return lateness
+    
+    def lateness_ms(self) -> List[float]:
+        """Logged lateness of every waited event (milliseconds)."""
+        return [late * 1e3 for late in self.lateness]
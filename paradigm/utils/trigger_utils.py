@@ -9,9 +9,14 @@ Includes CSV mirror logging for trigger verification.
 from psychopy import core
 from typing import Optional, Tuple, List, TYPE_CHECKING
 from pathlib import Path
+import atexit
 import csv
 import logging
+import os
+import signal
+import threading
 import time
+import weakref
 from datetime import datetime
 
 if TYPE_CHECKING:
@@ -19,6 +24,216 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+TRIGGER_CSV_COLUMNS = [
+    'timestamp_psychopy',  # PsychoPy clock time
+    'timestamp_absolute',   # Absolute datetime
+    'trigger_code',         # Numeric trigger code
+    'event_name',           # Human-readable event name
+    'sent_to_eeg'           # Whether trigger was sent to EEG
+]
+
+# Open log writers, flushed on interpreter exit or a termination signal
+_open_writers = weakref.WeakSet()
+_previous_handlers = {}
+_pending_signals = []
+_crash_handlers_installed = False
+
+
+def _close_open_writers():
+    """Flush, fsync and close every open TriggerLogWriter."""
+    for writer in list(_open_writers):
+        writer.close()
+
+
+def _handle_pending_signals():
+    """Save buffered trigger rows, then defer to the previous handler (or exit)."""
+    while _pending_signals:
+        signum, frame = _pending_signals.pop(0)
+        _close_open_writers()
+        previous = _previous_handlers.get(signum)
+        if callable(previous):
+            previous(signum, frame)
+        else:
+            raise SystemExit(128 + signum)
+
+
+def _on_termination_signal(signum, frame):
+    """
+    SIGTERM/SIGBREAK handler.
+    
+    Signal handlers run on the main thread between bytecodes, possibly in the
+    middle of a flush() on that thread; the writers are then closed when that
+    flush() returns instead of re-entering it.
+    """
+    _pending_signals.append((signum, frame))
+    current = threading.get_ident()
+    if not any(current in writer._flushing for writer in list(_open_writers)):
+        _handle_pending_signals()
+
+
+def _install_crash_handlers():
+    """Register the atexit and SIGTERM/SIGBREAK handlers once per process."""
+    global _crash_handlers_installed
+    if _crash_handlers_installed:
+        return
+    _crash_handlers_installed = True
+    atexit.register(_close_open_writers)
+    for name in ('SIGTERM', 'SIGBREAK'):
+        signum = getattr(signal, name, None)
+        if signum is None:
+            continue
+        try:
+            _previous_handlers[signum] = signal.signal(signum, _on_termination_signal)
+        except ValueError:
+            # Not the main thread: rely on atexit and explicit close()
+            pass
+
+
+class TriggerLogWriter:
+    """
+    Buffered CSV mirror log of triggers.
+    
+    record() only stores a raw tuple (clock time, send wall time, code, name,
+    sent flag) in a preallocated ring buffer: no string formatting or file
+    I/O happens between stimulus events. Rows are formatted and written by
+    flush(), called during inter-trial intervals or from an optional
+    background thread, and fsync'ed by sync() (block end) and close().
+    Buffered rows are also saved on interpreter exit (atexit) and on
+    SIGTERM/SIGBREAK; Ctrl+C raises KeyboardInterrupt, whose cleanup closes
+    the handler.
+    """
+    
+    def __init__(self, path: Path, capacity: int = 4096,
+                 flush_interval: Optional[float] = None):
+        """
+        Open (append to) the CSV file.
+        
+        Parameters
+        ----------
+        path : Path
+            CSV file; the header is written if the file is new
+        capacity : int
+            Ring buffer size (rows); a full buffer is flushed synchronously
+        flush_interval : float, optional
+            Flush from a background thread every flush_interval seconds
+            (default: only on flush()/sync()/close())
+        """
+        self.path = path
+        self.capacity = capacity
+        self._buffer = [None] * capacity
+        self._head = 0  # Rows recorded
+        self._tail = 0  # Rows written
+        self._lock = threading.Lock()
+        self._flushing = set()  # Threads inside flush() (see _on_termination_signal)
+        
+        path.parent.mkdir(parents=True, exist_ok=True)
+        file_exists = path.exists()
+        self.mode = 'a' if file_exists else 'w'
+        self._file = open(path, self.mode, newline='')
+        self._writer = csv.writer(self._file)
+        if not file_exists:
+            self._writer.writerow(TRIGGER_CSV_COLUMNS)
+            self._file.flush()
+        
+        _install_crash_handlers()
+        _open_writers.add(self)
+        
+        self._stop = threading.Event()
+        self._thread = None
+        if flush_interval:
+            self._thread = threading.Thread(target=self._flush_loop, args=(flush_interval,),
+                                            name='TriggerLogWriter', daemon=True)
+            self._thread.start()
+    
+    def record(self, timestamp: float, trigger_code: int, event_name: Optional[str],
+               sent_to_eeg: bool, wall_time: Optional[float] = None):
+        """Store one trigger (no formatting, no I/O unless the buffer is full).
+
+        wall_time is the time.time() of the send (default: now); pass it when
+        rows are recorded after the fact, e.g. from the dispatch thread.
+        """
+        if wall_time is None:
+            wall_time = time.time()
+        if self._head - self._tail >= self.capacity:
+            self.flush()
+        self._buffer[self._head % self.capacity] = (timestamp, wall_time, trigger_code,
+                                                     event_name, sent_to_eeg)
+        self._head += 1
+    
+    @property
+    def pending(self) -> int:
+        """Rows recorded but not yet written."""
+        return self._head - self._tail
+    
+    def flush(self, sync: bool = False):
+        """
+        Format and write all buffered rows.
+        
+        Parameters
+        ----------
+        sync : bool
+            Also fsync the file (guarantees the rows are on disk)
+        """
+        current = threading.get_ident()
+        self._flushing.add(current)
+        try:
+            with self._lock:
+                if self._file is None:
+                    return
+                # Take the rows out of the buffer before formatting them
+                head = self._head
+                slots = [i % self.capacity for i in range(self._tail, head)]
+                entries = [self._buffer[slot] for slot in slots]
+                for slot in slots:
+                    self._buffer[slot] = None
+                self._tail = head
+                
+                rows = [[
+                    f'{timestamp:.6f}',
+                    datetime.fromtimestamp(wall_time).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
+                    trigger_code,
+                    event_name or f'trigger_{trigger_code}',
+                    'yes' if sent_to_eeg else 'no'
+                ] for timestamp, wall_time, trigger_code, event_name, sent_to_eeg in entries]
+                if rows:
+                    self._writer.writerows(rows)
+                    self._file.flush()
+                if sync:
+                    os.fsync(self._file.fileno())
+        finally:
+            self._flushing.discard(current)
+        # A termination signal that arrived during this flush is handled now
+        if _pending_signals and current == threading.main_thread().ident:
+            _handle_pending_signals()
+    
+    def sync(self):
+        """Write all buffered rows and fsync (call at block end)."""
+        self.flush(sync=True)
+    
+    def close(self):
+        """Stop the flush thread, write and fsync all rows, close the file."""
+        if self._thread is not None:
+            self._stop.set()
+            # Never wait for the flush thread while this thread may hold the lock it needs
+            if threading.get_ident() not in self._flushing:
+                self._thread.join()
+                self._thread = None
+        if self._file is None:
+            return
+        self.sync()
+        with self._lock:
+            self._file.close()
+            self._file = None
+        _open_writers.discard(self)
+    
+    def _flush_loop(self, interval: float):
+        """Background flushing until close()."""
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Failed to flush trigger CSV: {e}")
+
 
 class TriggerHandler:
     """
@@ -35,7 +250,9 @@ class TriggerHandler:
     
     def __init__(self, port_address: int = 0x0378, use_triggers: bool = False,
                  csv_log_path: Optional[Path] = None,
-                 biosemi_connection: Optional['serial.Serial'] = None):
+                 biosemi_connection: Optional['serial.Serial'] = None,
+                 dispatch_thread: bool = False,
+                 log_flush_interval: Optional[float] = None):
         """
         Initialize trigger handler.
         
@@ -49,6 +266,13 @@ class TriggerHandler:
             Path to CSV file for trigger logging (mirror log)
         biosemi_connection : serial.Serial, optional
             Biosemi serial port connection. If provided, triggers will be sent to Biosemi.
+        dispatch_thread : bool
+            Send Biosemi triggers from a dedicated thread (see TriggerDispatcher):
+            send_trigger() only enqueues, and CSV rows carry the hardware send
+            time once collected with drain_dispatched()
+        log_flush_interval : float, optional
+            Flush the buffered CSV log from a background thread every this
+            many seconds (default: only in flush_log() and close())
         """
         self.port_address = port_address
         self.use_triggers = use_triggers
@@ -56,9 +280,10 @@ class TriggerHandler:
         self.parallel_port = None
         self.clock = core.Clock()
         self.csv_log_path = csv_log_path
-        self.csv_file = None
-        self.csv_writer = None
+        self.csv_log = None
+        self.log_flush_interval = log_flush_interval
         self.trigger_log = []  # In-memory log of all triggers
+        self.dispatcher = None
         
         # Initialize CSV logging if path provided
         if self.csv_log_path is not None:
@@ -78,38 +303,25 @@ class TriggerHandler:
         else:
             # Biosemi is available, skip parallel port initialization
             self.parallel_port = None
+        
+        # Optional dispatch thread (owns the serial port from here on)
+        if dispatch_thread and self.biosemi_connection is not None:
+            from .biosemi_utils import TriggerDispatcher
+            self.dispatcher = TriggerDispatcher(clock=self.clock.getTime)
+            self.dispatcher.start()
+            logger.info("Trigger dispatch thread started")
     
     def _init_csv_logging(self):
-        """Initialize CSV file for trigger logging."""
+        """Initialize the buffered CSV file for trigger logging."""
         try:
-            # Create parent directory if needed
-            self.csv_log_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            # Check if file exists - if so, append (for multi-block sessions)
-            # Otherwise create new file
-            file_exists = self.csv_log_path.exists()
-            mode = 'a' if file_exists else 'w'
-            
-            # Open CSV file for writing/appending
-            self.csv_file = open(self.csv_log_path, mode, newline='')
-            self.csv_writer = csv.writer(self.csv_file)
-            
-            # Write header only if new file
-            if not file_exists:
-                self.csv_writer.writerow([
-                    'timestamp_psychopy',  # PsychoPy clock time
-                    'timestamp_absolute',   # Absolute datetime
-                    'trigger_code',         # Numeric trigger code
-                    'event_name',           # Human-readable event name
-                    'sent_to_eeg'           # Whether trigger was sent to EEG
-                ])
-            
-            logger.info(f"CSV trigger logging initialized: {self.csv_log_path} (mode: {mode})")
+            # Appends if the file exists (for multi-block sessions), otherwise creates it
+            self.csv_log = TriggerLogWriter(self.csv_log_path,
+                                            flush_interval=self.log_flush_interval)
+            logger.info(f"CSV trigger logging initialized: {self.csv_log_path} (mode: {self.csv_log.mode})")
         except Exception as e:
             logger.warning(f"Could not initialize CSV logging: {e}")
             self.csv_log_path = None
-            self.csv_file = None
-            self.csv_writer = None
+            self.csv_log = None
     
     def send_trigger(self, trigger_code: int, hold_duration: float = 0.01,
                      event_name: Optional[str] = None) -> Tuple[float, bool]:
@@ -136,11 +348,15 @@ class TriggerHandler:
         Returns
         -------
         timestamp : float
-            Timestamp when trigger was sent
+            Timestamp when trigger was sent (enqueue time in dispatch mode)
         success : bool
-            Whether trigger was sent successfully
+            Whether trigger was sent successfully (queued, in dispatch mode)
         """
-        timestamp = self.clock.getTime()
+        # Dispatch mode: enqueue only; the thread sends, drain_dispatched() logs
+        if self.dispatcher is not None:
+            return self.dispatcher.submit(trigger_code, event_name), True
+        
+        timestamp, wall_time = self.clock.getTime(), time.time()
         success = False
         
         # Priority 1: Send to Biosemi data stream FIRST (if connected)
@@ -177,35 +393,67 @@ class TriggerHandler:
             logger.debug(f"Trigger {trigger_code} simulated at {timestamp:.3f}s")
         
         # Priority 3: Always log to CSV mirror file
-        self._log_trigger_to_csv(timestamp, trigger_code, event_name, success)
+        self._record(timestamp, trigger_code, event_name, success, wall_time)
         
-        # Store in memory log
+        return timestamp, success
+    
+    def _record(self, timestamp: float, trigger_code: int,
+                event_name: Optional[str], sent_to_eeg: bool, wall_time: Optional[float] = None):
+        """Log one trigger to the CSV mirror file and the in-memory log."""
+        self._log_trigger_to_csv(timestamp, trigger_code, event_name, sent_to_eeg, wall_time)
         self.trigger_log.append({
             'timestamp': timestamp,
             'trigger_code': trigger_code,
             'event_name': event_name or f'trigger_{trigger_code}',
-            'sent_to_eeg': success
+            'sent_to_eeg': sent_to_eeg
         })
+    
+    def drain_dispatched(self) -> int:
+        """
+        Log the triggers the dispatch thread has sent since the last call.
         
-        return timestamp, success
+        Call this outside timed phases (e.g. the inter-trial interval); rows
+        are written with the hardware send time (clock and wall time). No-op
+        without a dispatcher.
+        
+        Returns
+        -------
+        int
+            Number of triggers logged
+        """
+        if self.dispatcher is None:
+            return 0
+        sent = self.dispatcher.drain()
+        for trigger_code, event_name, queued_at, sent_at, sent_wall, success in sent:
+            if not success:
+                logger.warning(f"Failed to send trigger {trigger_code} to Biosemi")
+            self._record(sent_at, trigger_code, event_name, success, sent_wall)
+        return len(sent)
     
     def _log_trigger_to_csv(self, timestamp: float, trigger_code: int,
-                            event_name: Optional[str], sent_to_eeg: bool):
-        """Log trigger to CSV file."""
-        if self.csv_writer is not None:
+                            event_name: Optional[str], sent_to_eeg: bool,
+                            wall_time: Optional[float] = None):
+        """Log trigger to CSV file (buffered; written by flush_log() or close())."""
+        if self.csv_log is not None:
+            self.csv_log.record(timestamp, trigger_code, event_name, sent_to_eeg, wall_time)
+    
+    def flush_log(self, sync: bool = False):
+        """
+        Write buffered CSV rows (call outside timed phases, e.g. the ITI).
+        
+        Also logs triggers sent by the dispatch thread since the last call.
+        
+        Parameters
+        ----------
+        sync : bool
+            Also fsync the CSV file (e.g. at block end)
+        """
+        self.drain_dispatched()
+        if self.csv_log is not None:
             try:
-                absolute_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
-                self.csv_writer.writerow([
-                    f'{timestamp:.6f}',
-                    absolute_time,
-                    trigger_code,
-                    event_name or f'trigger_{trigger_code}',
-                    'yes' if sent_to_eeg else 'no'
-                ])
-                # Flush immediately to ensure data is written
-                self.csv_file.flush()
+                self.csv_log.flush(sync=sync)
             except Exception as e:
-                logger.warning(f"Failed to write trigger to CSV: {e}")
+                logger.warning(f"Failed to write trigger CSV: {e}")
     
     def send_trigger_with_logging(self, trigger_code: int, log_stream=None, 
                                    hold_duration: float = 0.01) -> Tuple[float, bool]:
@@ -245,6 +493,12 @@ class TriggerHandler:
     
     def close(self):
         """Clean up parallel port connection and close CSV file."""
+        # Send anything still queued, then log it
+        if self.dispatcher is not None:
+            self.dispatcher.stop()
+            self.drain_dispatched()
+            self.dispatcher = None
+        
         # Reset parallel port
         if self.parallel_port:
             try:
@@ -253,15 +507,14 @@ class TriggerHandler:
                 pass
             self.parallel_port = None
         
-        # Close CSV file
-        if self.csv_file is not None:
+        # Write remaining rows, fsync and close CSV file
+        if self.csv_log is not None:
             try:
-                self.csv_file.close()
+                self.csv_log.close()
                 logger.info(f"CSV trigger log saved: {self.csv_log_path}")
             except Exception as e:
                 logger.warning(f"Error closing CSV file: {e}")
-            self.csv_file = None
-            self.csv_writer = None
+            self.csv_log = None
     
     def get_trigger_log(self) -> list:
         """Get in-memory log of all triggers sent."""
@@ -454,7 +707,9 @@ def get_block_end_code(block_num: int) -> int:
 
 def create_trigger_handler(port_address: int = 0x0378, use_triggers: bool = False,
                            csv_log_path: Optional[Path] = None,
-                           biosemi_connection: Optional['serial.Serial'] = None) -> TriggerHandler:
+                           biosemi_connection: Optional['serial.Serial'] = None,
+                           dispatch_thread: bool = False,
+                           log_flush_interval: Optional[float] = None) -> TriggerHandler:
     """
     Factory function to create trigger handler.
     
@@ -468,6 +723,10 @@ def create_trigger_handler(port_address: int = 0x0378, use_triggers: bool = Fals
         Path to CSV file for trigger logging (mirror log)
     biosemi_connection : serial.Serial, optional
         Biosemi serial port connection. If provided, triggers will be sent to Biosemi.
+    dispatch_thread : bool
+        Send Biosemi triggers from a dedicated dispatch thread
+    log_flush_interval : float, optional
+        Background flush period of the buffered CSV log (seconds)
     
     Returns
     -------
@@ -478,5 +737,7 @@ def create_trigger_handler(port_address: int = 0x0378, use_triggers: bool = Fals
         port_address=port_address,
         use_triggers=use_triggers,
         csv_log_path=csv_log_path,
-        biosemi_connection=biosemi_connection
+        biosemi_connection=biosemi_connection,
+        dispatch_thread=dispatch_thread,
+        log_flush_interval=log_flush_interval
     )
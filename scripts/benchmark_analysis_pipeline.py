@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Benchmark the tangent-space logistic regression pipeline on synthetic EEG.
+
+Generates an mne.EpochsArray shaped like our sessions (two classes with a weak
+band-limited difference), writes it to a temporary ica_epo.fif and times every
+stage of the analysis/ pipeline separately: load + preprocess, filter bank,
+notch, covariance, tangent space (per fold) and LR fit (per fold).
+
+Each stage reports wall time, per-stage throughput (epochs/s) and its own
+memory: the RSS at stage start and the peak RSS sampled while the stage runs,
+whose difference is the stage's working memory. The process-wide maximum RSS
+(ru_maxrss) only ever grows, so it is reported once, as the cumulative peak of
+the whole run. The report is printed and optionally written as JSON so runs can
+be compared across commits.
+
+Bands, notch frequencies, epoch windows and LR settings are imported from
+analysis/utils/pipeline_utils.py, the same values the classifier uses.
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import mne
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold
+
+# Add parent directory to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from analysis.utils import (
+    FilterBank, get_crop_slice, apply_iir_notch,
+    lwf_covariances,
+    FoldTangentSpace,
+    select_bands, concat_bands,
+    POWER_NOISE, BASELINE, CROP, LR_MAX_ITER, CV_SPLITS, CV_RANDOM_STATE, get_possible_freqs
+)
+
+EPOCH_WINDOW = (-0.5, 2.0)  # Synthetic epochs span the session epochs
+RSS_SAMPLE_INTERVAL = 0.005  # Seconds between RSS samples while a stage runs
+
+
+def current_rss_mb():
+    """Current resident set size of this process (MB), or None if unavailable."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1e6
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def max_rss_mb():
+    """Process-wide maximum RSS so far (MB), i.e. the cumulative peak, or None."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+
+class StageMemory:
+    """
+    Peak RSS of one stage, sampled from a background thread.
+
+    Use as a context manager around the stage; entering it again (e.g. once per
+    fold) keeps the largest peak and the largest increase over the RSS at entry.
+    """
+
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.start_mb = None
+        self.peak_mb = None
+        self.delta_mb = None
+
+    def _sample(self, stop, samples):
+        while not stop.wait(self.interval):
+            samples.append(current_rss_mb())
+
+    def __enter__(self):
+        start = current_rss_mb()
+        if start is None:
+            self._thread = None
+            return self
+        if self.start_mb is None:
+            self.start_mb = start
+        self._entry_mb = start
+        self._samples = [start]
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, args=(self._stop, self._samples),
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._thread is None:
+            return False
+        self._stop.set()
+        self._thread.join()
+        self._samples.append(current_rss_mb())
+        peak = max(self._samples)
+        self.peak_mb = peak if self.peak_mb is None else max(self.peak_mb, peak)
+        delta = peak - self._entry_mb
+        self.delta_mb = delta if self.delta_mb is None else max(self.delta_mb, delta)
+        return False
+
+    def report(self):
+        """RSS at stage start, peak RSS during the stage and their difference (MB)."""
+        return {'rss_start_mb': self.start_mb, 'peak_rss_mb': self.peak_mb,
+                'peak_delta_mb': self.delta_mb}
+
+
+def get_git_commit():
+    """Current git commit of the repository, or None."""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=project_root,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_synthetic_epochs(n_channels=64, n_epochs=800, sfreq=256.0, seed=0):
+    """
+    Create two-class synthetic epochs shaped like a session.
+
+    Parameters
+    ----------
+    n_channels : int
+        EEG channels
+    n_epochs : int
+        Epochs (split evenly between two classes)
+    sfreq : float
+        Sampling frequency (Hz)
+    seed : int
+        Random seed
+
+    Returns
+    -------
+    mne.EpochsArray
+        Epochs with event ids {'class_a': 1, 'class_b': 2}
+    """
+    rng = np.random.default_rng(seed)
+    times = np.arange(int(round((EPOCH_WINDOW[1] - EPOCH_WINDOW[0]) * sfreq)) + 1) / sfreq
+    labels = np.arange(n_epochs) % 2
+
+    # Pink-ish background noise, power-line noise and a weak class-specific 10 Hz source
+    data = np.cumsum(rng.standard_normal((n_epochs, n_channels, len(times))), axis=-1)
+    data -= data.mean(axis=-1, keepdims=True)
+    data += 5 * rng.standard_normal(data.shape)
+    for noise_freq in POWER_NOISE:
+        data += 3 * np.sin(2 * np.pi * noise_freq * times)
+    pattern = rng.standard_normal(n_channels)
+    phases = rng.uniform(0, 2 * np.pi, n_epochs)
+    source = np.sin(2 * np.pi * 10 * times + phases[:, None])
+    data += 0.3 * labels[:, None, None] * pattern[None, :, None] * source[:, None, :]
+    data *= 1e-6
+
+    info = mne.create_info([f'EEG{i + 1:03d}' for i in range(n_channels)], sfreq, 'eeg')
+    events = np.column_stack([np.arange(n_epochs) * len(times), np.zeros(n_epochs, int),
+                              labels + 1])
+    return mne.EpochsArray(data, info, events=events, tmin=EPOCH_WINDOW[0],
+                           event_id={'class_a': 1, 'class_b': 2}, verbose=False)
+
+
+def run_benchmark(n_channels=64, n_epochs=800, sfreq=256.0, n_folds=CV_SPLITS, top_n_bands=5,
+                  n_jobs=1, seed=0, precision='float64'):
+    """
+    Time every pipeline stage on synthetic epochs.
+
+    Parameters
+    ----------
+    n_channels, n_epochs : int
+        Shape of the synthetic session
+    sfreq : float
+        Sampling frequency (Hz)
+    n_folds : int
+        Cross-validation folds
+    top_n_bands : int
+        Bands kept per fold (0 = all)
+    n_jobs : int
+        Threads for the tangent space and LR
+    seed : int
+        Random seed
+    precision : str
+        'float64' or 'float32' filter bank, covariances and features
+
+    Returns
+    -------
+    dict
+        Benchmark report
+    """
+    stages = {}
+
+    def record(name, start, n_items, memory):
+        seconds = time.perf_counter() - start
+        stages[name] = {
+            'seconds': seconds,
+            'epochs_per_s': n_items / seconds if seconds > 0 else None,
+            **memory.report(),
+        }
+        print(f"  {name:<14s} {seconds:8.3f} s  stage peak RSS {memory.peak_mb or 0:8.1f} MB "
+              f"(+{memory.delta_mb or 0:.1f} MB)")
+
+    bands = get_possible_freqs()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        epo_file = os.path.join(tmp_dir, 'ica_epo.fif')
+        make_synthetic_epochs(n_channels, n_epochs, sfreq, seed).save(epo_file, verbose=False)
+
+        start = time.perf_counter()
+        with StageMemory() as memory:
+            epochs = mne.read_epochs(epo_file, preload=True, verbose=False)
+            epochs = epochs.pick('eeg').apply_baseline(BASELINE, verbose=False)
+            epochs = epochs.resample(sfreq, verbose=False)
+            data = epochs.get_data()
+            y = epochs.events[:, 2]
+        record('load', start, n_epochs, memory)
+
+    start = time.perf_counter()
+    with StageMemory() as memory:
+        filter_bank = FilterBank(bands, sfreq)
+        x = filter_bank.apply(data, crop=get_crop_slice(epochs.times, *CROP), dtype=precision)
+    record('filter_bank', start, n_epochs, memory)
+    del data
+
+    start = time.perf_counter()
+    with StageMemory() as memory:
+        for b, band in enumerate(bands):
+            for noise_freq in POWER_NOISE:
+                if band[0] < noise_freq < band[1]:
+                    x[b] = apply_iir_notch(x[b], sfreq, noise_freq)
+    record('notch', start, n_epochs, memory)
+
+    start = time.perf_counter()
+    with StageMemory() as memory:
+        covs = lwf_covariances(x, dtype=precision)
+    record('covariance', start, n_epochs, memory)
+    del x
+
+    cv = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=CV_RANDOM_STATE)
+    lr = LogisticRegression(max_iter=LR_MAX_ITER, penalty='l1', solver='saga')
+    ts_seconds, fit_seconds, scores = 0.0, 0.0, []
+    ts_memory, fit_memory = StageMemory(), StageMemory()
+
+    start = time.perf_counter()
+    with ts_memory:
+        ts = FoldTangentSpace(covs, n_jobs=n_jobs)
+    ts_seconds += time.perf_counter() - start
+    for train_idx, test_idx in cv.split(covs[0], y):
+        start = time.perf_counter()
+        with ts_memory:
+            band_features = ts.fold_features(train_idx)
+        ts_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        with fit_memory:
+            features = concat_bands(band_features, select_bands(band_features, y, train_idx,
+                                                                top_n_bands or None))
+            lr.fit(features[train_idx], y[train_idx])
+            scores.append(lr.score(features[test_idx], y[test_idx]))
+        fit_seconds += time.perf_counter() - start
+
+    for name, seconds, memory in (('tangent_space', ts_seconds, ts_memory),
+                                  ('lr_fit', fit_seconds, fit_memory)):
+        stages[name] = {
+            'seconds': seconds,
+            'seconds_per_fold': seconds / n_folds,
+            'epochs_per_s': n_folds * n_epochs / seconds if seconds > 0 else None,
+            **memory.report(),
+        }
+        print(f"  {name:<14s} {seconds:8.3f} s  ({seconds / n_folds:.3f} s/fold)  "
+              f"stage peak RSS {memory.peak_mb or 0:8.1f} MB (+{memory.delta_mb or 0:.1f} MB)")
+
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'git_commit': get_git_commit(),
+        'platform': {'python': platform.python_version(), 'machine': platform.machine(),
+                     'cpu_count': os.cpu_count(), 'numpy': np.__version__,
+                     'mne': mne.__version__},
+        'params': {'n_channels': n_channels, 'n_epochs': n_epochs, 'sfreq': sfreq,
+                   'n_bands': len(bands), 'n_folds': n_folds, 'top_n_bands': top_n_bands,
+                   'n_jobs': n_jobs, 'seed': seed, 'precision': precision},
+        'stages': stages,
+        'total_seconds': sum(stage['seconds'] for stage in stages.values()),
+        'cumulative_peak_rss_mb': max_rss_mb(),
+        'median_score': float(np.median(scores)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the tangent-space LR pipeline on synthetic EEG',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Session-sized run (64 channels, 800 epochs)
+  python scripts/benchmark_analysis_pipeline.py --output benchmark.json
+
+  # Quick run
+  python scripts/benchmark_analysis_pipeline.py --n-channels 16 --n-epochs 100
+        """
+    )
+    parser.add_argument('--n-channels', type=int, default=64,
+                        help='EEG channels (default: 64)')
+    parser.add_argument('--n-epochs', type=int, default=800,
+                        help='Epochs, split between 2 classes (default: 800)')
+    parser.add_argument('--sfreq', type=float, default=256.0,
+                        help='Sampling frequency in Hz (default: 256)')
+    parser.add_argument('--n-folds', type=int, default=CV_SPLITS,
+                        help=f'Cross-validation folds (default: {CV_SPLITS})')
+    parser.add_argument('--top-n-bands', type=int, default=5,
+                        help='Bands kept per fold, 0 = all (default: 5)')
+    parser.add_argument('--n-jobs', type=int, default=1,
+                        help='Threads for the tangent space (default: 1)')
+    parser.add_argument('--precision', choices=['float64', 'float32'], default='float64',
+                        help='Pipeline precision (default: float64)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Random seed (default: 0)')
+    parser.add_argument('--output', '-o', type=str, default=None,
+                        help='Write the JSON report to this file')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("ANALYSIS PIPELINE BENCHMARK")
+    print("=" * 60)
+    print(f"{args.n_epochs} epochs x {args.n_channels} channels @ {args.sfreq:g} Hz, "
+          f"{args.n_folds} folds")
+
+    report = run_benchmark(args.n_channels, args.n_epochs, args.sfreq, args.n_folds,
+                           args.top_n_bands, args.n_jobs, args.seed, args.precision)
+
+    print(f"\nTotal: {report['total_seconds']:.2f} s, "
+          f"cumulative peak RSS {report['cumulative_peak_rss_mb'] or 0:.1f} MB, "
+          f"median score {report['median_score']:.3f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,17 @@
 #!/usr/bin/env python3
 """
 Comprehensive evaluation of collected data - complete summary report.
+
+Evaluates one participant's latest session, or with --all every session under
+data/results/ in one pass: all trigger CSVs are read into one frame and the
+completion and code-count checks run as group-bys, giving one cohort table.
 """
 
+import os
 import sys
 import argparse
+import importlib.util
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from collections import Counter
@@ -29,12 +36,163 @@ def find_latest_results_dir(participant_id: str = '9999') -> Path:
     latest_dir = max(matching_dirs, key=lambda p: p.stat().st_mtime)
     return latest_dir
 
+# Trigger code categories: (name, low, high) inclusive, see paradigm/utils/trigger_utils.py
+CODE_CATEGORIES = [
+    ('fixation', 1, 1),
+    ('trial_indicator', 3, 3),
+    ('concept_a', 10, 10),
+    ('concept_b', 20, 20),
+    ('mask', 25, 25),
+    ('beep_start', 30, 30),
+    ('beeps', 31, 38),
+    ('block_start', 61, 70),
+    ('block_end', 71, 80),
+    ('trial_start', 101, 110),
+    ('trial_end', 151, 160),
+]
+
+def expected_counts(config) -> pd.Series:
+    """Expected number of triggers per code category for a complete session."""
+    n_blocks = config.get('N_BLOCKS', 10)
+    n_trials = n_blocks * config.get('TRIALS_PER_BLOCK', 10)
+    per_trial = {'fixation': 1, 'trial_indicator': 1, 'mask': 1, 'beep_start': 1,
+                 'beeps': config.get('N_BEEPS', 8), 'trial_start': 1, 'trial_end': 1}
+    expected = {name: n * n_trials for name, n in per_trial.items()}
+    expected.update({'concept_a': n_trials // 2, 'concept_b': n_trials - n_trials // 2,
+                     'block_start': n_blocks, 'block_end': n_blocks})
+    return pd.Series(expected)[[name for name, _, _ in CODE_CATEGORIES]]
+
+def scan_sessions(results_base: Path, all_sessions: bool = False) -> pd.DataFrame:
+    """
+    Scan the results folder once for sessions, their block folders and trigger CSVs.
+
+    Returns one row per session (latest per participant unless all_sessions).
+    """
+    rows = []
+    with os.scandir(results_base) as entries:
+        for entry in entries:
+            if not (entry.is_dir() and entry.name.startswith('sub-')):
+                continue
+            with os.scandir(entry.path) as files:
+                names = [(f.name, f.is_dir()) for f in files]
+            rows.append({
+                'participant': entry.name[len('sub-'):].split('_')[0],
+                'session': entry.name,
+                'mtime': entry.stat().st_mtime,
+                'blocks': sum(1 for name, is_dir in names if is_dir and name.startswith('Block_')),
+                'csv_files': sorted(os.path.join(entry.path, name) for name, is_dir in names
+                                    if not is_dir and name.endswith('_triggers.csv')),
+            })
+    sessions = pd.DataFrame(rows, columns=['participant', 'session', 'mtime', 'blocks', 'csv_files'])
+    if not all_sessions and len(sessions):
+        sessions = sessions.loc[sessions.groupby('participant')['mtime'].idxmax()]
+    return sessions.sort_values(['participant', 'session']).reset_index(drop=True)
+
+def load_cohort_triggers(sessions: pd.DataFrame) -> pd.DataFrame:
+    """Read every session's trigger CSVs into one frame with a session column."""
+    engine = 'pyarrow' if importlib.util.find_spec('pyarrow') else 'c'
+    files = [(session, f) for session, csvs in zip(sessions['session'], sessions['csv_files'])
+             for f in csvs]
+    if not files:
+        return pd.DataFrame(columns=['session', 'file', 'trigger_code', 'sent_to_eeg'])
+    frames = [pd.read_csv(f, usecols=['trigger_code', 'sent_to_eeg'], engine=engine)
+              for _, f in files]
+    triggers = pd.concat(frames, keys=range(len(files)), names=['file_idx', 'row']).reset_index(0)
+    triggers['session'] = np.array([session for session, _ in files])[triggers['file_idx']]
+    triggers['file'] = np.array([Path(f).name for _, f in files])[triggers['file_idx']]
+    return triggers.drop(columns='file_idx').reset_index(drop=True)
+
+def code_category(codes: pd.Series) -> np.ndarray:
+    """Category name of every trigger code ('other' if outside the known ranges)."""
+    codes = codes.to_numpy()
+    return np.select([(codes >= low) & (codes <= high) for _, low, high in CODE_CATEGORIES],
+                     [name for name, _, _ in CODE_CATEGORIES], default='other')
+
+def evaluate_cohort(results_base: Path, all_sessions: bool = False) -> pd.DataFrame:
+    """
+    Completion and code-count checks for every session, as one table.
+
+    Returns one row per session with block and trigger completion, counts per
+    code category and the list of categories below their expected count.
+    """
+    config = load_config()
+    expected = expected_counts(config)
+    n_blocks = config.get('N_BLOCKS', 10)
+
+    sessions = scan_sessions(results_base, all_sessions)
+    triggers = load_cohort_triggers(sessions)
+    sent = triggers[triggers['sent_to_eeg'] == 'yes'].copy()
+    sent['category'] = code_category(sent['trigger_code'])
+
+    # Code counts per session and category in one group-by
+    counts = (sent.groupby(['session', 'category']).size()
+              .unstack(fill_value=0)
+              .reindex(index=sessions['session'], columns=list(expected.index) + ['other'],
+                       fill_value=0))
+    sent_per_file = triggers.assign(sent=triggers['sent_to_eeg'] == 'yes').groupby(
+        ['session', 'file'])['sent'].sum()
+    empty_csvs = (sent_per_file == 0).groupby('session').sum()
+    codes = sent.groupby('session')['trigger_code'].agg(['min', 'max'])
+    block_codes = sent[sent['category'] == 'block_start'].groupby('session')['trigger_code'].nunique()
+
+    table = sessions[['participant', 'session', 'blocks']].set_index('session')
+    table['csv_files'] = sessions.set_index('session')['csv_files'].str.len()
+    table['empty_csvs'] = empty_csvs.reindex(table.index, fill_value=0)
+    table['triggers'] = counts[expected.index].sum(axis=1) + counts['other']
+    table['expected'] = int(expected.sum())
+    table['completion_pct'] = 100.0 * table['triggers'] / table['expected']
+    table['block_codes'] = block_codes.reindex(table.index, fill_value=0)
+    table['code_min'] = codes['min'].reindex(table.index)
+    table['code_max'] = codes['max'].reindex(table.index)
+    table = table.join(counts)
+
+    short = counts[expected.index] < expected
+    table['missing'] = [', '.join(expected.index[row]) for row in short.to_numpy()]
+    complete = ((table['blocks'] == n_blocks) & (table['triggers'] == table['expected']) &
+                ~short.any(axis=1) & (table['other'] == 0) & (table['code_max'] <= 255))
+    table['status'] = np.where(complete, 'COMPLETE', 'INCOMPLETE')
+    return table.reset_index()
+
+def print_cohort(table: pd.DataFrame, n_blocks: int):
+    """Print the cohort summary table."""
+    print("="*80)
+    print(f"COHORT DATA EVALUATION ({len(table)} sessions)")
+    print("="*80)
+    if table.empty:
+        print("   No sessions found")
+        return
+    columns = ['participant', 'session', 'blocks', 'triggers', 'expected', 'completion_pct',
+               'empty_csvs', 'block_codes', 'missing', 'status']
+    print(table[columns].to_string(index=False, float_format=lambda v: f'{v:.1f}'))
+    n_complete = int((table['status'] == 'COMPLETE').sum())
+    print(f"\n   Complete sessions: {n_complete}/{len(table)} "
+          f"(blocks expected per session: {n_blocks})")
+    print("\n" + "="*80)
+
 def main():
     parser = argparse.ArgumentParser(description='Comprehensive data evaluation')
     parser.add_argument('--participant-id', type=str, default='9999',
                        help='Participant ID (default: 9999)')
+    parser.add_argument('--all', action='store_true',
+                       help='Evaluate every participant under data/results/ (one cohort table)')
+    parser.add_argument('--all-sessions', action='store_true',
+                       help='With --all: include every session, not only the latest per participant')
+    parser.add_argument('--output', type=str, default=None,
+                       help='With --all: also write the cohort table to this CSV file')
     args = parser.parse_args()
     
+    if args.all:
+        results_base = project_root / 'data' / 'results'
+        if not results_base.exists():
+            print(f"ERROR: Results directory not found: {results_base}")
+            return
+        table = evaluate_cohort(results_base, args.all_sessions)
+        print_cohort(table, load_config().get('N_BLOCKS', 10))
+        if args.output:
+            table.to_csv(args.output, index=False)
+            print(f"Cohort table saved to: {args.output}")
+        return
+    
     # Find latest results directory
     try:
         results_dir = find_latest_results_dir(args.participant_id)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Build beep-level (repetition) epochs from a BDF recording.
+
+Cuts one epoch per beep (trigger codes 31-38) from the continuous BDF and
+labels it with block, trial, beep number, concept and category from the
+session's randomization protocol. Each concept is one event id (as the
+classifier expects), so epochs['eye'] selects a concept; category and beep
+number are in the metadata: epochs['category == "A"'], epochs['beep == 1'].
+
+Usage:
+    python scripts/make_beep_epochs.py --participant-id 9999
+    python scripts/make_beep_epochs.py --bdf-file data/sub_9999/sub_9999.bdf --results-dir data/results/sub-9999_20260127_155544
+"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+
+import mne
+
+# Add parent directory to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from analysis.utils import make_beep_epochs, read_bdf_events, ClockModel, load_sent_triggers
+
+
+def find_latest_results_dir(participant_id):
+    """Most recent data/results/sub-{ID}_* folder, or None."""
+    results_dirs = list((project_root / 'data' / 'results').glob(f'sub-{participant_id}_*'))
+    if not results_dirs:
+        return None
+    return max(results_dirs, key=lambda p: p.stat().st_mtime)
+
+
+def load_protocol(results_dir):
+    """Load the randomization protocol JSON saved in a results folder."""
+    protocol_files = sorted(Path(results_dir).glob('*_randomization_protocol.json'))
+    if not protocol_files:
+        raise FileNotFoundError(f"No randomization protocol found in {results_dir}")
+    with open(protocol_files[-1], 'r') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build beep-level epochs from a BDF recording',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Latest session of a participant (writes data/sub_9999/sub_9999_beep_epo.fif)
+  python scripts/make_beep_epochs.py --participant-id 9999
+
+  # Epoch at drift-corrected onsets (clock model written by validate_triggers.py)
+  python scripts/make_beep_epochs.py --participant-id 9999 \\
+      --clock-model data/results/sub-9999_20260127_155544/clock_model_9999.json
+
+  # Explicit files and window
+  python scripts/make_beep_epochs.py --bdf-file data/sub_9999/sub_9999.bdf \\
+      --results-dir data/results/sub-9999_20260127_155544 --tmin -0.2 --tmax 0.6
+        """
+    )
+    parser.add_argument('--participant-id', type=str, help='Participant ID (auto-detects files)')
+    parser.add_argument('--bdf-file', type=str, help='Path to BDF file')
+    parser.add_argument('--results-dir', type=str,
+                        help='Results directory containing the randomization protocol')
+    parser.add_argument('--tmin', type=float, default=-0.3,
+                        help='Epoch start relative to each beep in s (default: -0.3)')
+    parser.add_argument('--tmax', type=float, default=1.7,
+                        help='Epoch end relative to each beep in s (default: 1.7)')
+    parser.add_argument('--clock-model', type=str, default=None,
+                        help='Clock model JSON from validate_triggers.py: epoch at the corrected onsets '
+                             'of the sent (CSV) triggers instead of the recorded ones')
+    parser.add_argument('--output', '-o', type=str, default=None,
+                        help='Output -epo.fif file (default: next to the BDF)')
+    args = parser.parse_args()
+
+    if args.participant_id and not args.bdf_file:
+        args.bdf_file = str(project_root / 'data' / f'sub_{args.participant_id}' /
+                            f'sub_{args.participant_id}.bdf')
+    if args.participant_id and not args.results_dir:
+        results_dir = find_latest_results_dir(args.participant_id)
+        if results_dir is None:
+            print(f"[ERROR] No results directories found for participant {args.participant_id}")
+            sys.exit(1)
+        args.results_dir = str(results_dir)
+        print(f"[INFO] Auto-detected results directory: {args.results_dir}")
+
+    if not args.bdf_file or not args.results_dir:
+        print("[ERROR] Provide --participant-id or both --bdf-file and --results-dir")
+        sys.exit(1)
+
+    bdf_path = Path(args.bdf_file)
+    if not bdf_path.exists():
+        print(f"[ERROR] BDF file not found: {bdf_path}")
+        sys.exit(1)
+    output = Path(args.output) if args.output else bdf_path.with_name(f'{bdf_path.stem}_beep_epo.fif')
+
+    try:
+        protocol = load_protocol(args.results_dir)
+    except FileNotFoundError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+    raw = mne.io.read_raw_bdf(str(bdf_path), preload=False, verbose=False)
+    if args.clock_model:
+        events = ClockModel.load(args.clock_model).events(*load_sent_triggers(args.results_dir),
+                                                          raw.info['sfreq'])
+        print(f"[INFO] Using drift-corrected CSV onsets ({args.clock_model})")
+    else:
+        events = read_bdf_events(bdf_path)[:2]
+    epochs = make_beep_epochs(raw, protocol, tmin=args.tmin, tmax=args.tmax, events=events)
+
+    counts = epochs.metadata.groupby(['concept', 'category']).size()
+    print(f"[OK] {len(epochs)} beep epochs ({len(epochs.ch_names)} channels, "
+          f"{epochs.tmin:.3f} to {epochs.tmax:.3f} s)")
+    for (concept, category), n in counts.items():
+        print(f"  {concept:<12s} cat_{category}  {n:5d}")
+
+    epochs.save(str(output), overwrite=True, verbose=False)
+    print(f"[OK] Epochs saved to: {output}")
+
+
+if __name__ == "__main__":
+    main()
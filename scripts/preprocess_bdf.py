@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Preprocess a BDF session into cleaned beep-level epochs (ica_epo.fif).
+
+Stages, each checkpointed in the output folder and rerun only when its inputs
+or parameters change:
+  1. filtered  high-pass, notch and average reference (scalp channels, EXG
+               excluded), streamed over the BDF in overlapping chunks
+               (optionally in parallel)
+  2. ica       ICA fitted on a decimated copy of the filtered recording (scalp
+               channels; EXG is typed as EOG)
+  3. epochs    beep-level epochs cut from the filtered recording, cleaned
+               with the ICA (--ica-exclude) and saved as ica_epo.fif
+
+Changing only --ica-exclude, for example, reuses the filtered recording and
+the ICA solution and just re-cuts the epochs.
+
+Usage:
+    python scripts/preprocess_bdf.py --participant-id 9999
+    python scripts/preprocess_bdf.py --participant-id 9999 --ica-exclude 0 3
+"""
+
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+
+import numpy as np
+import mne
+from mne.preprocessing import read_ica
+
+# Add parent directory to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from analysis.utils import (
+    hash_file,
+    make_beep_epochs,
+    read_bdf_events,
+    ClockModel,
+    load_sent_triggers,
+    CheckpointStore,
+    design_preprocessing_kernel,
+    eeg_picks,
+    external_channel_types,
+    reference_picks,
+    filter_continuous,
+    fit_ica_decimated,
+    POWER_NOISE
+)
+
+
+def run_pipeline(bdf_file, protocol_file, output_dir, l_freq=1.0, notch=tuple(POWER_NOISE),
+                 reference=True, chunk_seconds=60.0, decim=4, n_components=0.999,
+                 ica_method='fastica', ica_exclude=(), tmin=-0.3, tmax=1.7, n_workers=1,
+                 clock_model=None):
+    """
+    Run (or resume) the preprocessing stages of one session.
+
+    Parameters
+    ----------
+    bdf_file : Path
+        Continuous recording
+    protocol_file : Path
+        Randomization protocol JSON of the session
+    output_dir : Path
+        Checkpoint folder (ica_epo.fif is written here)
+    l_freq : float, optional
+        High-pass edge (Hz)
+    notch : sequence of float
+        Power-line frequencies to remove (Hz, default: the classifier's POWER_NOISE)
+    reference : bool
+        Re-reference to the average of the scalp channels (EXG excluded)
+    chunk_seconds : float
+        Chunk length of the streamed filtering (s)
+    decim : int
+        Decimation of the ICA fitting copy
+    n_components : int or float
+        ICA components (float: explained variance fraction)
+    ica_method : str
+        ICA algorithm
+    ica_exclude : sequence of int
+        ICA components removed from the epochs
+    tmin, tmax : float
+        Epoch window around each beep (s)
+    n_workers : int
+        Worker processes of the filtering stage
+    clock_model : Path, optional
+        Clock model JSON (validate_triggers.py); epochs are cut at the corrected
+        onsets of the sent triggers instead of the recorded ones
+
+    Returns
+    -------
+    mne.Epochs
+        Cleaned epochs
+    """
+    store = CheckpointStore(output_dir)
+    raw = mne.io.read_raw_bdf(str(bdf_file), preload=False, verbose=False)
+    raw.set_channel_types(external_channel_types(raw.info), verbose=False)
+    picks = eeg_picks(raw.info)
+    info = mne.pick_info(raw.info, picks)
+
+    # Stage 1: filtered, re-referenced recording
+    params = {'bdf_sha256': hash_file(bdf_file), 'l_freq': l_freq, 'notch': list(notch),
+              'reference': 'average' if reference else None,
+              'reference_channels': [info['ch_names'][i] for i in reference_picks(raw.info)]
+              if reference else None,
+              'dtype': 'float32'}
+    filtered_key = store.key(params)
+    if store.is_current('filtered', filtered_key):
+        print(f"[INFO] filtered: up to date ({filtered_key[:12]})")
+    else:
+        print(f"[INFO] filtered: streaming {raw.times[-1]:.0f} s in {chunk_seconds:g} s chunks "
+              f"({n_workers} worker(s))")
+        kernel = design_preprocessing_kernel(raw.info['sfreq'], l_freq, notch)
+        filter_continuous(bdf_file, store.path('filtered'), kernel, reference=reference,
+                          chunk_seconds=chunk_seconds, n_workers=n_workers)
+        store.record('filtered', filtered_key, params)
+    data = np.load(store.path('filtered'), mmap_mode='r')
+
+    # Stage 2: ICA on a decimated copy
+    params = {'filtered': filtered_key, 'decim': decim, 'n_components': n_components,
+              'method': ica_method,
+              'channels': [name for name, kind in zip(info['ch_names'], info.get_channel_types())
+                           if kind == 'eeg']}
+    ica_key = store.key(params)
+    if store.is_current('ica', ica_key):
+        print(f"[INFO] ica: up to date ({ica_key[:12]})")
+        ica = read_ica(store.path('ica'), verbose=False)
+    else:
+        print(f"[INFO] ica: fitting {ica_method} on every {decim}th sample")
+        ica = fit_ica_decimated(data, info, decim=decim, n_components=n_components,
+                                method=ica_method)
+        ica.save(store.path('ica'), overwrite=True, verbose=False)
+        store.record('ica', ica_key, params)
+    print(f"[INFO] ica: {ica.n_components_} components")
+
+    # Stage 3: cleaned beep-level epochs
+    params = {'ica': ica_key, 'protocol_sha256': hash_file(protocol_file),
+              'tmin': tmin, 'tmax': tmax, 'exclude': sorted(int(c) for c in ica_exclude),
+              'clock_model_sha256': hash_file(clock_model) if clock_model else None}
+    epochs_key = store.key(params)
+    if store.is_current('epochs', epochs_key):
+        print(f"[INFO] epochs: up to date ({epochs_key[:12]})")
+        return mne.read_epochs(store.path('epochs'), preload=False, verbose=False)
+
+    with open(protocol_file, 'r') as f:
+        protocol = json.load(f)
+    if clock_model:
+        events = ClockModel.load(clock_model).events(*load_sent_triggers(protocol_file.parent),
+                                                     raw.info['sfreq'])
+    else:
+        events = read_bdf_events(bdf_file)[:2]
+    epochs = make_beep_epochs(raw, protocol, tmin=tmin, tmax=tmax, data=data, events=events)
+    ica.apply(epochs, exclude=params['exclude'], verbose=False)
+    epochs.save(store.path('epochs'), overwrite=True, verbose=False)
+    store.record('epochs', epochs_key, params)
+    print(f"[INFO] epochs: {len(epochs)} beep epochs, excluded components {params['exclude']}")
+    return epochs
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Preprocess a BDF session into cleaned beep-level epochs',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Latest session of a participant (checkpoints in data/sub_9999/preprocessing)
+  python scripts/preprocess_bdf.py --participant-id 9999
+
+  # Inspect raw_ica.fif, then remove components (only the epochs stage reruns)
+  python scripts/preprocess_bdf.py --participant-id 9999 --ica-exclude 0 3
+
+  # Filter 4 chunks in parallel
+  python scripts/preprocess_bdf.py --participant-id 9999 --n-workers 4
+        """
+    )
+    parser.add_argument('--participant-id', type=str, help='Participant ID (auto-detects files)')
+    parser.add_argument('--bdf-file', type=str, help='Path to BDF file')
+    parser.add_argument('--results-dir', type=str,
+                        help='Results directory containing the randomization protocol')
+    parser.add_argument('--output-dir', type=str, default=None,
+                        help='Checkpoint folder (default: <BDF folder>/preprocessing)')
+    parser.add_argument('--l-freq', type=float, default=1.0,
+                        help='High-pass edge in Hz (default: 1.0)')
+    parser.add_argument('--notch', type=float, nargs='*', default=[float(f) for f in POWER_NOISE],
+                        help='Power-line frequencies to notch in Hz '
+                             f'(default: {" ".join(f"{f:g}" for f in POWER_NOISE)}, as the classifier)')
+    parser.add_argument('--no-reref', action='store_true',
+                        help='Keep the recording reference (default: average of the scalp channels)')
+    parser.add_argument('--chunk-seconds', type=float, default=60.0,
+                        help='Chunk length of the streamed filtering in s (default: 60)')
+    parser.add_argument('--decim', type=int, default=4,
+                        help='Decimation of the ICA fitting copy (default: 4)')
+    parser.add_argument('--ica-components', type=float, default=0.999,
+                        help='ICA components, or explained variance if < 1 (default: 0.999)')
+    parser.add_argument('--ica-method', type=str, default='fastica',
+                        choices=['fastica', 'infomax', 'picard'],
+                        help='ICA algorithm (default: fastica)')
+    parser.add_argument('--ica-exclude', type=int, nargs='*', default=[],
+                        help='ICA components to remove from the epochs')
+    parser.add_argument('--tmin', type=float, default=-0.3,
+                        help='Epoch start relative to each beep in s (default: -0.3)')
+    parser.add_argument('--tmax', type=float, default=1.7,
+                        help='Epoch end relative to each beep in s (default: 1.7)')
+    parser.add_argument('--clock-model', type=str, default=None,
+                        help='Clock model JSON from validate_triggers.py (epoch at corrected CSV onsets)')
+    parser.add_argument('--n-workers', type=int, default=None,
+                        help='Worker processes for filtering (default: all cores)')
+    args = parser.parse_args()
+
+    if args.participant_id and not args.bdf_file:
+        args.bdf_file = str(project_root / 'data' / f'sub_{args.participant_id}' /
+                            f'sub_{args.participant_id}.bdf')
+    if args.participant_id and not args.results_dir:
+        results_dirs = list((project_root / 'data' / 'results').glob(f'sub-{args.participant_id}_*'))
+        if not results_dirs:
+            print(f"[ERROR] No results directories found for participant {args.participant_id}")
+            sys.exit(1)
+        args.results_dir = str(max(results_dirs, key=lambda p: p.stat().st_mtime))
+        print(f"[INFO] Auto-detected results directory: {args.results_dir}")
+
+    if not args.bdf_file or not args.results_dir:
+        print("[ERROR] Provide --participant-id or both --bdf-file and --results-dir")
+        sys.exit(1)
+
+    bdf_path = Path(args.bdf_file)
+    if not bdf_path.exists():
+        print(f"[ERROR] BDF file not found: {bdf_path}")
+        sys.exit(1)
+    protocol_files = sorted(Path(args.results_dir).glob('*_randomization_protocol.json'))
+    if not protocol_files:
+        print(f"[ERROR] No randomization protocol found in {args.results_dir}")
+        sys.exit(1)
+    output_dir = Path(args.output_dir) if args.output_dir else bdf_path.parent / 'preprocessing'
+
+    n_components = args.ica_components if args.ica_components < 1 else int(args.ica_components)
+    n_workers = args.n_workers or os.cpu_count() or 1
+
+    epochs = run_pipeline(bdf_path, protocol_files[-1], output_dir, l_freq=args.l_freq,
+                          notch=args.notch, reference=not args.no_reref,
+                          chunk_seconds=args.chunk_seconds, decim=args.decim,
+                          n_components=n_components, ica_method=args.ica_method,
+                          ica_exclude=args.ica_exclude, tmin=args.tmin, tmax=args.tmax,
+                          n_workers=n_workers, clock_model=args.clock_model)
+    print(f"[OK] {len(epochs)} epochs in {output_dir / 'ica_epo.fif'}")
+
+
+if __name__ == "__main__":
+    main()
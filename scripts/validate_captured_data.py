@@ -71,41 +71,13 @@ def main():
         bdf_triggers = []
     else:
         try:
-            import mne
-            import numpy as np
+            from analysis.utils import read_bdf_events
             
-            # Try loading without preload first to check file size
-            print(f"   Attempting to load BDF: {bdf_path.name}")
-            raw = mne.io.read_raw_bdf(bdf_path, preload=False, verbose=False)
-            
-            status_ch = None
-            for ch_name in raw.ch_names:
-                if 'Status' in ch_name or 'STIM' in ch_name:
-                    status_ch = ch_name
-                    break
-            
-            if status_ch:
-                ch_idx = raw.ch_names.index(status_ch)
-                # Load only the status channel data
-                trigger_data = raw.get_data(picks=[status_ch])[0].astype(np.int64)
-                trigger_values = (trigger_data & 0xFF)
-                diff = np.diff(trigger_values)
-                trigger_indices = np.where(diff != 0)[0] + 1
-                
-                bdf_triggers = []
-                for idx in trigger_indices:
-                    code = int(trigger_values[idx])
-                    if code > 0:
-                        bdf_triggers.append(code)
-                
-                print(f"   Total BDF triggers: {len(bdf_triggers)}")
-            else:
-                print("   [ERROR] No Status channel found")
-                bdf_triggers = []
-        except MemoryError as e:
-            print(f"   [SKIP] BDF file too large to load into memory: {e}")
-            print("   BDF validation skipped - use validate_triggers.py for detailed BDF analysis")
-            bdf_triggers = []
+            # Read only the Status channel (memory-mapped, low byte = trigger code)
+            print(f"   Reading Status channel: {bdf_path.name}")
+            _, codes, _ = read_bdf_events(bdf_path)
+            bdf_triggers = codes.tolist()
+            print(f"   Total BDF triggers: {len(bdf_triggers)}")
         except Exception as e:
             print(f"   [ERROR] Failed to load BDF: {e}")
             bdf_triggers = []
@@ -15,48 +15,28 @@ Usage:
 """
 import argparse
 import os
+import sys
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import mne
 from collections import Counter
 from pathlib import Path
 
+# Add parent directory to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from analysis.utils import read_bdf_events, align_events, alignment_report, event_blocks, ClockModel
+
 
 def load_bdf_triggers(bdf_path):
-    """Extract all triggers from BDF file with timestamps."""
+    """Extract all triggers from BDF file with timestamps (reads only the Status channel)."""
     if not os.path.exists(bdf_path):
         raise FileNotFoundError(f"BDF file not found: {bdf_path}")
     
     print(f"Loading BDF: {bdf_path}")
-    raw = mne.io.read_raw_bdf(bdf_path, preload=True, verbose=False)
-    
-    # Find trigger channel
-    trigger_channel = None
-    for ch_name in raw.ch_names:
-        if 'Status' in ch_name or 'STIM' in ch_name or 'status' in ch_name or 'stim' in ch_name:
-            trigger_channel = ch_name
-            break
-    
-    if trigger_channel is None:
-        raise ValueError("No Status/STIM channel found in BDF!")
-    
-    # Extract trigger data
-    trigger_data = raw.get_data(picks=[trigger_channel])[0].astype(np.int64)
-    sfreq = raw.info['sfreq']
-    
-    # BioSemi-style trigger processing - consider low byte only
-    low_byte = trigger_data & 0xFF
-    
-    # Find points where low_byte changes (rising/falling edges)
-    trigger_changes = np.where(np.diff(low_byte) != 0)[0]
-    idx = trigger_changes + 1
-    vals = low_byte[idx].astype(int)
-    
-    # Filter out zeros - the channel returns to 0 between triggers
-    non_zero_mask = vals != 0
-    vals = vals[non_zero_mask]
-    idx = idx[non_zero_mask]
+    # BioSemi-style trigger processing - low byte of the Status channel only
+    idx, vals, sfreq = read_bdf_events(bdf_path)
     
     # Convert to timestamps (seconds)
     timestamps = idx / sfreq
@@ -113,86 +93,81 @@ def load_mirror_csv(results_folder):
     df_sent['trigger_value'] = df_sent['trigger_code']
     df_sent['system_time'] = df_sent['timestamp_psychopy']
     
-    # Sort by timestamp
-    df_sent = df_sent.sort_values('system_time').reset_index(drop=True)
+    # Keep file (send) order: the PsychoPy clock restarts in every block
+    df_sent = df_sent.reset_index(drop=True)
     
     print(f"  Loaded {len(df_sent)} triggers from CSV (sent to EEG)")
     return df_sent
 
 
-def align_triggers_by_sequence(bdf_triggers, mirror_triggers):
-    """Strict sequential alignment - if expected trigger isn't found, skip it to avoid false positives."""
-    print(f"Aligning triggers with strict sequential matching...")
+def align_triggers_by_sequence(bdf_triggers, mirror_triggers, tol=0.05):
+    """Anchor-and-extend alignment - resynchronizes at every block start, so one dropped
+    or extra trigger only affects its own position."""
+    print(f"Aligning triggers (block anchors + banded sequence alignment)...")
+    
+    # Extract trigger sequences and times
+    bdf_codes = np.array([t['trigger_value'] for t in bdf_triggers], dtype=np.int64)
+    bdf_times = np.array([t['timestamp'] for t in bdf_triggers], dtype=float)
+    mirror_codes = mirror_triggers['trigger_value'].to_numpy(dtype=np.int64)
+    mirror_times = mirror_triggers['system_time'].to_numpy(dtype=float)
     
-    # Extract trigger sequences
-    bdf_sequence = [t['trigger_value'] for t in bdf_triggers]
-    mirror_sequence = mirror_triggers['trigger_value'].tolist()
+    print(f"BDF sequence length: {len(bdf_codes)}")
+    print(f"Mirror sequence length: {len(mirror_codes)}")
     
-    print(f"BDF sequence length: {len(bdf_sequence)}")
-    print(f"Mirror sequence length: {len(mirror_sequence)}")
+    steps = align_events(bdf_codes, bdf_times, mirror_codes, mirror_times, tol=tol)
     
     aligned_pairs = []
     bdf_unmatched = []
     mirror_unmatched = []
     
-    # Strict sequential alignment - no searching ahead to avoid false positives
-    bdf_index = 0
-    mirror_index = 0
-    
-    while bdf_index < len(bdf_sequence) and mirror_index < len(mirror_sequence):
-        bdf_value = bdf_sequence[bdf_index]
-        mirror_value = mirror_sequence[mirror_index]
-        
-        if bdf_value == mirror_value:
-            # Perfect match at current positions -> compute time_diff
-            bdf_ts = bdf_triggers[bdf_index]['timestamp']
-            mirror_ts = float(mirror_triggers.iloc[mirror_index]['system_time'])
-            time_diff = bdf_ts - mirror_ts  # seconds (BDF_time - Mirror_time)
-            
+    for position, (bdf_index, mirror_index) in enumerate(steps.tolist()):
+        if bdf_index < 0:
+            # Sent but not recorded
+            mirror_unmatched.append({
+                'mirror_index': mirror_index,
+                'mirror_trigger': mirror_triggers.iloc[mirror_index],
+                'status': 'MIRROR_MISSING',
+                'reason': f'No recorded trigger at alignment position {position}'
+            })
+        elif mirror_index < 0:
+            # Recorded but never sent
+            bdf_unmatched.append({
+                'bdf_index': bdf_index,
+                'bdf_trigger': bdf_triggers[bdf_index],
+                'status': 'BDF_EXTRA',
+                'reason': f'No sent trigger at alignment position {position}'
+            })
+        elif bdf_codes[bdf_index] == mirror_codes[mirror_index]:
             aligned_pairs.append({
                 'bdf_index': bdf_index,
                 'mirror_index': mirror_index,
                 'bdf_trigger': bdf_triggers[bdf_index],
                 'mirror_trigger': mirror_triggers.iloc[mirror_index],
                 'status': 'MATCHED',
-                'time_diff': time_diff
+                'time_diff': bdf_times[bdf_index] - mirror_times[mirror_index]  # BDF_time - Mirror_time
             })
-            bdf_index += 1
-            mirror_index += 1
-            
         else:
-            # No match at current positions - treat mirror trigger as missing from BDF at this position
-            mirror_unmatched.append({
+            # Same position, different value (corrupted code)
+            aligned_pairs.append({
+                'bdf_index': bdf_index,
                 'mirror_index': mirror_index,
-                'mirror_trigger': mirror_triggers.iloc[mirror_index],
-                'status': 'MIRROR_MISSING',
-                'reason': f'Expected at BDF position {bdf_index}, found {bdf_value} instead of {mirror_value}'
+                'sequence_position': position,
+                'bdf_value': int(bdf_codes[bdf_index]),
+                'mirror_value': int(mirror_codes[mirror_index]),
+                'status': 'MISMATCH'
             })
-            mirror_index += 1
-            # Don't advance bdf_index - keep checking the same BDF trigger against next mirror trigger
-    
-    # Handle remaining triggers
-    for remaining_bdf_idx in range(bdf_index, len(bdf_sequence)):
-        bdf_unmatched.append({
-            'bdf_index': remaining_bdf_idx,
-            'bdf_trigger': bdf_triggers[remaining_bdf_idx],
-            'status': 'BDF_EXTRA',
-            'reason': 'Remaining after mirror sequence ended'
-        })
-    
-    for remaining_mirror_idx in range(mirror_index, len(mirror_sequence)):
-        mirror_unmatched.append({
-            'mirror_index': remaining_mirror_idx,
-            'mirror_trigger': mirror_triggers.iloc[remaining_mirror_idx],
-            'status': 'MIRROR_MISSING',
-            'reason': 'Remaining after BDF sequence ended'
-        })
     
-    print(f"Strict sequential alignment results:")
-    print(f"  Matched: {len(aligned_pairs)}")
+    print(f"Alignment results:")
+    print(f"  Matched: {len([p for p in aligned_pairs if p['status'] == 'MATCHED'])}")
+    print(f"  Mismatched: {len([p for p in aligned_pairs if p['status'] == 'MISMATCH'])}")
     print(f"  BDF extra: {len(bdf_unmatched)}")
     print(f"  Mirror missing: {len(mirror_unmatched)}")
     
+    # Drops, insertions and clock drift per block
+    report = alignment_report(steps, bdf_codes, bdf_times, mirror_codes, mirror_times)
+    print(f"\nPer-block alignment:")
+    print(report.to_string(index=False, float_format=lambda v: f'{v:.2f}'))
+    
     return aligned_pairs, bdf_unmatched, mirror_unmatched
 
 
@@ -287,6 +262,30 @@ def analyze_discrepancies(aligned_pairs, bdf_unmatched, mirror_unmatched):
             print("   [PROBLEM] >5% drop rate - investigate immediately!")
 
 
+def fit_clock_model(aligned_pairs, mirror_triggers, output_path=None):
+    """Robustly fit BDF onset times on CSV times per block; report offset, drift and jitter."""
+    matched = [p for p in aligned_pairs if p['status'] == 'MATCHED']
+    if len(matched) < 2:
+        print("\nCLOCK MODEL: not enough matched triggers to fit")
+        return None
+    
+    mirror_blocks = event_blocks(mirror_triggers['trigger_value'].to_numpy(dtype=np.int64))
+    csv_times = np.array([float(p['mirror_trigger']['system_time']) for p in matched])
+    bdf_times = np.array([p['bdf_trigger']['timestamp'] for p in matched])
+    blocks = mirror_blocks[[p['mirror_index'] for p in matched]]
+    model = ClockModel.fit(csv_times, bdf_times, blocks)
+    
+    print(f"\n{'='*60}")
+    print("CLOCK MODEL (BDF time = offset + CSV time, per block)")
+    print(f"{'='*60}")
+    print(model.report().to_string(index=False, float_format=lambda v: f'{v:.3f}'))
+    
+    if output_path is not None:
+        model.save(output_path)
+        print(f"Clock model saved to: {output_path}")
+    return model
+
+
 def create_validation_plot(bdf_triggers, mirror_triggers, aligned_pairs, bdf_unmatched, mirror_unmatched, output_path):
     """Create comprehensive validation plot with distribution and timing difference."""
     print(f"Creating validation plot: {output_path}")
@@ -349,6 +348,8 @@ def main():
     parser.add_argument('--results-dir', type=str, help='Path to results directory containing trigger CSV')
     parser.add_argument('--participant-id', type=str, help='Participant ID (auto-detects paths)')
     parser.add_argument('--output-dir', type=str, default=None, help='Output directory for plots (defaults to results directory)')
+    parser.add_argument('--match-tolerance', type=float, default=0.05,
+                        help='Max timing disagreement (s) of matched triggers after removing the block offset (default: 0.05)')
     
     args = parser.parse_args()
     
@@ -397,16 +398,21 @@ def main():
         
         # Align triggers by sequence order
         aligned_pairs, bdf_unmatched, mirror_unmatched = align_triggers_by_sequence(
-            bdf_triggers, mirror_triggers
+            bdf_triggers, mirror_triggers, tol=args.match_tolerance
         )
         
         # Analyze discrepancies
         analyze_discrepancies(aligned_pairs, bdf_unmatched, mirror_unmatched)
         
-        # Create validation plot
         participant_id = Path(bdf_path).stem.replace('sub_', '').replace('.bdf', '')
         output_dir = Path(args.output_dir)
         output_dir.mkdir(parents=True, exist_ok=True)  # Ensure directory exists
+        
+        # Clock drift / latency model (used by the epoching scripts via --clock-model)
+        fit_clock_model(aligned_pairs, mirror_triggers,
+                        str(output_dir / f'clock_model_{participant_id}.json'))
+        
+        # Create validation plot
         output_path = str(output_dir / f'trigger_validation_{participant_id}.png')
         print(f"Saving validation plot to: {output_path}")
         create_validation_plot(bdf_triggers, mirror_triggers, aligned_pairs, 